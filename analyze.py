@@ -1,79 +1,71 @@
 import sqlite3
 import os
+import sys
 import json
-import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'data_engine'))
+from storage import search, market, dedup
 
 CLEAN_DB = os.path.join(os.path.dirname(__file__), 'data_engine/storage/clean_data.db')
 
-def analyze(query):
+def analyze(query, **filters):
+    """
+    Report for products matching every word of query, optionally narrowed by
+    cpu/gpu/ram/storage equality and min_price/max_price (all indexed).
+    """
     print(f"\n[Analysis] Generating report for: '{query}'...")
-    
+
     conn = sqlite3.connect(CLEAN_DB)
-    c = conn.cursor()
-    
-    # Simple search in title/model
-    c.execute("SELECT brand, model, specs, price, currency, source, link FROM products WHERE model LIKE ? OR brand LIKE ?", 
-              (f'%{query}%', f'%{query}%'))
-    
-    # Actually, the processor splits brand/model. 
-    # Let's just fetch all and filter in python for flexibility if the query is complex
-    c.execute("SELECT brand, model, specs, price, currency, source, link, hash_id, title FROM products")
-    rows = c.fetchall()
-    
-    matches = []
-    prices = []
-    
-    query_parts = query.lower().split()
-    
-    for r in rows:
-        brand, model, specs_json, price, currency, source, link, uid, title_raw = r
-        specs = json.loads(specs_json)
-        
-        # Construct a full search string
-        full_text = f"{title_raw} {brand} {model} {specs.get('cpu','') } {specs.get('gpu','') } {specs.get('ram','') } {specs.get('storage','') }".lower()
-        
-        # Check if all query parts are in the full text
-        if all(part in full_text for part in query_parts):
-            matches.append({
-                'title': f"{brand} {model}",
-                'specs': specs,
-                'price': price,
-                'link': link,
-                'source': source
-            })
-            if price:
-                prices.append(price)
+    if not market.has_schema(conn):
+        # Added by the processor along with products.market_bucket
+        print("[Analysis] Clean DB predates the market stats; run the processor first.")
+        conn.close()
+        return None
+    if not search.has_schema(conn):
+        # One-off: clean DB predates the search index
+        print("[Analysis] Building search index...")
+        search.ensure_schema(conn)
+        conn.commit()
+
+    # Matching, min/avg/max and the top rows all happen in SQL on the FTS/column indexes
+    stats, top = search.search(conn, query, filters)
+
+    print(f"[Analysis] Found {stats['count']} matching items.")
+    if stats['outliers']:
+        print(f"[Analysis] {stats['outliers']} outlier prices left out of the statistics.")
 
-    print(f"[Analysis] Found {len(matches)} matching items.")
-    
     sys.stdout.reconfigure(encoding='utf-8')
 
-    if prices:
-        avg_price = statistics.mean(prices)
-        min_price = min(prices)
-        max_price = max(prices)
-        
+    if stats['avg'] is not None:
         print(f"\n{'-'*40}")
         print(f" STATISTICS: {query.upper()}")
         print(f"{'-'*40}")
-        print(f" Average Price: {avg_price:,.0f} DZD")
-        print(f" Min Price::    {min_price:,.0f} DZD")
-        print(f" Max Price:    {max_price:,.0f} DZD")
+        print(f" Average Price: {stats['avg']:,.0f} DZD")
+        print(f" Min Price::    {stats['min']:,.0f} DZD")
+        print(f" Max Price:    {stats['max']:,.0f} DZD")
         print(f"{'-'*40}\n")
-        
+
         print(f" TOP RESULTS:")
-        for i, m in enumerate(matches[:5]):
-            print(f"{i+1}. {m['title']} | {m['specs'].get('cpu')} / {m['specs'].get('ram')} | {m['price']:,.0f} DZD | {m['source']}")
-            
+        for i, (brand, model, specs_json, price, currency, source, link, bucket, hash_id) in enumerate(top):
+            specs = json.loads(specs_json)
+            # Scored against its own model/spec bucket, not the whole query
+            deal = market.score_deal(conn, bucket, price)
+            reposts = dedup.alternate_links(conn, hash_id)
+            print(f"{i+1}. {brand} {model} | {specs.get('cpu')} / {specs.get('ram')} | {price:,.0f} DZD | {source}"
+                  + (f" | {deal}" if deal else '') + (f" | +{len(reposts)} reposts" if reposts else ''))
+
     else:
         print("[Analysis] No price data found for this query.")
-        
+
     conn.close()
+    return stats
+
+def _arg(name, cast=str):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else None
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) > 1:
-        q = sys.argv[1]
-    else:
-        q = "hp elitebook"
-    analyze(q)
+    flags = {'--cpu', '--gpu', '--ram', '--storage', '--min-price', '--max-price'}
+    positional = [a for i, a in enumerate(sys.argv[1:], 1) if a not in flags and sys.argv[i - 1] not in flags]
+    q = positional[0] if positional else "hp elitebook"
+    analyze(q, cpu=_arg('--cpu'), gpu=_arg('--gpu'), ram=_arg('--ram'), storage=_arg('--storage'),
+            min_price=_arg('--min-price', float), max_price=_arg('--max-price', float))
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from storage.writer import DbWriter, DB_PATH
+
+SOURCES = ('kouba', 'laptops')
+
+def load_queries(path):
+    """One query per line; blank lines and # comments are skipped."""
+    with open(path, encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith('#')]
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+class BatchRunner:
+    """
+    Runs a list of queries on every source at once, each under its own concurrency
+    limit: Kouba pages on a thread pool (per-host rate limit), Ouedkniss queries on
+    a browser pool. Both write through one shared DbWriter thread.
+    """
+
+    def __init__(self, sources=SOURCES, kouba_concurrency=4, pool_size=2, retries=2, backoff=1.0,
+                 recycle_pages=50, recycle_mb=500, db_path=DB_PATH, kouba_options=None, laptops_options=None):
+        self.sources = sources
+        self.kouba_concurrency = kouba_concurrency
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.recycle_pages = recycle_pages
+        self.recycle_mb = recycle_mb
+        self.db_path = db_path
+        # Extra constructor arguments per spider (store_html, rate_limit, headless, ...)
+        self.kouba_options = kouba_options or {}
+        self.laptops_options = laptops_options or {}
+
+    def run_kouba(self, queries, writer):
+        from spiders.kouba import KoubaSpider
+        spider = KoubaSpider(max_concurrency=self.kouba_concurrency, retries=self.retries, backoff=self.backoff,
+                             db_path=self.db_path, writer=writer, **self.kouba_options)
+        spider.scrape_many(queries)
+        return spider.query_latency
+
+    def run_laptops(self, queries, writer):
+        from spiders.laptops import LaptopSpider
+        spider = LaptopSpider(retries=self.retries, writer=writer, **self.laptops_options)
+        spider.scrape_many(queries, pool_size=self.pool_size,
+                           max_pages=self.recycle_pages, max_growth_mb=self.recycle_mb)
+        return spider.query_latency
+
+    def run(self, queries):
+        """Returns {source: {query: seconds}}."""
+        print(f"[Batch] {len(queries)} queries on {', '.join(self.sources)}")
+        writer = DbWriter(self.db_path).start()
+        latencies = {}
+        elapsed = {}
+
+        def run_source(source):
+            start = time.perf_counter()
+            try:
+                latencies[source] = getattr(self, f"run_{source}")(queries, writer)
+            except Exception as e:
+                print(f"[Batch] {source} failed: {e}")
+                latencies[source] = {}
+            elapsed[source] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=run_source, args=(source,)) for source in self.sources]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.close()
+        total = time.perf_counter() - start
+
+        for source in self.sources:
+            # Only completed queries have a latency; failed ones are counted apart
+            values = list(latencies[source].values())
+            failed = len(queries) - len(values)
+            if values:
+                print(f"[Batch] {source}: {len(values)}/{len(queries)} queries in {elapsed[source]:.1f}s, "
+                      f"p50 {percentile(values, 50):.2f}s, p95 {percentile(values, 95):.2f}s per query"
+                      + (f", {failed} failed" if failed else ''))
+            else:
+                print(f"[Batch] {source}: no queries completed ({failed} failed)")
+        runs = sum(len(v) for v in latencies.values())
+        failures = len(queries) * len(self.sources) - runs
+        print(f"[Batch] {runs} query runs completed in {total:.1f}s ({runs / total * 60:.1f} queries/min), {failures} failed")
+        return latencies
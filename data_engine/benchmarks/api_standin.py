@@ -0,0 +1,173 @@
+"""
+Local HTTP stand-in for the API's bulk price endpoint, to exercise uploader/push_to_api.py.
+
+    python data_engine/benchmarks/api_standin.py --serve [--port 5000]
+    python data_engine/benchmarks/api_standin.py [--rows 100000] [--latency 0.02]
+
+The stand-in accepts gzip'd (or plain) JSON arrays on POST, applies them to an
+in-memory copy of the catalogue (upsert by hash_id, drop on "deleted") and can
+inject failures: --fail-rate answers that fraction of requests with 503.
+
+Without --serve it builds a throwaway clean DB of --rows products (bench_analyze
+shapes) and syncs it to the stand-in: a first full push, a delta push after
+changing 5% of the prices and deleting 1% of the products, a push that loses the
+API half-way and resumes on the next run, and a push through 20% failed requests.
+Reports rows/s, bytes on the wire and connections used, and checks that the
+stand-in ends up with exactly the DB's products.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+class StandIn:
+    def __init__(self, port=0, latency=0.0, fail_rate=0.0, seed=42):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        # Set to make every request fail with 503 (the API being down)
+        self.down = False
+        self.rng = random.Random(seed)
+        self.products = {}
+        self.requests = 0
+        self.failures = 0
+        self.received = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive, so connection reuse is visible
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with standin.lock:
+                    standin.requests += 1
+                    standin.connections.add(self.client_address)
+                    failed = standin.down or standin.rng.random() < standin.fail_rate
+                    if failed:
+                        standin.failures += 1
+                if standin.latency:
+                    time.sleep(standin.latency)
+                if failed:
+                    self.reply(503, b'{"error":"unavailable"}')
+                    return
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                items = json.loads(body)
+                with standin.lock:
+                    standin.received += len(items)
+                    for item in items:
+                        if item.get('deleted'):
+                            standin.products.pop(item['hash_id'], None)
+                        else:
+                            standin.products[item['hash_id']] = item
+                self.reply(200, json.dumps({'ok': True, 'count': len(items)}).encode('utf-8'))
+
+            def reply(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/prices/bulk"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def reset_counters(self):
+        self.requests = self.failures = self.received = 0
+        self.connections = set()
+
+def matches(standin, conn):
+    """True if the stand-in holds exactly the DB's products, at the DB's prices."""
+    products = dict(conn.execute("SELECT hash_id, price FROM products").fetchall())
+    return products == {hash_id: item['price'] for hash_id, item in standin.products.items()}
+
+def main():
+    standin = StandIn(port=_arg('--port', 5000 if '--serve' in sys.argv else 0),
+                      latency=_arg('--latency', 0.02, float), fail_rate=_arg('--fail-rate', 0.0, float))
+    if '--serve' in sys.argv:
+        print(f"[StandIn] Serving API stand-in at {standin.url}")
+        standin.server.serve_forever()
+        return
+
+    from bench_analyze import build
+    from storage import sync
+    from uploader.push_to_api import Uploader
+
+    rows = _arg('--rows', 100000)
+    path = os.path.join(tempfile.mkdtemp(), 'clean_data.db')
+    conn = build(path, rows)
+    sync.ensure_schema(conn)
+    conn.commit()
+    standin.start()
+    uploader = Uploader(standin.url, db_path=path, backoff=0.05)
+    rng = random.Random(7)
+
+    def run(name):
+        standin.reset_counters()
+        stats = uploader.sync()
+        print(f"[Bench] {name:8s} {stats['rows']:>7} rows, {stats['batches']} batches, {stats.get('seconds', 0):.2f}s "
+              f"({stats['rows'] / stats['seconds'] if stats.get('seconds') else 0:,.0f} rows/s), "
+              f"{stats['json_bytes'] / 1e6:.1f} MB JSON -> {stats['wire_bytes'] / 1e6:.2f} MB gzip, "
+              f"{standin.requests} requests ({standin.failures} failed) over {len(standin.connections)} connection(s), "
+              f"{standin.received} rows received")
+        return stats
+
+    run('full')
+
+    # Delta: reprice 5%, delete 1%
+    ids = [r[0] for r in conn.execute("SELECT hash_id FROM products")]
+    conn.executemany("UPDATE products SET price = price * 0.95 WHERE hash_id = ?", [(i,) for i in rng.sample(ids, rows // 20)])
+    conn.executemany("DELETE FROM products WHERE hash_id = ?", [(i,) for i in rng.sample(ids, rows // 100)])
+    conn.commit()
+    run('delta')
+    run('noop')
+
+    # The API goes down after a few batches; the next run picks up from the checkpoint
+    conn.execute("UPDATE products SET price = price + 100")
+    conn.commit()
+    timer = threading.Timer(0.2, lambda: setattr(standin, 'down', True))
+    timer.start()
+    uploader.retries = 1
+    stats = run('outage')
+    timer.cancel()
+    standin.down = False
+    uploader.retries = 4
+    resumed = run('resume')
+    count = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    print(f"[Bench] Outage: {'stopped' if stats['failed'] else 'finished'} after {stats['rows']} rows, "
+          f"the next run sent the other {resumed['rows']} ({stats['rows'] + resumed['rows'] - count} sent twice)")
+
+    # Flaky API: a fifth of the requests fail
+    conn.execute("UPDATE products SET price = price + 100")
+    conn.commit()
+    standin.fail_rate = 0.2
+    run('flaky')
+    standin.stop()
+    print(f"[Bench] Stand-in matches the DB: {'yes' if matches(standin, conn) else 'NO'}")
+
+if __name__ == "__main__":
+    main()
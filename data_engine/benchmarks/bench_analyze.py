@@ -0,0 +1,121 @@
+"""
+analyze() report latency: the old full scan + json.loads vs. the indexed search path.
+
+    python data_engine/benchmarks/bench_analyze.py [--rows 1000000] [--repeat 5]
+
+Builds a throwaway clean DB of --rows synthetic products (same title/spec shapes
+the processor produces), indexes it with storage.search and times both paths on
+a few report queries. Both must agree on count/min/avg/max.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from storage import search
+from storage.writer import connect
+from processor import PRODUCTS_SCHEMA
+
+QUERIES = [
+    ("hp elitebook 840", {}),
+    ("thinkpad", {'ram': '16GB'}),
+    ("rtx 3060", {'max_price': 250000}),
+    ("dell xps i7", {}),
+]
+
+BRANDS = [
+    ("HP", ["EliteBook 840 G5", "EliteBook 850 G6", "ProBook 450 G7", "Pavilion 15", "Omen 16", "Victus 15"]),
+    ("Lenovo", ["ThinkPad T480", "ThinkPad X1 Carbon", "IdeaPad 3", "Legion 5", "Yoga Slim 7"]),
+    ("Dell", ["Latitude 5490", "XPS 13", "XPS 15", "Inspiron 15", "Vostro 3510"]),
+    ("ASUS", ["TUF FX505", "ROG Strix G15", "VivoBook 15", "ZenBook 14"]),
+    ("Acer", ["Aspire 5", "Nitro 5", "Swift 3", "Predator Helios 300"]),
+    ("MSI", ["GF63 Thin", "Katana GF66", "Modern 14"]),
+]
+CPUS = ["i5-8350U", "i7-8650U", "i5-1135G7", "i7-1165G7", "i7-12700H", "Ryzen 5 5600H", "Ryzen 7 5800H", "Celeron"]
+GPUS = [None, None, "GTX 1650", "RTX 3050", "RTX 3060", "RTX 4060", "Iris Xe"]
+RAMS = ["8GB", "16GB", "32GB"]
+DISKS = ["256GB SSD", "512GB SSD", "1TB NVMe"]
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def build(path, rows):
+    rng = random.Random(42)
+    conn = connect(path)
+    conn.execute(PRODUCTS_SCHEMA.format(table='products'))
+    batch = []
+    for i in range(rows):
+        brand, models = rng.choice(BRANDS)
+        model = rng.choice(models)
+        specs = {'cpu': rng.choice(CPUS), 'ram': rng.choice(RAMS), 'storage': rng.choice(DISKS)}
+        gpu = rng.choice(GPUS)
+        if gpu:
+            specs['gpu'] = gpu
+        title = f"{brand} {model} {specs['cpu']} {specs['ram']} {specs['storage']} {gpu or ''} #{i}".strip()
+        batch.append((f"{i:032x}", title, 'laptop', brand.upper(), 'Unknown', json.dumps(specs),
+                      float(rng.randrange(40, 400) * 1000), 'DZD', 'kouba', f"https://x/{i}"))
+        if len(batch) == 10000:
+            conn.executemany("INSERT INTO products (hash_id, title, category, brand, model, specs, price, currency, source, link) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO products (hash_id, title, category, brand, model, specs, price, currency, source, link) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    start = time.perf_counter()
+    search.ensure_schema(conn)
+    conn.commit()
+    print(f"[Bench] Indexed {rows} products in {time.perf_counter() - start:.1f}s")
+    return conn
+
+def old_report(conn, query, filters):
+    """What analyze.py did: fetch every product, json.loads its specs, substring-match in Python."""
+    parts = query.lower().split()
+    prices = []
+    count = 0
+    for brand, model, specs_json, price, title in conn.execute("SELECT brand, model, specs, price, title FROM products"):
+        specs = json.loads(specs_json)
+        full_text = f"{title} {brand} {model} {specs.get('cpu','')} {specs.get('gpu','')} {specs.get('ram','')} {specs.get('storage','')}".lower()
+        if not all(part in full_text for part in parts):
+            continue
+        if any(specs.get(k) != v for k, v in filters.items() if k in search.SPEC_COLUMNS):
+            continue
+        if 'max_price' in filters and price > filters['max_price']:
+            continue
+        count += 1
+        if price:
+            prices.append(price)
+    if not prices:
+        return count, None, None, None
+    return count, min(prices), sum(prices) / len(prices), max(prices)
+
+def main():
+    rows = _arg('--rows', 1000000)
+    repeat = _arg('--repeat', 5)
+    path = os.path.join(tempfile.mkdtemp(), 'clean_data.db')
+    conn = build(path, rows)
+
+    for query, filters in QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            stats, _ = search.search(conn, query, filters)
+        new = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        old_stats = old_report(conn, query, filters)
+        old = time.perf_counter() - start
+
+        same = old_stats[0] == stats['count'] and old_stats[1] == stats['min'] and old_stats[3] == stats['max'] \
+            and (old_stats[2] is None) == (stats['avg'] is None) \
+            and (old_stats[2] is None or abs(old_stats[2] - stats['avg']) < 1e-6 * old_stats[2])
+        label = query + (f" {filters}" if filters else '')
+        print(f"[Bench] {label:40s} {stats['count']:>7} matches  old {old * 1000:8.1f} ms  "
+              f"indexed {new * 1000:7.2f} ms  {'same' if same else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-query latency of a fresh Chrome per query vs. the warm BrowserPool.
+
+    python data_engine/benchmarks/bench_browser_pool.py [--queries 6] [--pool-size 2] [--headful]
+
+Needs Chrome. Each "query" loads the saved debug_ouedkniss_source.html from disk
+and reads its cards, so only browser startup/reuse differs between the modes,
+not the network or the site.
+"""
+import os
+import sys
+import time
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from webdriver_manager.chrome import ChromeDriverManager
+from spiders.browser_pool import BrowserPool
+
+PAGE_URL = pathlib.Path(REPO_DIR, 'debug_ouedkniss_source.html').as_uri()
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def load_page(driver):
+    driver.get(PAGE_URL)
+    return len(driver.find_elements(By.CSS_SELECTOR, 'div.o-announ-card'))
+
+def cold_query(options):
+    # What every scrape_ouedkniss call used to do
+    start = time.perf_counter()
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    try:
+        load_page(driver)
+    finally:
+        driver.quit()
+    return time.perf_counter() - start
+
+def pooled_query(pool):
+    start = time.perf_counter()
+    with pool.driver() as driver:
+        load_page(driver)
+    return time.perf_counter() - start
+
+def summary(name, latencies):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    print(f"[Bench] {name:7s} {len(latencies)} queries: first {latencies[0]:.2f}s, p50 {p50:.2f}s, "
+          f"max {latencies[-1]:.2f}s, total {sum(latencies):.1f}s")
+
+def main():
+    queries = _arg('--queries', 6)
+    pool_size = _arg('--pool-size', 2)
+    options = Options()
+    if '--headful' not in sys.argv:
+        options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+
+    cold = [cold_query(options) for _ in range(queries)]
+
+    pool = BrowserPool(options, size=pool_size)
+    try:
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            pooled = list(executor.map(lambda _: pooled_query(pool), range(queries)))
+    finally:
+        pool.close()
+
+    summary('cold', cold)
+    summary('pooled', pooled)
+
+if __name__ == "__main__":
+    main()
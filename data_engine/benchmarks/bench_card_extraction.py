@@ -0,0 +1,89 @@
+"""
+Card extraction: per-element WebDriver calls vs. one execute_script for the whole page.
+
+    python data_engine/benchmarks/bench_card_extraction.py [--cards 60] [--repeat 5] [--headful]
+
+Needs Chrome. Loads the saved debug_ouedkniss_source.html from disk, clones its
+cards up to --cards (a scrolled results page holds a few dozen), then reads every
+card's link and outerHTML both ways and parses title/price from them locally.
+Checks that both paths return the same cards.
+"""
+import os
+import sys
+import time
+import pathlib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from webdriver_manager.chrome import ChromeDriverManager
+from spiders.laptops import CARD_SELECTOR, collect_cards
+from parsers.extractors import get_extractor
+
+PAGE_URL = pathlib.Path(REPO_DIR, 'debug_ouedkniss_source.html').as_uri()
+
+# Copies of the page's cards (with distinct links) appended next to the originals
+CLONE_CARDS_JS = """
+var cards = document.querySelectorAll(arguments[0]);
+for (var i = cards.length; i < arguments[1]; i++) {
+    var copy = cards[i % cards.length].cloneNode(true);
+    var link = copy.querySelector('a');
+    if (link) link.href = link.href + '?copy=' + i;
+    cards[0].parentNode.appendChild(copy);
+}
+return document.querySelectorAll(arguments[0]).length;
+"""
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def per_element(driver):
+    # What _scrape used to do: find_element + two get_attribute calls per card
+    cards = []
+    for item in driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR):
+        try:
+            link = item.find_element(By.TAG_NAME, 'a').get_attribute('href')
+            cards.append((link, item.get_attribute('outerHTML')))
+        except Exception:
+            continue
+    return cards
+
+def timed(name, read, driver, extractor, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cards = read(driver)
+        rows = [(link,) + tuple(extractor.extract(raw_html)[:2]) for link, raw_html in cards]
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    print(f"[Bench] {name:12s} {len(rows)} cards: best {best * 1000:.1f} ms, "
+          f"avg {sum(times) / len(times) * 1000:.1f} ms ({best / max(len(rows), 1) * 1000:.2f} ms/card)")
+    return rows
+
+def main():
+    options = Options()
+    if '--headful' not in sys.argv:
+        options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    repeat = _arg('--repeat', 5)
+
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    try:
+        driver.get(PAGE_URL)
+        count = driver.execute_script(CLONE_CARDS_JS, CARD_SELECTOR, _arg('--cards', 60))
+        print(f"[Bench] {count} cards on the page")
+        extractor = get_extractor()
+        old = timed('per-element', per_element, driver, extractor, repeat)
+        new = timed('bulk script', collect_cards, driver, extractor, repeat)
+        print(f"[Bench] Same cards: {'yes' if old == new else 'NO'}")
+    finally:
+        driver.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Near-duplicate clustering at scale: SimHash signatures + banded LSH (storage/dedup.py).
+
+    python data_engine/benchmarks/bench_dedup.py [--rows 300000] [--repost-rate 0.3] [--check 3000]
+
+Listings are drawn from the bench_analyze model/spec shapes with varied seller
+wording; --repost-rate of them are reposts of an earlier listing (reworded, price
+within a few percent). Reports signature and clustering time, candidate pairs
+compared and how many planted reposts were found. --check N also clusters the
+first N listings pairwise and compares the two.
+"""
+import os
+import sys
+import time
+import random
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from storage import dedup
+from parsers.spec_parser import SpecParser
+from bench_analyze import BRANDS, CPUS, GPUS, RAMS, DISKS, _arg
+
+WORDING = ["", "bon etat", "tres propre", "garantie 3 mois", "prix negociable", "urgent", "neuf sous emballage",
+           "avec chargeur", "clavier azerty", "batterie 4h", "livraison 58 wilayas", "echange possible"]
+
+def make_listings(rows, repost_rate):
+    rng = random.Random(42)
+    listings = []
+    origins = []
+    for i in range(rows):
+        if listings and rng.random() < repost_rate:
+            j = rng.randrange(len(listings))
+            title, price = listings[j]
+            base = title.split(' | ')[0]
+            listings.append((f"{base} | {rng.choice(WORDING)}", round(price * rng.uniform(0.97, 1.03), -2)))
+            origins.append(origins[j])
+            continue
+        brand, models = rng.choice(BRANDS)
+        gpu = rng.choice(GPUS)
+        base = f"{brand} {rng.choice(models)} {rng.choice(CPUS)} {rng.choice(RAMS)} {rng.choice(DISKS)} {gpu or ''}".strip()
+        listings.append((f"{base} | {rng.choice(WORDING)}", float(rng.randrange(40, 400) * 1000)))
+        origins.append(i)
+    return listings, origins
+
+def pairwise(signatures, prices):
+    """dedup.cluster's rule without LSH: each listing against every earlier canonical one."""
+    roots = list(range(len(signatures)))
+    for i in range(len(signatures)):
+        for j in range(i):
+            if roots[j] == j and ((signatures[i] ^ signatures[j]) & ((1 << 64) - 1)).bit_count() <= dedup.MAX_DISTANCE \
+                    and abs(prices[i] - prices[j]) <= dedup.PRICE_TOLERANCE * min(prices[i], prices[j]):
+                roots[i] = j
+                break
+    return roots
+
+def main():
+    rows = _arg('--rows', 300000)
+    listings, origins = make_listings(rows, _arg('--repost-rate', 0.3, float))
+    parser = SpecParser()
+
+    start = time.perf_counter()
+    signatures = [dedup.simhash(title, parser.parse_specs(title)) for title, _ in listings]
+    signing = time.perf_counter() - start
+    prices = [price for _, price in listings]
+
+    start = time.perf_counter()
+    roots, comparisons = dedup.cluster(signatures, prices)
+    clustering = time.perf_counter() - start
+
+    reposts = sum(1 for i, origin in enumerate(origins) if origin != i)
+    found = sum(1 for i, origin in enumerate(origins) if origin != i and roots[i] == roots[origin])
+    clusters = len(set(roots))
+    print(f"[Bench] {rows} listings: simhash {signing:.2f}s ({rows / signing:,.0f}/s), cluster {clustering:.2f}s, "
+          f"{comparisons:,} signature pairs checked (pairwise: {rows * (rows - 1) // 2:,} listing pairs)")
+    print(f"[Bench] {clusters} products after dedup; {found}/{reposts} planted reposts joined to their original")
+
+    check = _arg('--check', 0)
+    if check:
+        same = pairwise(signatures[:check], prices[:check]) == dedup.cluster(signatures[:check], prices[:check])[0]
+        print(f"[Bench] LSH vs pairwise on {check} listings: {'same' if same else 'MISMATCH'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares the product card extractors on the HTML saved in the repo.
+
+    python data_engine/benchmarks/bench_extractors.py [--repeat N]
+
+Every backend must return exactly what the bs4 reference returns; the run
+fails (exit 1) on any mismatch.
+"""
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+
+from bs4 import BeautifulSoup
+from parsers.extractors import EXTRACTORS
+
+FIXTURES = [
+    os.path.join(REPO_DIR, 'debug_item.html'),
+    os.path.join(REPO_DIR, 'debug_ouedkniss_source.html'),
+]
+
+def load_cards():
+    """Each saved card plus every card found inside the saved result pages."""
+    cards = []
+    for path in FIXTURES:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        cards.append(html)
+        soup = BeautifulSoup(html, 'html.parser')
+        cards.extend(str(el) for el in soup.select('div.o-announ-card, .product'))
+    return cards
+
+def main():
+    repeat = int(sys.argv[sys.argv.index('--repeat') + 1]) if '--repeat' in sys.argv else 50
+    cards = load_cards()
+    print(f"[Bench] {len(cards)} cards from {len(FIXTURES)} fixtures, {repeat} rounds")
+
+    extractors = []
+    for name, cls in EXTRACTORS.items():
+        try:
+            extractors.append(cls())
+        except ImportError as e:
+            print(f"[Bench] Skipping {name}: {e}")
+
+    reference = [extractors[0].extract(card) for card in cards]
+    failed = False
+    timings = {}
+    for extractor in extractors:
+        results = [extractor.extract(card) for card in cards]
+        mismatches = [i for i, (a, b) in enumerate(zip(results, reference)) if a != b]
+        for i in mismatches:
+            print(f"[Bench] MISMATCH {extractor.name} card {i}: {results[i]} != {reference[i]}")
+        failed = failed or bool(mismatches)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for card in cards:
+                extractor.extract(card)
+        timings[extractor.name] = (time.perf_counter() - start) / (repeat * len(cards))
+
+    base = timings[extractors[0].name]
+    for name, per_card in timings.items():
+        print(f"[Bench] {name:5s} {per_card * 1e6:9.1f} us/card  x{base / per_card:.1f}")
+    print(f"[Bench] Output identical: {'no' if failed else 'yes'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Price history storage: run-length price_history vs. a snapshot row per product per run.
+
+    python data_engine/benchmarks/bench_history.py [--products 20000] [--runs 60] [--change-rate 0.03]
+
+First checks the path end to end: listings saved through the spiders' save path and
+processed, then re-scraped with one price dropped and one card changed; the drop has
+to reach price_history and the replaced card's blob must not be left behind. Exits 1
+otherwise.
+
+Then simulates one processor run a day for --runs days. Each run upserts every product,
+--change-rate of them at a new price, through the products triggers. The same
+observations also go into a naive snapshot table. Reports rows and bytes for both,
+then times the rollup of everything older than 30 days.
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from storage import history
+from storage.writer import connect
+from processor import PRODUCTS_SCHEMA
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def rescrape_check():
+    """True if a re-scraped listing's new price ends up in price_history."""
+    import contextlib
+    from storage.db_setup import init_db
+    from storage.writer import DbWriter
+    from spiders.kouba import KoubaSpider
+    from processor import DataProcessor
+
+    workdir = tempfile.mkdtemp()
+    processor = DataProcessor()
+    processor.storage_dir = workdir
+    processor.raw_db, processor.clean_db = os.path.join(workdir, 'raw_data.db'), os.path.join(workdir, 'clean_data.db')
+    spider = KoubaSpider(db_path=processor.raw_db)
+
+    def scrape(prices):
+        cards = [(f"{i:032x}", f"HP EliteBook 840 G{i} i5 8GB 256GB SSD", price, f"https://example.com/{i}", f"<div>{i} {price}</div>")
+                 for i, price in enumerate(prices)]
+        writer = DbWriter(processor.raw_db).start()
+        writer.submit(spider.save_page, None, None, cards).result()
+        writer.close()
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            processor.process_all()
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        init_db(processor.raw_db, processor.clean_db)
+    scrape(['85 000 DA', '120 000 DA', '99 000 DA'])
+    # A price drop on the first listing; the others are seen again unchanged
+    scrape(['79 000 DA', '120 000 DA', '99 000 DA'])
+
+    conn = connect(processor.clean_db)
+    observed = [price for (price,) in conn.execute("SELECT price FROM price_history WHERE hash_id = ? ORDER BY id", (f"{0:032x}",))]
+    unchanged = conn.execute("SELECT COUNT(*) FROM price_history WHERE hash_id != ?", (f"{0:032x}",)).fetchone()[0]
+    conn.close()
+    raw = connect(processor.raw_db)
+    orphans = raw.execute("SELECT COUNT(*) FROM html_blobs WHERE hash NOT IN (SELECT html_hash FROM listings WHERE html_hash IS NOT NULL)").fetchone()[0]
+    raw.close()
+    ok = observed == [85000.0, 79000.0] and unchanged == 2 and not orphans
+    print(f"[Bench] Re-scrape check: price_history {observed} for the repriced listing, {unchanged} rows for the 2 unchanged, "
+          f"{orphans} orphaned blobs: {'OK' if ok else 'FAILED'}")
+    return ok
+
+def table_bytes(conn, *tables):
+    return conn.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({','.join('?' * len(tables))})", tables).fetchone()[0]
+
+def main():
+    if not rescrape_check():
+        sys.exit(1)
+
+    products = _arg('--products', 20000)
+    runs = _arg('--runs', 60)
+    change_rate = _arg('--change-rate', 0.03, float)
+    rng = random.Random(42)
+
+    conn = connect(os.path.join(tempfile.mkdtemp(), 'clean_data.db'))
+    conn.execute(PRODUCTS_SCHEMA.format(table='products'))
+    history.ensure_schema(conn)
+    conn.execute("CREATE TABLE snapshots (hash_id TEXT, market_bucket TEXT, price REAL, observed_at TIMESTAMP)")
+    conn.execute("CREATE INDEX idx_snapshots_product ON snapshots (hash_id, observed_at)")
+
+    prices = {f"{i:032x}": float(rng.randrange(40, 400) * 1000) for i in range(products)}
+    buckets = {hash_id: f"bucket-{rng.randrange(500)}" for hash_id in prices}
+    start_day = datetime(2026, 1, 1)
+    elapsed = 0.0
+    for run in range(runs):
+        for hash_id in rng.sample(list(prices), int(products * change_rate)) if run else []:
+            prices[hash_id] = round(prices[hash_id] * rng.uniform(0.85, 1.1), -2)
+        day = (start_day + timedelta(days=run)).strftime('%Y-%m-%d 03:00:00')
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM price_history").fetchone()[0]
+        rows = [(hash_id, buckets[hash_id], price) for hash_id, price in prices.items()]
+        started = time.perf_counter()
+        conn.executemany("""
+            INSERT INTO products (hash_id, market_bucket, price) VALUES (?, ?, ?)
+            ON CONFLICT(hash_id) DO UPDATE SET market_bucket = excluded.market_bucket, price = excluded.price
+        """, rows)
+        conn.commit()
+        elapsed += time.perf_counter() - started
+        # Pretend each run happened on its own day
+        conn.execute("UPDATE price_history SET observed_at = ? WHERE id > ?", (day, last_id))
+        conn.executemany("INSERT INTO snapshots VALUES (?, ?, ?, ?)", [row + (day,) for row in rows])
+        conn.commit()
+
+    history_rows = conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+    snapshot_rows = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+    history_bytes = table_bytes(conn, 'price_history', 'idx_history_product', 'idx_history_bucket')
+    snapshot_bytes = table_bytes(conn, 'snapshots', 'idx_snapshots_product')
+    print(f"[Bench] {products} products x {runs} runs, {change_rate:.0%} price changes per run "
+          f"({elapsed / runs * 1000:.0f} ms per run of upserts through the triggers)")
+    print(f"[Bench] snapshots:     {snapshot_rows:>9,} rows {snapshot_bytes / 1e6:8.1f} MB")
+    print(f"[Bench] price_history: {history_rows:>9,} rows {history_bytes / 1e6:8.1f} MB")
+
+    started = time.perf_counter()
+    stats = history.rollup(conn, raw_days=30, daily_days=45, now=start_day + timedelta(days=runs))
+    conn.commit()
+    remaining = conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+    print(f"[Bench] rollup: {stats['observations']:,} observations -> {stats['days']} daily / {stats['weeks']} weekly rows "
+          f"in {time.perf_counter() - started:.2f}s, {remaining:,} history rows left")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Deal scoring against the market_stats aggregates vs. averaging the bucket's rows.
+
+    python data_engine/benchmarks/bench_market.py [--rows 200000] [--lookups 10000]
+
+Inserts --rows synthetic products (shapes from bench_analyze) once without and
+once with the market triggers, to show what keeping the aggregates current costs
+the processor, then scores --lookups random listings both ways. Both must agree.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import statistics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from storage import market
+from storage.writer import connect
+from processor import PRODUCTS_SCHEMA
+from bench_analyze import BRANDS, CPUS, GPUS, RAMS, DISKS, _arg
+
+def make_rows(n):
+    rng = random.Random(42)
+    rows = []
+    for i in range(n):
+        brand, models = rng.choice(BRANDS)
+        specs = {'cpu': rng.choice(CPUS), 'ram': rng.choice(RAMS), 'storage': rng.choice(DISKS)}
+        gpu = rng.choice(GPUS)
+        if gpu:
+            specs['gpu'] = gpu
+        title = f"{brand} {rng.choice(models)} {specs['cpu']} {specs['ram']} {specs['storage']} {gpu or ''}".strip()
+        rows.append((f"{i:032x}", title, 'laptop', brand.upper(), 'Unknown', json.dumps(specs),
+                     float(rng.randrange(40, 400) * 1000), 'DZD', 'kouba', f"https://x/{i}",
+                     market.bucket_key(title, brand, 'Unknown', specs)))
+    return rows
+
+def insert(rows, triggers):
+    conn = connect(os.path.join(tempfile.mkdtemp(), 'clean_data.db'))
+    conn.execute(PRODUCTS_SCHEMA.format(table='products'))
+    if triggers:
+        market.ensure_schema(conn)
+    start = time.perf_counter()
+    for i in range(0, len(rows), 500):
+        conn.executemany("INSERT INTO products (hash_id, title, category, brand, model, specs, price, currency, source, link, market_bucket) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows[i:i + 500])
+    conn.commit()
+    return conn, time.perf_counter() - start
+
+def score_by_scan(conn, bucket, price):
+    prices = [p for (p,) in conn.execute("SELECT price FROM products WHERE market_bucket = ? AND price > 0", (bucket,))]
+    if len(prices) < 3:
+        return None
+    return market.classify(price, statistics.mean(prices))
+
+def main():
+    rows = make_rows(_arg('--rows', 200000))
+    lookups = _arg('--lookups', 10000)
+
+    _, plain = insert(rows, triggers=False)
+    conn, kept = insert(rows, triggers=True)
+    buckets = conn.execute("SELECT COUNT(*) FROM market_stats").fetchone()[0]
+    print(f"[Bench] insert {len(rows)} products: {len(rows) / plain:,.0f} rows/s plain, "
+          f"{len(rows) / kept:,.0f} rows/s with market triggers ({buckets} buckets)")
+
+    sample = random.Random(7).sample(rows, lookups)
+    start = time.perf_counter()
+    scan = [score_by_scan(conn, row[-1], row[6] * 0.9) for row in sample]
+    scan_ms = (time.perf_counter() - start) * 1000 / lookups
+    start = time.perf_counter()
+    lookup = [market.score_deal(conn, row[-1], row[6] * 0.9) for row in sample]
+    lookup_ms = (time.perf_counter() - start) * 1000 / lookups
+
+    print(f"[Bench] score {lookups} listings: bucket scan {scan_ms:.3f} ms, aggregate lookup {lookup_ms:.4f} ms per listing "
+          f"({'same' if scan == lookup else 'MISMATCH'})")
+
+if __name__ == "__main__":
+    main()
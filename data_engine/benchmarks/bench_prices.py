@@ -0,0 +1,67 @@
+"""
+Price normalization throughput: per-row clean_price vs. vectorized clean_prices,
+plus the per-bucket outlier flag.
+
+    python data_engine/benchmarks/bench_prices.py [--rows 1000000] [--distinct 20000]
+
+Prices are drawn from --distinct strings in the formats seen on Kouba/Ouedkniss
+("6m", "60k", "85 000 DA", "8", "$500", ...). clean_price runs once with its LRU
+cache and once with it disabled; clean_prices must give the same values.
+"""
+import os
+import sys
+import time
+import random
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from parsers.price_cleaner import clean_price, price_cache
+from parsers.price_batch import clean_prices, outlier_mask
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def make_prices(rows, distinct):
+    rng = random.Random(42)
+    formats = [
+        lambda v: f"{v // 10000}m", lambda v: f"{v / 10000:.1f}m", lambda v: f"{v // 1000}k",
+        lambda v: f"{v // 1000} {v % 1000:03d} DA", lambda v: f"{v} DZD", lambda v: str(v // 10000),
+        lambda v: f"{v:,}".replace(',', '.'), lambda v: f"${v // 250}", lambda v: '',
+    ]
+    pool = [rng.choice(formats)(rng.randrange(30, 600) * 1000) for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(rows)]
+
+def time_scalar(prices, cache_size):
+    price_cache.clear()
+    price_cache.resize(cache_size)
+    start = time.perf_counter()
+    values = [clean_price(p) for p in prices]
+    return values, time.perf_counter() - start
+
+def main():
+    rows = _arg('--rows', 1000000)
+    prices = make_prices(rows, _arg('--distinct', 20000))
+
+    scalar, cached = time_scalar(prices, 4096)
+    _, uncached = time_scalar(prices, 0)
+    start = time.perf_counter()
+    batch = clean_prices(prices)
+    vectorized = time.perf_counter() - start
+
+    expected = np.array([np.nan if v is None else float(v) for v in scalar])
+    same = np.array_equal(expected, batch.to_numpy(), equal_nan=True)
+    print(f"[Bench] {rows} prices: clean_price {rows / uncached:,.0f}/s (no cache), {rows / cached:,.0f}/s (LRU 4096), "
+          f"clean_prices {rows / vectorized:,.0f}/s  {'same' if same else 'MISMATCH'}")
+
+    rng = np.random.default_rng(7)
+    buckets = rng.integers(0, 2000, rows).astype(str)
+    for method in ('iqr', 'mad'):
+        start = time.perf_counter()
+        flags = outlier_mask(batch, buckets, method)
+        print(f"[Bench] outlier_mask({method}) over 2000 buckets: {time.perf_counter() - start:.2f}s, {int(flags.sum())} flagged")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Spec extraction throughput: the original pattern-by-pattern parse vs. SpecParser.
+
+    python data_engine/benchmarks/bench_spec_parser.py [--rows 50000]
+
+reference: re.search per pattern, IGNORECASE, list order (what parse_specs did)
+anchored:  SpecParser with the cache off - lowercase patterns searched from their
+           first anchor literal, skipped when a title has none
+cached:    SpecParser with its default LRU cache, on the same titles
+
+Both must return the same dicts on REGRESSION_TITLES and on --rows synthetic titles
+(benchmarks/fixtures.py); exits 1 otherwise.
+"""
+import os
+import re
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from parsers.spec_parser import SpecParser
+from benchmarks import fixtures
+
+# Edge cases for pattern priority and anchor offsets, plus non-ASCII titles
+REGRESSION_TITLES = [
+    "ASUS TUF FX505 Ryzen 5 3550H 16GB 512SSD GTX1650",
+    "Dell XPS 13 i7-1165G7 32GB 1TB NVMe Iris Xe",
+    "HP Laptop 15 8GB RAM 256GB SSD Celeron N4020",
+    "HP EliteBook 840 G5 i5 8GB 256SSD",
+    "HP EliteBook 840 G5 i5-8350U 8GB 256GB SSD",
+    "Lenovo ThinkPad T480 i5-8250U 16 GB RAM SSD 512GB UHD 620",
+    "MacBook Pro M1 16GB 512GB SSD",
+    "MacBook Pro M3 Max 36GB 1TB SSD",
+    "MacBook Air M2 8GB 256 GB SSD",
+    "Celeron N100 laptop with i3-1215U backup 4GB",
+    "MSI Katana RTX 4060 Laptop i7-12650H 16GB 1TB SSD",
+    "Gaming PC Ryzen 7 5800X RTX3070 Ti 32GB 2TB HDD 500GB SSD",
+    "ASUS ROG Radeon RX 6800M Ryzen 9 5900HX 16GB 1 TB NVMe",
+    "Acer Aspire 5 Vega 8 Ryzen 5 3500U 8GB HDD 1000GB",
+    "Pentium Gold 4GB 128GB SSD",
+    "Athlon Silver 3050U 4 GB",
+    "gtx 1050 ti i5-7300hq 8gb 1tb hdd",
+    "Workstation Xeon 64GB RAM 2TB SSD Quadro",
+    "Laptop Lexus NS15N Celeron N100 8Go 512Go 15.6",
+    "Unknown Product",
+    "",
+    "PC portable HP 250 G8 i3-1005G1 12GB 256GB NVMe UHD",
+    "rtx3060 super ryzen 7 7840HS 32gb ssd 1024gb",
+    "i9-13980HX 64GB 2x1TB NVMe RTX 4090",
+    "M2 Pro 512GB SSD 16GB",
+    "HDD 500GB SSD 1TB 1234GB",
+    "SSD 512GB 16GB RAM",
+    "Dell Précision 5530 i7-8850H 32GB 512GB SSD état neuf",
+    "Lenovo Légion 5 – Ryzen 7 5800H 16GB RTX 3060",
+    "HP ProBook ١٢٣ i5-1135G7 8GB",
+]
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def parse_specs_reference(patterns, title):
+    """The original implementation: one re.search per pattern until a category matches."""
+    specs = {}
+
+    # CPU Extraction
+    for pattern in patterns['cpu']:
+        match = re.search(pattern, title, re.IGNORECASE)
+        if match:
+            specs['cpu'] = match.group(1).strip()
+            break
+
+    # RAM Extraction
+    for pattern in patterns['ram']:
+        match = re.search(pattern, title, re.IGNORECASE)
+        if match:
+            specs['ram'] = f"{match.group(1)}GB"
+            break
+
+    # Storage Extraction
+    for pattern in patterns['storage']:
+        match = re.search(pattern, title, re.IGNORECASE)
+        if match:
+            if 'TB' in match.group(0).upper():
+                 specs['storage'] = f"{match.group(1)}TB {match.group(2) if match.lastindex >= 2 else ''}".strip()
+            else:
+                # Handle "SSD 512GB" vs "512GB SSD"
+                if match.lastindex >= 2:
+                    val = match.group(1) if match.group(1).isdigit() else match.group(2)
+                    type_ = match.group(2) if match.group(1).isdigit() else match.group(1)
+                    specs['storage'] = f"{val}GB {type_}"
+                else:
+                    specs['storage'] = match.group(0)
+            break
+
+    # GPU Extraction
+    for pattern in patterns['gpu']:
+        match = re.search(pattern, title, re.IGNORECASE)
+        if match:
+            specs['gpu'] = match.group(1).strip()
+            break
+
+    return specs
+
+def timed(fn, titles, repeat=5):
+    """Best of repeat passes, in us/title."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for title in titles:
+            fn(title)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(titles) * 1e6
+
+def main():
+    rows = _arg('--rows', 50000)
+    titles = fixtures.titles(rows)
+    distinct = sorted(set(titles))
+    uncached = SpecParser(cache_size=0)
+
+    def reference(title):
+        return parse_specs_reference(uncached.patterns, title)
+
+    mismatches = [t for t in REGRESSION_TITLES + distinct if uncached.parse_specs(t) != reference(t)]
+    print(f"[Bench] {len(REGRESSION_TITLES)} regression + {len(distinct)} distinct synthetic titles: "
+          f"{len(mismatches)} mismatches")
+    for t in mismatches[:10]:
+        print(f"  {t!r}: {uncached.parse_specs(t)} != {reference(t)}")
+
+    # Distinct titles for the uncached paths, every title (reposts included) for the cached one
+    ref_us = timed(reference, distinct)
+    anchored_us = timed(uncached.parse_specs, distinct)
+    cached = SpecParser()
+    cached_us = timed(cached.parse_specs, titles, repeat=1)
+    print(f"[Bench] reference {ref_us:.2f} us/title, anchored {anchored_us:.2f} us/title "
+          f"({ref_us / anchored_us:.2f}x), cached {cached_us:.2f} us/title over {rows} titles "
+          f"({cached.cache.stats()['hit_rate']:.0%} hits)")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Raw listing insert throughput: the old per-row pattern vs. the shared DbWriter.
+
+    python data_engine/benchmarks/bench_writer.py [--rows 20000] [--page 24]
+
+old:    default journal/synchronous, one execute() per row, commit per page of
+        --page rows (what the spiders did)
+writer: storage.writer.DbWriter - WAL, synchronous=NORMAL, executemany batches
+        from a queue fed by the caller
+
+Each runs once alone and once next to a reader thread that keeps querying the
+table (like analyze.py during a scrape); reader queries/s are reported too.
+"""
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import tempfile
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from storage.db_setup import init_db
+from storage.writer import DbWriter, INSERT_LISTING_SQL
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+def make_rows(n):
+    rows = []
+    for i in range(n):
+        link = f"https://koubacomputer.store/product/laptop-{i}/"
+        rows.append((hashlib.md5(link.encode('utf-8')).hexdigest(), f"HP EliteBook 840 G5 i5 8GB #{i}",
+                     f"{60 + i % 90} 000 DA", link, None, 'kouba'))
+    return rows
+
+def fresh_db(wal):
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'raw_data.db')
+    init_db(path, os.path.join(tmp, 'clean_data.db'))
+    if not wal:
+        # init_db now creates WAL databases; put the old default back for the baseline
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+    return path
+
+def write_old(path, rows, page):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    for i, row in enumerate(rows, 1):
+        c.execute(INSERT_LISTING_SQL, row)
+        if i % page == 0:
+            conn.commit()
+    conn.commit()
+    conn.close()
+
+def write_writer(path, rows, page):
+    writer = DbWriter(path).start()
+    for i in range(0, len(rows), page):
+        writer.insert(INSERT_LISTING_SQL, rows[i:i + page])
+    writer.close()
+
+class Reader(threading.Thread):
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.queries = 0
+        self.errors = 0
+        self.running = True
+
+    def run(self):
+        conn = sqlite3.connect(self.path, timeout=0.1)
+        while self.running:
+            try:
+                conn.execute("SELECT COUNT(*), AVG(LENGTH(title)) FROM listings WHERE title LIKE '%i5%'").fetchone()
+                self.queries += 1
+            except sqlite3.OperationalError:
+                self.errors += 1
+        conn.close()
+
+def run(name, write, rows, page, with_reader):
+    path = fresh_db(wal=(name == 'writer'))
+    reader = Reader(path) if with_reader else None
+    if reader:
+        reader.start()
+    start = time.perf_counter()
+    try:
+        write(path, rows, page)
+        error = None
+    except sqlite3.OperationalError as e:
+        error = e
+    elapsed = time.perf_counter() - start
+    if reader:
+        reader.running = False
+        reader.join()
+
+    count = sqlite3.connect(path).execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+    label = f"{name} + reader" if with_reader else name
+    line = f"[Bench] {label:16s} {count} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)"
+    if reader:
+        line += f", reader {reader.queries / elapsed:.0f} queries/s ({reader.errors} lock errors)"
+    if error:
+        line += f", writer failed: {error}"
+    print(line)
+
+def main():
+    rows = make_rows(_arg('--rows', 20000))
+    page = _arg('--page', 24)
+    for with_reader in (False, True):
+        run('old', write_old, rows, page, with_reader)
+        run('writer', write_writer, rows, page, with_reader)
+
+if __name__ == "__main__":
+    main()
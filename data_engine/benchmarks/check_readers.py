@@ -0,0 +1,78 @@
+"""
+Read-only raw DB tools (inspect_raw.py, dump_item.py) against both raw DB layouts.
+
+    python data_engine/benchmarks/check_readers.py
+
+legacy:  listings with inline raw_html only - no html_hash column, no html_blobs
+current: init_db's schema, card HTML saved through DbWriter.save_listings
+
+Each DB is made read-only on disk before the tools open it, so nothing can migrate
+it first. Both tools have to exit 0 and show the card; exits 1 otherwise.
+"""
+import os
+import sys
+import stat
+import sqlite3
+import tempfile
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+
+from storage.db_setup import init_db
+from storage.writer import DbWriter
+
+CARD = '<div class="card"><h3>Dell Latitude 7490 i7-8650U 16GB</h3><span>85 000 DA</span></div>'
+
+def legacy_db(path):
+    """Raw DB as created before html_blobs existed."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE listings (
+            id TEXT PRIMARY KEY, title TEXT, price TEXT, link TEXT UNIQUE,
+            source TEXT, raw_html TEXT, scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("INSERT INTO listings (id, title, price, link, source, raw_html) VALUES (?, ?, ?, ?, ?, ?)",
+                  ('a1', 'Dell Latitude 7490', '85000', 'https://example.dz/a1', 'kouba', CARD))
+    conn.commit()
+    conn.close()
+
+def current_db(path):
+    init_db(path, os.path.join(os.path.dirname(path), 'clean.db'))
+    writer = DbWriter(path).start()
+    card = ('a1', 'Dell Latitude 7490', '85000', 'https://example.dz/a1', CARD)
+    writer.submit(lambda db: db.save_listings([card], 'kouba')).result()
+    writer.close()
+
+def run_tool(script, db_path, cwd):
+    result = subprocess.run([sys.executable, os.path.join(ROOT_DIR, script), db_path],
+                            cwd=cwd, capture_output=True, text=True, encoding='utf-8')
+    if result.returncode != 0:
+        print(f"  {script}: exit {result.returncode}\n{result.stderr.strip()}")
+        return False
+    if script == 'dump_item.py':
+        with open(os.path.join(cwd, 'debug_item.html'), encoding='utf-8') as f:
+            ok = f.read() == CARD
+    else:
+        ok = 'Dell Latitude 7490 i7-8650U' in result.stdout
+    if not ok:
+        print(f"  {script}: card HTML missing from output")
+    return ok
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, build in (('legacy', legacy_db), ('current', current_db)):
+            db_path = os.path.join(tmp, f"{name}.db")
+            build(db_path)
+            os.chmod(db_path, stat.S_IRUSR)
+            for script in ('inspect_raw.py', 'dump_item.py'):
+                passed = run_tool(script, db_path, tmp)
+                print(f"[Check] {name:8s} {script:15s} {'OK' if passed else 'FAILED'}")
+                ok = ok and passed
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Synthetic raw listings for the benchmarks, built on the card HTML saved in the repo:
+Ouedkniss cards from debug_ouedkniss_source.html, Kouba cards from debug_item.html
+(server/debug_kouba_source.html is the search page they're listed on; its own
+"no products" state holds no cards). Each card gets a generated title, price and link
+in place of its own, so the corpus is as large as needed but has the real markup.
+"""
+import os
+import sys
+import random
+import hashlib
+
+from bs4 import BeautifulSoup
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parsers.extractors import TITLE_SELECTOR, PRICE_SELECTOR
+from bench_analyze import BRANDS, CPUS, GPUS, RAMS, DISKS
+from bench_dedup import WORDING
+from bench_prices import make_prices
+
+OUEDKNISS_PAGE = os.path.join(REPO_DIR, 'debug_ouedkniss_source.html')
+KOUBA_CARD = os.path.join(REPO_DIR, 'debug_item.html')
+KOUBA_PAGE = os.path.join(REPO_DIR, 'server', 'debug_kouba_source.html')
+
+TITLE, PRICE, LINK = '@@TITLE@@', '@@PRICE@@', '@@LINK@@'
+
+# Listings spread over the sources about like a real run
+SOURCE_SHARE = {'ouedkniss': 0.7, 'kouba': 0.3}
+LINK_PREFIX = {'ouedkniss': 'https://www.ouedkniss.com/', 'kouba': 'https://koubacomputer.store/shop/laptops/'}
+
+def _template(card):
+    """The card with its title, price and first link swapped for placeholders."""
+    soup = BeautifulSoup(card, 'html.parser')
+    title = soup.select_one('h3.o-announ-card-title') or soup.select_one(TITLE_SELECTOR)
+    title.string = TITLE
+    price = soup.select_one(PRICE_SELECTOR)
+    if price is None:
+        # Kouba's saved card is out of stock, without a price element
+        price = soup.new_tag('span', attrs={'class': 'price'})
+        soup.find().append(price)
+    price.string = PRICE
+    soup.select_one('a')['href'] = LINK
+    return str(soup)
+
+def card_templates():
+    """{source: [template, ...]} from the saved pages."""
+    with open(OUEDKNISS_PAGE, encoding='utf-8') as f:
+        page = BeautifulSoup(f.read(), 'html.parser')
+    with open(KOUBA_CARD, encoding='utf-8') as f:
+        kouba = f.read()
+    return {
+        'ouedkniss': [_template(str(card)) for card in page.select('div.o-announ-card')],
+        'kouba': [_template(kouba)],
+    }
+
+def titles(rows, seed=42):
+    rng = random.Random(seed)
+    result = []
+    for i in range(rows):
+        brand, models = rng.choice(BRANDS)
+        gpu = rng.choice(GPUS)
+        title = f"{brand} {rng.choice(models)} {rng.choice(CPUS)} {rng.choice(RAMS)} {rng.choice(DISKS)} {gpu or ''}"
+        result.append(f"{' '.join(title.split())} {rng.choice(WORDING)}".strip())
+    return result
+
+def prices(rows):
+    """Price strings in the formats seen on the sites, some foreign or empty."""
+    return make_prices(rows, max(rows // 50, 100))
+
+def corpus(rows, seed=42, html_only=0.1, chunk=10000):
+    """
+    Chunks of cards as the spiders hand them to the writer: (source, (item_id, title,
+    price_str, link, html)). html_only of them lost title/price at scrape time, so the
+    processor has to extract them from the HTML.
+    """
+    rng = random.Random(seed)
+    templates = card_templates()
+    all_titles = titles(rows, seed)
+    all_prices = prices(rows)
+    sources = list(SOURCE_SHARE)
+    weights = list(SOURCE_SHARE.values())
+    for start in range(0, rows, chunk):
+        cards = []
+        for i in range(start, min(start + chunk, rows)):
+            source = rng.choices(sources, weights)[0]
+            link = f"{LINK_PREFIX[source]}listing-{i}"
+            title, price = all_titles[i], all_prices[i] or None
+            html = (rng.choice(templates[source])
+                    .replace(TITLE, title).replace(PRICE, price or '').replace(LINK, link))
+            if rng.random() < html_only:
+                title, price = 'Unknown Product', None
+            cards.append((source, (hashlib.md5(link.encode('utf-8')).hexdigest(), title, price, link, html)))
+        yield cards
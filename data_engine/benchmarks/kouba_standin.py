@@ -0,0 +1,160 @@
+"""
+Local HTTP stand-in for koubacomputer.store, built from the saved pages in the repo.
+
+    python data_engine/benchmarks/kouba_standin.py --serve [--port 8765]
+    python data_engine/benchmarks/kouba_standin.py [--queries 10] [--latency 0.2]
+
+Search pages 1..--pages-with-products return server/debug_kouba_source.html with
+--cards copies of debug_item.html (unique links per query/page) in place of the
+"no products" block; later pages return the saved page untouched. --latency adds
+a fixed server-side delay per request to stand in for the real network.
+Responses carry an ETag and Last-Modified and answer matching conditional
+requests with 304 (--no-etag serves plain 200s, to exercise body-hash skips).
+
+Without --serve it runs KoubaSpider against the stand-in twice (one connection,
+no concurrency vs. the pooled concurrent mode) into a throwaway raw DB and
+prints pages/s for each, then repeats the concurrent run on the same DB to show
+unchanged pages being skipped.
+"""
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+
+NO_PRODUCTS_BLOCK = '<div class="woocommerce-no-products-found">'
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+class StandIn:
+    def __init__(self, port=0, cards=12, pages_with_products=3, latency=0.0, etag=True):
+        with open(os.path.join(REPO_DIR, 'server', 'debug_kouba_source.html'), encoding='utf-8') as f:
+            self.page = f.read()
+        with open(os.path.join(REPO_DIR, 'debug_item.html'), encoding='utf-8') as f:
+            self.card = f.read()
+        self.cards = cards
+        self.pages_with_products = pages_with_products
+        self.latency = latency
+        self.etag = etag
+        self.last_modified = 'Sat, 17 Oct 2026 22:00:00 GMT'
+        self.requests = 0
+        self.not_modified = 0
+        self.connections = set()
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive, so connection reuse is visible
+
+            def do_GET(self):
+                standin.requests += 1
+                standin.connections.add(self.client_address)
+                if standin.latency:
+                    time.sleep(standin.latency)
+                body = standin.render(self.path).encode('utf-8')
+                if standin.etag:
+                    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                    if (self.headers.get('If-None-Match') == etag
+                            or self.headers.get('If-Modified-Since') == standin.last_modified):
+                        standin.not_modified += 1
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.end_headers()
+                        return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=UTF-8')
+                if standin.etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', standin.last_modified)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def render(self, path):
+        parsed = urllib.parse.urlparse(path)
+        parts = parsed.path.strip('/').split('/')
+        page = int(parts[1]) if len(parts) > 1 and parts[0] == 'page' else 1
+        query = urllib.parse.parse_qs(parsed.query).get('s', [''])[0]
+        if page > self.pages_with_products:
+            return self.page
+
+        slug = urllib.parse.quote(query.replace(' ', '-'))
+        cards = []
+        for i in range(self.cards):
+            card = self.card.replace('laptop-stream-lexus', f'{slug}-p{page}-{i}-lexus')
+            card = card.replace('</li>', f'<span class="price">{60 + i}k</span></li>')
+            cards.append(card)
+        products = '<ul class="products">' + ''.join(cards) + '</ul>'
+        return self.page.replace(NO_PRODUCTS_BLOCK, products + NO_PRODUCTS_BLOCK, 1)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+def run_spider(standin, queries, raw_path=None, **kwargs):
+    from storage.db_setup import init_db
+    from spiders.kouba import KoubaSpider
+
+    if raw_path is None:
+        tmp = tempfile.mkdtemp()
+        raw_path = os.path.join(tmp, 'raw_data.db')
+        init_db(raw_path, os.path.join(tmp, 'clean_data.db'))
+    spider = KoubaSpider(site=standin.url, db_path=raw_path, **kwargs)
+    standin.raw_path = raw_path
+
+    standin.requests = 0
+    standin.not_modified = 0
+    standin.connections = set()
+    start = time.perf_counter()
+    saved = spider.scrape_many(queries)
+    return saved, time.perf_counter() - start, standin.requests, len(standin.connections)
+
+def main():
+    standin = StandIn(
+        port=_arg('--port', 8765 if '--serve' in sys.argv else 0),
+        cards=_arg('--cards', 12),
+        pages_with_products=_arg('--pages-with-products', 2),
+        latency=_arg('--latency', 0.2, float),
+        etag='--no-etag' not in sys.argv,
+    )
+    if '--serve' in sys.argv:
+        print(f"[StandIn] Serving Kouba stand-in at {standin.url}")
+        standin.server.serve_forever()
+        return
+
+    standin.start()
+    queries = [f"laptop {i}" for i in range(_arg('--queries', 10))]
+    concurrent = dict(max_concurrency=_arg('--concurrency', 8), rate_limit=_arg('--rate-limit', 0, float))
+    results = {}
+    for name, kwargs in [('sequential', dict(max_concurrency=1, rate_limit=0)),
+                         ('concurrent', concurrent)]:
+        saved, elapsed, requests_made, connections = run_spider(standin, queries, **kwargs)
+        results[name] = (saved, elapsed, requests_made, connections, standin.not_modified)
+    # Same DB as the concurrent run, so every page is already in its page cache
+    saved, elapsed, requests_made, connections = run_spider(standin, queries, raw_path=standin.raw_path, **concurrent)
+    results['repeat'] = (saved, elapsed, requests_made, connections, standin.not_modified)
+    standin.stop()
+
+    for name, (saved, elapsed, requests_made, connections, not_modified) in results.items():
+        print(f"[Bench] {name:10s} {saved} cards, {requests_made} pages ({not_modified} x 304) in {elapsed:.2f}s "
+              f"({requests_made / elapsed:.1f} pages/s) over {connections} connections")
+
+if __name__ == "__main__":
+    main()
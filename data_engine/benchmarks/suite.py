@@ -0,0 +1,273 @@
+"""
+Regression suite for the data engine's hot paths on a synthetic corpus (fixtures.py).
+
+    python data_engine/benchmarks/suite.py [--rows 10000] [--stages clean_price,parse_specs,...]
+        [--out results.json] [--baseline FILE] [--save-baseline] [--require-baseline] [--tolerance 0.15]
+        [--profile DIR] [--workers 1] [--keep DIR]
+
+--rows is the corpus size (10000, 100000 and 1000000 are the reference scales).
+Stages, in order; each reports seconds and items/s (best of 3 for the in-memory ones):
+  spider_insert  the spiders' save path (LaptopSpider.save_cards / KoubaSpider.save_page
+                 on a DbWriter) building the raw DB, a page of cards per call
+  clean_price    clean_price over every price string, as the processor calls it
+  clean_prices   the vectorized parsers.price_batch.clean_prices over the same strings
+  parse_specs    SpecParser.parse_specs over every title
+  process_all    DataProcessor.process_all on the raw DB into an empty clean DB
+  analyze        analyze() for a fixed set of queries on the processed DB
+process_all and analyze need the DBs of the stages before them, so those run anyway.
+
+Results are written as JSON (--out). They are compared with the baseline for the
+same --rows (--baseline, by default benchmarks/baselines/<rows>.json if it exists):
+a stage whose throughput fell by more than --tolerance is a regression, and the
+run exits 1. --save-baseline stores this run as that baseline. No baseline is
+committed: throughput depends on the machine, so record one on the machine that
+runs the check (--save-baseline once per scale). Without one the run only reports;
+--require-baseline (for CI) makes a missing or unusable baseline exit 1 as well.
+--profile DIR runs each stage under cProfile and writes DIR/<stage>-<rows>.prof
+(open with snakeviz, or flameprof for a flame graph), printing the top functions.
+Profiled timings are marked as such, never compared with nor saved as a baseline.
+"""
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BASE_DIR)
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import fixtures
+
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+# In-memory stages are short; their best of REPEAT runs is kept
+REPEAT = 3
+STAGES = ['spider_insert', 'clean_price', 'clean_prices', 'parse_specs', 'process_all', 'analyze']
+
+# Spread over the brands, specs and filters analyze() is used with
+QUERIES = [
+    ("hp elitebook", {}), ("thinkpad", {'ram': '16GB'}), ("dell xps", {}), ("legion", {'gpu': 'RTX 3060'}),
+    ("asus tuf", {'max_price': 150000}), ("i7 16gb", {}), ("ryzen 5", {'min_price': 80000}),
+    ("macbook", {}), ("omen", {}), ("nitro 5", {'storage': '512GB SSD'}),
+]
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+@contextlib.contextmanager
+def quiet():
+    # A real file: analyze() reconfigures stdout's encoding
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Suite:
+    def __init__(self, rows, workdir, workers=1, profile_dir=None):
+        self.rows = rows
+        self.workdir = workdir
+        self.workers = workers
+        self.profile_dir = profile_dir
+        self.raw_db = os.path.join(workdir, 'raw_data.db')
+        self.clean_db = os.path.join(workdir, 'clean_data.db')
+        self.results = {}
+        self.prices = fixtures.prices(rows)
+        self.titles = fixtures.titles(rows)
+
+    def timed(self, stage, fn, items, repeat=1):
+        """Runs fn() (quietly, profiled with --profile) and records its best time of repeat for items."""
+        profiler = cProfile.Profile() if self.profile_dir else None
+        times = []
+        with quiet():
+            for _ in range(repeat):
+                start = time.perf_counter()
+                if profiler:
+                    profiler.enable()
+                fn()
+                if profiler:
+                    profiler.disable()
+                times.append(time.perf_counter() - start)
+        self.record(stage, min(times), items, profiler)
+
+    def record(self, stage, seconds, items, profiler=None):
+        self.results[stage] = {'seconds': round(seconds, 4), 'items': items, 'per_sec': round(items / seconds, 1) if seconds else None}
+        print(f"[Suite] {stage:14s} {items:>9,} items in {seconds:8.2f}s ({items / seconds if seconds else 0:>12,.0f}/s)")
+        if profiler:
+            path = os.path.join(self.profile_dir, f"{stage}-{self.rows}.prof")
+            profiler.dump_stats(path)
+            pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(15)
+            print(f"[Suite] Profile written to {path}")
+
+    def spider_insert(self):
+        """Raw DB through the spiders' own save methods; only the save calls are timed."""
+        from storage.db_setup import init_db
+        from storage.writer import DbWriter
+        from spiders.kouba import KoubaSpider
+        from spiders.laptops import LaptopSpider
+
+        with quiet():
+            init_db(self.raw_db, self.clean_db)
+        kouba, laptops = KoubaSpider(db_path=self.raw_db), LaptopSpider()
+        writer = DbWriter(self.raw_db).start()
+        profiler = cProfile.Profile() if self.profile_dir else None
+        seconds = 0.0
+        for chunk in fixtures.corpus(self.rows):
+            pages = {'kouba': [], 'ouedkniss': []}
+            for source, card in chunk:
+                pages[source].append(card)
+            # 24 cards a page, like a results page
+            calls = [(kouba.save_page, (None, None, cards[i:i + 24])) if source == 'kouba' else (laptops.save_cards, (cards[i:i + 24],))
+                     for source, cards in pages.items() for i in range(0, len(cards), 24)]
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            for future in [writer.submit(fn, *args) for fn, args in calls]:
+                future.result()
+            if profiler:
+                profiler.disable()
+            seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        writer.close()
+        seconds += time.perf_counter() - start
+        self.record('spider_insert', seconds, self.rows, profiler)
+
+    def clean_price(self):
+        from parsers.price_cleaner import clean_price, price_cache
+
+        def run():
+            # Cold cache each round, as at the start of a processor run
+            price_cache.clear()
+            [clean_price(p) for p in self.prices]
+        self.timed('clean_price', run, len(self.prices), repeat=REPEAT)
+
+    def clean_prices(self):
+        from parsers.price_batch import clean_prices
+        self.timed('clean_prices', lambda: clean_prices(self.prices), len(self.prices), repeat=REPEAT)
+
+    def parse_specs(self):
+        from parsers.spec_parser import SpecParser
+
+        def run():
+            parser = SpecParser()
+            [parser.parse_specs(t) for t in self.titles]
+        self.timed('parse_specs', run, len(self.titles), repeat=REPEAT)
+
+    def process_all(self):
+        from processor import DataProcessor
+        processor = DataProcessor()
+        processor.storage_dir, processor.raw_db, processor.clean_db = self.workdir, self.raw_db, self.clean_db
+        self.timed('process_all', lambda: processor.process_all(workers=self.workers), self.rows)
+
+    def analyze(self):
+        import analyze
+        analyze.CLEAN_DB = self.clean_db
+        # First query opens the DB cold; not part of the timing
+        query, filters = QUERIES[0]
+        with quiet():
+            analyze.analyze(query, **filters)
+        self.timed('analyze', lambda: [analyze.analyze(query, **filters) for query, filters in QUERIES], len(QUERIES))
+
+    def run(self, stages):
+        # Later stages need what the earlier ones produce
+        stages = set(stages)
+        if {'clean_price', 'clean_prices', 'parse_specs', 'process_all', 'analyze'} & set(stages):
+            stages.add('spider_insert')
+        if 'analyze' in stages:
+            stages.add('process_all')
+        for stage in STAGES:
+            if stage in stages:
+                getattr(self, stage)()
+        return self.results
+
+def compare(results, baseline, tolerance):
+    """Prints throughput against the baseline per stage; returns the stages that regressed."""
+    regressions = []
+    print(f"[Suite] vs. baseline {baseline['created_at']} ({baseline.get('commit') or 'unknown commit'}):")
+    for stage, result in results['stages'].items():
+        base = baseline['stages'].get(stage)
+        if not base or not base['per_sec'] or not result['per_sec']:
+            continue
+        change = result['per_sec'] / base['per_sec'] - 1
+        regressed = change < -tolerance
+        if regressed:
+            regressions.append(stage)
+        print(f"  {stage:14s} {base['per_sec']:>12,.0f}/s -> {result['per_sec']:>12,.0f}/s {change:+7.1%}"
+              + ("  REGRESSION" if regressed else ''))
+    return regressions
+
+def main():
+    rows = _arg('--rows', 10000)
+    stages = _arg('--stages', ','.join(STAGES), str).split(',')
+    profile_dir = _arg('--profile', None, str)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    workdir = _arg('--keep', None, str) or tempfile.mkdtemp(prefix='suite-')
+    os.makedirs(workdir, exist_ok=True)
+
+    print(f"[Suite] {rows:,} rows, stages: {', '.join(s for s in STAGES if s in stages)} (work dir {workdir})")
+    suite = Suite(rows, workdir, workers=_arg('--workers', 1), profile_dir=profile_dir)
+    results = {
+        'rows': rows,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': suite.workers,
+        'profiled': bool(profile_dir),
+        'stages': suite.run(stages),
+    }
+
+    out = _arg('--out', None, str)
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[Suite] Results written to {out}")
+
+    baseline_path = _arg('--baseline', os.path.join(BASELINE_DIR, f"{rows}.json"), str)
+    regressions = []
+    compared = False
+    if profile_dir:
+        print("[Suite] Profiled run, not compared with a baseline.")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['rows'] != rows:
+            print(f"[Suite] Baseline {baseline_path} is for {baseline['rows']:,} rows; throughput isn't comparable across scales.")
+        else:
+            regressions = compare(results, baseline, _arg('--tolerance', 0.15, float))
+            compared = True
+    else:
+        print(f"[Suite] No baseline at {baseline_path}, nothing compared; run with --save-baseline to record one.")
+
+    if '--save-baseline' in sys.argv:
+        if profile_dir:
+            print("[Suite] Profiled run, not saved as a baseline.")
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"[Suite] Baseline saved to {baseline_path}")
+
+    if regressions:
+        print(f"[Suite] Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+    if not compared and '--require-baseline' in sys.argv:
+        print("[Suite] --require-baseline: this run wasn't compared with a baseline.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,125 @@
 import argparse
 import sys
-import schedule
-import time
 from colorama import init, Fore
 
 init(autoreset=True)
 
-def job():
-    print(f"{Fore.CYAN}[Scheduler] Starting daily scrape job...")
-    # TODO: Call spiders here
-    print(f"{Fore.GREEN}[Scheduler] Job complete.")
+def spider_options(args):
+    """Constructor arguments for (KoubaSpider, LaptopSpider) from the command line."""
+    return (dict(store_html=args.store_html, html_sample_rate=args.html_sample_rate,
+                 rate_limit=args.rate_limit, conditional=not args.no_conditional),
+            dict(headless=False, store_html=args.store_html, html_sample_rate=args.html_sample_rate,
+                 google_first=not args.direct, debug=args.debug_dump))
 
-def run_scheduler():
+def run_scheduler(args, queries, sources):
     from updater.scheduler import start_scheduler
-    start_scheduler()
+    kouba_options, laptops_options = spider_options(args)
+    start_scheduler(queries, sources=sources, max_jobs=args.max_jobs, dry_run=args.dry_run,
+                    kouba_options=dict(kouba_options, max_concurrency=args.concurrency), laptops_options=laptops_options)
+
+def make_runner(args, sources):
+    from batch import BatchRunner
+    kouba_options, laptops_options = spider_options(args)
+    return BatchRunner(
+        sources=sources, kouba_concurrency=args.concurrency, pool_size=args.pool_size or 2,
+        retries=args.retries, recycle_pages=args.recycle_pages, recycle_mb=args.recycle_mb,
+        kouba_options=kouba_options, laptops_options=laptops_options,
+    )
 
 def main():
     parser = argparse.ArgumentParser(description="DZ PC Hunter - Data Engine")
-    parser.add_argument('--mode', choices=['once', 'scheduler', 'process'], default='once', help='Run mode')
+    parser.add_argument('--mode', choices=['once', 'scheduler', 'process', 'batch', 'rollup'], default='once', help='Run mode')
     parser.add_argument('--spider', help='Specific spider to run (e.g. laptops)')
     parser.add_argument('--query', default='laptop', help='Search query for the spider')
+    parser.add_argument('--queries-file', help='Batch/scheduler mode: file with one query per line')
+    parser.add_argument('--sources', default='kouba,laptops', help='Batch/scheduler mode: comma-separated spiders to run each query on')
+    parser.add_argument('--max-jobs', type=int, default=2, help='Scheduler mode: refresh jobs running at once (at most one per source)')
+    parser.add_argument('--dry-run', action='store_true', help='Scheduler mode: print the refresh plan and projected load, then exit')
+    parser.add_argument('--retries', type=int, default=2, help='Batch mode: retries per failed page/query, with exponential backoff')
+    parser.add_argument('--concurrency', type=int, default=4, help='Kouba: concurrent page fetches (per host)')
+    parser.add_argument('--rate-limit', type=float, default=4.0, help='Kouba: max requests per second (0 = unlimited)')
+    parser.add_argument('--no-conditional', action='store_true', help='Kouba: refetch and reparse every page, ignoring the page cache')
+    parser.add_argument('--pool-size', type=int, default=0, help='Laptops: warm browsers shared by a batch of comma-separated queries (0 = fresh Chrome per query)')
+    parser.add_argument('--recycle-pages', type=int, default=50, help='Laptops: queries a pooled browser serves before it is replaced')
+    parser.add_argument('--recycle-mb', type=int, default=500, help='Laptops: memory growth (MB) after which a pooled browser is replaced (needs psutil)')
+    parser.add_argument('--direct', action='store_true', help='Laptops: go straight to the Ouedkniss search URL for uncached queries instead of resolving them via Google')
+    parser.add_argument('--debug-dump', action='store_true', help='Laptops: save HTML/screenshot snapshots of every page, not just failures')
+    parser.add_argument('--store-html', choices=['always', 'failures'], default='always', help='Spiders: keep every card\'s raw_html, or only for cards whose title/price extraction failed')
+    parser.add_argument('--html-sample-rate', type=float, default=0.0, help='Spiders: with --store-html failures, fraction of extracted cards that still keep raw_html')
+    parser.add_argument('--full', action='store_true', help='Process mode: rebuild the clean DB from scratch instead of incrementally')
+    parser.add_argument('--workers', type=int, default=1, help='Process mode: number of parser processes')
+    parser.add_argument('--batch-size', type=int, default=500, help='Process mode: raw rows read and written per batch')
+    parser.add_argument('--cache-size', type=int, default=4096, help='Process mode: LRU size of the spec parse cache (0 disables)')
+    parser.add_argument('--extractor', choices=['auto', 'bs4', 'lxml'], default='auto', help='Process mode: HTML extraction backend (auto = lxml if installed)')
+    parser.add_argument('--persist-cache', action='store_true', help='Process mode: keep the spec parse cache in the clean DB between runs')
+    parser.add_argument('--outliers', choices=['iqr', 'mad', 'none'], default='iqr', help='Process mode: how prices far off their market bucket are flagged (none = not flagged)')
+    parser.add_argument('--raw-days', type=int, default=90, help='Rollup mode: price changes older than this are downsampled to daily min/median/max')
+    parser.add_argument('--daily-days', type=int, default=365, help='Rollup mode: daily rollups older than this are merged into weekly ones')
+    parser.add_argument('--metrics-json', help='Record per-stage counters and latencies; write the run summary to this JSON file')
+    parser.add_argument('--metrics-prom', help='Record per-stage counters and latencies; write them to this Prometheus text file (textfile collector)')
     args = parser.parse_args()
 
     print(f"{Fore.GREEN}=== DZ PC Hunter Data Engine ===")
+
+    if args.metrics_json or args.metrics_prom:
+        import metrics
+        metrics.enable(args.metrics_json, args.metrics_prom)
     
+    if args.mode in ('scheduler', 'batch'):
+        from batch import load_queries
+        queries = load_queries(args.queries_file) if args.queries_file else [q.strip() for q in args.query.split(',') if q.strip()]
+        sources = tuple(s.strip() for s in args.sources.split(',') if s.strip())
+
     if args.mode == 'scheduler':
-        run_scheduler()
+        run_scheduler(args, queries, sources)
+    elif args.mode == 'rollup':
+        from storage import history
+        from storage.writer import connect
+        conn = connect(history.DB_PATH)
+        if history.has_schema(conn):
+            stats = history.rollup(conn, raw_days=args.raw_days, daily_days=args.daily_days)
+            conn.commit()
+            print(f"[History] Rolled {stats['observations']} price observations into {stats['days']} daily / {stats['weeks']} weekly rows.")
+        else:
+            print("[History] No price history yet; run the processor first.")
+        conn.close()
+    elif args.mode == 'batch':
+        make_runner(args, sources).run(queries)
     else:
         print(f"{Fore.CYAN}[System] Running one-off job...")
-        # TODO: Logic to run specific spider or all
-        # TODO: Logic to run specific spider or all
         if args.spider == 'laptops':
             print(f"Running spider: {args.spider} with query: {args.query}")
             from spiders.laptops import LaptopSpider
-            spider = LaptopSpider(headless=False)
-            spider.scrape_ouedkniss(query=args.query)
+            spider = LaptopSpider(headless=False, store_html=args.store_html, html_sample_rate=args.html_sample_rate,
+                                  google_first=not args.direct, debug=args.debug_dump)
+            queries = [q.strip() for q in args.query.split(',') if q.strip()]
+            if args.pool_size:
+                spider.scrape_many(queries, pool_size=args.pool_size,
+                                   max_pages=args.recycle_pages, max_growth_mb=args.recycle_mb)
+            else:
+                for query in queries:
+                    spider.scrape_ouedkniss(query=query)
         elif args.spider == 'kouba':
             print(f"Running spider: {args.spider} with query: {args.query}")
             from spiders.kouba import KoubaSpider
-            spider = KoubaSpider()
-            if hasattr(spider, 'scrape'):
-                spider.scrape(query=args.query)
+            spider = KoubaSpider(store_html=args.store_html, html_sample_rate=args.html_sample_rate,
+                                 max_concurrency=args.concurrency, rate_limit=args.rate_limit,
+                                 conditional=not args.no_conditional)
+            # Comma-separated queries are fetched concurrently in one run
+            spider.scrape_many([q.strip() for q in args.query.split(',') if q.strip()])
         elif args.mode == 'process':
              from processor import DataProcessor
-             p = DataProcessor()
-             p.process_all()
+             p = DataProcessor(cache_size=args.cache_size, persist_cache=args.persist_cache, extractor=args.extractor,
+                               outliers=None if args.outliers == 'none' else args.outliers)
+             p.process_all(full=args.full, workers=args.workers, batch_size=args.batch_size)
         else:
-            print("Running all spiders (Not implemented yet)...")
+            print(f"Running all spiders with query: {args.query}")
+            from batch import SOURCES
+            make_runner(args, SOURCES).run([args.query])
+
+    if args.metrics_json or args.metrics_prom:
+        metrics.export()
+        metrics.print_summary()
 
 if __name__ == "__main__":
     main()
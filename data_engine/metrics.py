@@ -0,0 +1,303 @@
+"""
+Run metrics: counters and latency histograms by name and labels, exported as a JSON
+run summary and/or a Prometheus text file (for node_exporter's textfile collector).
+
+    import metrics
+    metrics.count('pages', component='kouba', status='parsed')
+    with metrics.timer('fetch_seconds', component='kouba'):
+        ...
+    metrics.skip('parse', 'no_price', component='processor')
+
+Nothing is recorded until enable() is called; until then every call returns right
+away (timer() hands back a shared no-op context), so instrumented code pays about a
+function call. Histograms use fixed buckets, so per-process metrics can be merged
+(see snapshot()/merge(), used for the processor's worker processes).
+"""
+import os
+import json
+import time
+import bisect
+import platform
+import threading
+import contextlib
+from datetime import datetime
+
+PREFIX = 'dzpc_'
+
+# Upper bounds in seconds, from a cached parse to a slow page load
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    'fetch_seconds': 'Page fetch latency (HTTP request, or browser load and scroll).',
+    'parse_seconds': 'Parse latency (results page or processor chunk).',
+    'extract_seconds': 'Title/price extraction latency (page of cards or processor chunk).',
+    'db_write_seconds': 'SQLite executemany/commit latency on a writer thread.',
+    'push_seconds': 'Upload request latency, per attempt.',
+    'query_seconds': 'Spider wall time per query.',
+    'phase_seconds': 'Time per phase of a query or dedup run.',
+    'run_seconds': 'Processor run duration.',
+    'job_seconds': 'Scheduler refresh job duration.',
+    'failures': 'Failures by stage and reason.',
+    'skipped': 'Items skipped by stage and reason.',
+    'retries': 'Retried requests by reason.',
+    'pages': 'Results pages by outcome.',
+    'challenges': 'Cloudflare challenges met.',
+    'cards_saved': 'Raw listings handed to the raw DB.',
+    'cards_incomplete': 'Cards saved without title/price, left for the processor.',
+    'db_rows_written': 'Rows written by executemany.',
+    'listings_read': 'Raw listings read by the processor.',
+    'products_written': 'Products upserted by the processor.',
+    'products_deleted': 'Products dropped by the processor.',
+    'pushed_rows': 'Changed products acknowledged by the API.',
+    'pushed_bytes': 'Upload payload bytes, before (json) and after (gzip) compression.',
+    'jobs': 'Scheduler refresh jobs by outcome.',
+    'new_listings': 'New raw listings found by scheduler jobs.',
+}
+
+_NULL_TIMER = contextlib.nullcontext()
+_registry = None
+_json_path = _prom_path = None
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        # One count per bound, plus +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, state):
+        counts, count, total, low, high = state
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.count += count
+        self.sum += total
+        if low is not None:
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+
+    def state(self):
+        return list(self.counts), self.count, self.sum, self.min, self.max
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max if that's lower)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class Registry:
+    def __init__(self):
+        self.started_at = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def count(self, name, value, labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels):
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+def enable(json_path=None, prom_path=None):
+    """Start recording (a fresh registry). export() writes to the paths given here."""
+    global _registry, _json_path, _prom_path
+    _registry = Registry()
+    _json_path, _prom_path = json_path, prom_path
+
+def disable():
+    global _registry
+    _registry = None
+
+def enabled():
+    return _registry is not None
+
+def count(name, value=1, **labels):
+    if _registry is not None:
+        _registry.count(name, value, labels)
+
+def observe(name, seconds, **labels):
+    if _registry is not None:
+        _registry.observe(name, seconds, labels)
+
+def timer(name, **labels):
+    """Context manager timing its block into histogram name."""
+    if _registry is None:
+        return _NULL_TIMER
+    return _Timer(_registry, name, labels)
+
+def failure(stage, reason, value=1, **labels):
+    """Count a failure; reason is a short category, e.g. an exception's class name."""
+    count('failures', value, stage=stage, reason=reason, **labels)
+
+def skip(stage, reason, value=1, **labels):
+    count('skipped', value, stage=stage, reason=reason, **labels)
+
+def reason(e):
+    """Failure category of an exception."""
+    return type(e).__name__
+
+def snapshot(reset=False):
+    """Picklable state of the counters and histograms (None when disabled); reset=True starts over."""
+    if _registry is None:
+        return None
+    with _registry.lock:
+        state = (dict(_registry.counters), {key: h.state() for key, h in _registry.histograms.items()})
+        if reset:
+            _registry.counters.clear()
+            _registry.histograms.clear()
+    return state
+
+def merge(state):
+    """Add a snapshot() from another process."""
+    if _registry is None or state is None:
+        return
+    counters, histograms = state
+    with _registry.lock:
+        for key, value in counters.items():
+            _registry.counters[key] = _registry.counters.get(key, 0) + value
+        for key, value in histograms.items():
+            histogram = _registry.histograms.get(key)
+            if histogram is None:
+                histogram = _registry.histograms[key] = Histogram()
+            histogram.merge(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _series(name, labels, extra=()):
+    """name{label="value",...} as Prometheus writes a series."""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    return name + '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def summary():
+    """The run so far as a JSON-ready dict: counters and histogram stats keyed by series."""
+    if _registry is None:
+        return None
+    now = time.time()
+    counters, histograms = snapshot()
+    result = {
+        'started_at': datetime.fromtimestamp(_registry.started_at).isoformat(timespec='seconds'),
+        'updated_at': datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+        'seconds': round(now - _registry.started_at, 3),
+        'host': platform.node(),
+        'pid': os.getpid(),
+        'counters': {_series(name, labels): value for (name, labels), value in sorted(counters.items())},
+        'histograms': {},
+    }
+    for (name, labels), state in sorted(histograms.items()):
+        histogram = Histogram()
+        histogram.merge(state)
+        result['histograms'][_series(name, labels)] = {
+            'count': histogram.count,
+            'sum': round(histogram.sum, 6),
+            'mean': round(histogram.sum / histogram.count, 6) if histogram.count else None,
+            'min': histogram.min,
+            'p50': histogram.quantile(0.5),
+            'p95': histogram.quantile(0.95),
+            'max': histogram.max,
+        }
+    return result
+
+def prometheus():
+    """The run so far in the Prometheus text exposition format."""
+    if _registry is None:
+        return ''
+    counters, histograms = snapshot()
+    lines = []
+    described = set()
+
+    def describe(family, name, kind):
+        # HELP/TYPE name the family its samples belong to: dzpc_<name>_total for a
+        # counter (the sample itself), dzpc_<name> for a histogram's _bucket/_sum/_count
+        if family not in described:
+            described.add(family)
+            if name in HELP:
+                lines.append(f"# HELP {family} {HELP[name]}")
+            lines.append(f"# TYPE {family} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        family = f"{PREFIX}{name}_total"
+        describe(family, name, 'counter')
+        lines.append(f"{_series(family, labels)} {value}")
+    for (name, labels), (counts, count, total, _, _) in sorted(histograms.items()):
+        family = f"{PREFIX}{name}"
+        describe(family, name, 'histogram')
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+            cumulative += bucket
+            lines.append(f"{_series(family + '_bucket', labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{_series(family + '_sum', labels)} {total}")
+        lines.append(f"{_series(family + '_count', labels)} {count}")
+    describe(f"{PREFIX}run_started_timestamp_seconds", None, 'gauge')
+    lines.append(f"{PREFIX}run_started_timestamp_seconds {_registry.started_at}")
+    return '\n'.join(lines) + '\n'
+
+def _write(path, text):
+    # Written aside and renamed, so a collector never reads a half-written file
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def export():
+    """Write the JSON summary and/or Prometheus file given to enable(). Cumulative; safe to call repeatedly."""
+    if _registry is None:
+        return
+    if _json_path:
+        _write(_json_path, json.dumps(summary(), indent=2))
+    if _prom_path:
+        _write(_prom_path, prometheus())
+
+def print_summary():
+    """Per-stage counts and latencies, printed at the end of a run."""
+    result = summary()
+    if not result:
+        return
+    print(f"[Metrics] Run summary ({result['seconds']:.1f}s):")
+    for series, value in result['counters'].items():
+        print(f"  {series:72s} {value:>10,}")
+    for series, stats in result['histograms'].items():
+        print(f"  {series:72s} {stats['count']:>10,} x  mean {stats['mean'] * 1000:8.1f}ms  "
+              f"p95 {stats['p95'] * 1000:8.1f}ms  max {stats['max'] * 1000:8.1f}ms")
@@ -0,0 +1,85 @@
+import json
+from collections import OrderedDict
+
+_MISSING = object()
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS parse_cache (
+        namespace TEXT,
+        key TEXT,
+        value TEXT,
+        PRIMARY KEY (namespace, key)
+    )
+"""
+
+class LRUCache:
+    """Bounded least-recently-used cache with hit/miss/eviction counters. maxsize=0 disables it."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=_MISSING):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self._data) > max(maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def load(self, conn, namespace):
+        """Warm the cache from the parse_cache side table. Returns the number of entries loaded."""
+        c = conn.cursor()
+        c.execute(CACHE_SCHEMA)
+        c.execute("SELECT key, value FROM parse_cache WHERE namespace = ? LIMIT ?", (namespace, max(self.maxsize, 0)))
+        count = 0
+        for key, value in c.fetchall():
+            self._data[key] = json.loads(value)
+            count += 1
+        return count
+
+    def save(self, conn, namespace):
+        """Replace the namespace's rows in parse_cache with the current entries (caller commits)."""
+        c = conn.cursor()
+        c.execute(CACHE_SCHEMA)
+        c.execute("DELETE FROM parse_cache WHERE namespace = ?", (namespace,))
+        c.executemany("INSERT INTO parse_cache (namespace, key, value) VALUES (?, ?, ?)",
+                      [(namespace, key, json.dumps(value)) for key, value in self._data.items()])
+        return len(self._data)
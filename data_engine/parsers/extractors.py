@@ -0,0 +1,101 @@
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Ouedkniss specific fallback + WooCommerce (Kouba)
+TITLE_SELECTOR = '.woocommerce-loop-product__title, h2, .announce-title, div[class*="Title"]'
+PRICE_SELECTOR = '.price, span[class*="Price"]'
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+class Bs4Extractor:
+    """Reference backend: full html.parser tree + CSS selectors."""
+    name = 'bs4'
+
+    def extract(self, html):
+        """Returns (title, price_str, link) for one product card."""
+        return self.extract_node(BeautifulSoup(html or '', 'html.parser'))
+
+    def extract_node(self, soup):
+        """Same as extract() on an already parsed soup or tag, e.g. a card the spider is holding."""
+        # Title extraction
+        title_el = soup.select_one(TITLE_SELECTOR)
+        title = title_el.get_text(strip=True) if title_el else "Unknown Product"
+        link_el = soup.select_one('a')
+        if title == "Unknown Product":
+             # Fallback to link text if title missing
+             if link_el:
+                 title = link_el.get_text(strip=True)
+
+        # Price Extraction
+        price_el = soup.select_one(PRICE_SELECTOR)
+        price_str = price_el.get_text(strip=True) if price_el else None
+
+        link = link_el.get('href') if link_el else None
+        return title, price_str, link
+
+class LxmlExtractor:
+    """
+    libxml2 backend: same selectors translated to precompiled XPath, which is
+    several times faster than building a BeautifulSoup tree for each card.
+    """
+    name = 'lxml'
+
+    # (...)[1] picks the first match in document order, like select_one
+    TITLE_XPATH = (
+        f"(//*[{_has_class('woocommerce-loop-product__title')} or self::h2 "
+        f"or {_has_class('announce-title')} or (self::div and contains(@class, 'Title'))])[1]"
+    )
+    PRICE_XPATH = f"(//*[{_has_class('price')} or (self::span and contains(@class, 'Price'))])[1]"
+
+    def __init__(self):
+        if etree is None:
+            raise ImportError("lxml is not installed (pip install lxml)")
+        self._parser = etree.HTMLParser()
+        self._title = etree.XPath(self.TITLE_XPATH)
+        self._price = etree.XPath(self.PRICE_XPATH)
+        self._link = etree.XPath("(//a)[1]")
+        # bs4's get_text() leaves out comments and script/style contents
+        self._text = etree.XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+
+    def _get_text(self, el):
+        return ''.join(s for s in (t.strip() for t in self._text(el)) if s)
+
+    def extract(self, html):
+        """Returns (title, price_str, link) for one product card."""
+        root = etree.fromstring(html, self._parser) if html and html.strip() else None
+        if root is None:
+            return "Unknown Product", None, None
+
+        title_el = self._title(root)
+        title = self._get_text(title_el[0]) if title_el else "Unknown Product"
+        link_el = self._link(root)
+        if title == "Unknown Product":
+            # Fallback to link text if title missing
+            if link_el:
+                title = self._get_text(link_el[0])
+
+        price_el = self._price(root)
+        price_str = self._get_text(price_el[0]) if price_el else None
+
+        link = link_el[0].get('href') if link_el else None
+        return title, price_str, link
+
+EXTRACTORS = {
+    'bs4': Bs4Extractor,
+    'lxml': LxmlExtractor,
+}
+
+def get_extractor(name='auto'):
+    """'auto' uses lxml when it's installed and falls back to the bs4 reference."""
+    if name == 'auto':
+        name = 'lxml' if etree is not None else 'bs4'
+    return EXTRACTORS[name]()
+
+def is_complete(title, price_str):
+    """Whether scrape-time extraction got enough that the card's raw_html isn't needed."""
+    return bool(title) and title != "Unknown Product" and price_str is not None
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from parsers.price_cleaner import _clean_normalized
+except ImportError: # run directly from parsers/
+    from price_cleaner import _clean_normalized
+
+FOREIGN_PATTERN = r'€|\$|eur|usd'
+
+# Longer digit runs don't fit a float exactly; those few go through the scalar path
+MAX_DIGITS = 15
+
+# Buckets smaller than this have too few prices to call any of them an outlier
+MIN_BUCKET_SIZE = 8
+
+def clean_prices(prices):
+    """
+    Vectorized clean_price over a sequence of price strings: same "m"/"k"/bare number/<500
+    rules and foreign-currency rejection. Returns a float Series aligned with the input,
+    NaN wherever clean_price returns None.
+    """
+    s = prices if isinstance(prices, pd.Series) else pd.Series(prices, dtype=object)
+    # Listings repeat a few price formats endlessly: everything below runs once per distinct string
+    codes, uniques = pd.factorize(s)
+    if not len(uniques):
+        return pd.Series(np.nan, index=s.index)
+
+    # Same normalization as clean_price
+    raw = pd.Series(uniques, dtype=object)
+    u = (raw.astype(str).str.lower()
+         .str.replace(' ', '', regex=False).str.replace(',', '', regex=False).str.replace('.', '', regex=False))
+
+    foreign = u.str.contains(FOREIGN_PATTERN, regex=True).to_numpy()
+    stripped = u.str.replace('da', '', regex=False).str.replace('dzd', '', regex=False)
+    millions = stripped.str.contains('m', regex=False).to_numpy()
+    thousands = ~millions & stripped.str.contains('k', regex=False).to_numpy()
+
+    # No dots are left, so the first digit run is what clean_price's regexes find
+    digits = stripped.str.extract(r'(\d+)', expand=False)
+    number = pd.to_numeric(digits, errors='coerce').to_numpy(dtype=float)
+
+    values = np.where(millions, np.trunc(number * 10000),
+             np.where(thousands, np.trunc(number * 1000),
+             np.where(number < 500, number * 10000, number)))
+    values[foreign | (raw == '').to_numpy()] = np.nan
+
+    # Non-ASCII digits (float() reads them, to_numeric doesn't) and very long numbers
+    scalar = ~foreign & digits.notna().to_numpy() & (np.isnan(number) | (digits.str.len() > MAX_DIGITS).to_numpy())
+    for i in np.flatnonzero(scalar):
+        value = _clean_normalized(u[i])
+        values[i] = np.nan if value is None else float(value)
+
+    # factorize codes missing values as -1
+    result = np.append(values, np.nan)[codes]
+    return pd.Series(result, index=s.index)
+
+def outlier_mask(prices, buckets, method='iqr', k=None, min_size=MIN_BUCKET_SIZE):
+    """
+    Boolean Series, True for prices far from the rest of their bucket:
+      iqr - outside [Q1 - k*IQR, Q3 + k*IQR], k=1.5 by default
+      mad - modified z-score 0.6745*|x - median|/MAD above k, k=3.5 by default
+    Buckets with fewer than min_size prices, or no spread at all, are never flagged.
+    """
+    df = pd.DataFrame({'price': np.asarray(prices, dtype=float), 'bucket': np.asarray(buckets, dtype=object)})
+    grouped = df.groupby('bucket')['price']
+    size = grouped.transform('size')
+
+    if method == 'iqr':
+        k = 1.5 if k is None else k
+        q1 = grouped.transform('quantile', 0.25)
+        q3 = grouped.transform('quantile', 0.75)
+        spread = q3 - q1
+        flagged = (df['price'] < q1 - k * spread) | (df['price'] > q3 + k * spread)
+    elif method == 'mad':
+        k = 3.5 if k is None else k
+        deviation = (df['price'] - grouped.transform('median')).abs()
+        spread = deviation.groupby(df['bucket']).transform('median')
+        flagged = 0.6745 * deviation > k * spread
+    else:
+        raise ValueError(f"Unknown outlier method: {method}")
+
+    return (flagged & (spread > 0) & (size >= min_size)).fillna(False).astype(bool)
+
+if __name__ == "__main__":
+    tests = ["6m", "60k", "15000 DA", "12.5m", "8", "60000", "$500", None, ""]
+    for t, value in zip(tests, clean_prices(tests)):
+        print(f"{t} -> {value}")
@@ -1,12 +1,28 @@
 import re
 
+try:
+    from parsers.cache import LRUCache
+except ImportError: # run directly from parsers/
+    from cache import LRUCache
+
+# Price strings like "6m" and "60k" recur constantly; keyed on the normalized string
+price_cache = LRUCache(4096)
+_MISSING = object()
+
 def clean_price(price_str):
     if not price_str:
         return None
     
     # Lowercase and remove spaces
     s = price_str.lower().replace(' ', '').replace(',', '').replace('.', '')
-    
+
+    value = price_cache.get(s, _MISSING)
+    if value is _MISSING:
+        value = _clean_normalized(s)
+        price_cache.put(s, value)
+    return value
+
+def _clean_normalized(s):
     # Reject foreign currencies
     if any(c in s for c in ['€', '$', 'eur', 'usd']):
         return None
@@ -39,3 +55,4 @@ if __name__ == "__main__":
     tests = ["6m", "60k", "15000 DA", "12.5m", "8", "60000"]
     for t in tests:
         print(f"{t} -> {clean_price(t)}")
+    print(f"Cache: {price_cache.stats()}")
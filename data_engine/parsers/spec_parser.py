@@ -1,8 +1,16 @@
 import re
 import json
 
+try:
+    from parsers.cache import LRUCache
+except ImportError: # run directly from parsers/
+    from cache import LRUCache
+
+def _group(title, match, i=1):
+    return title[match.start(i):match.end(i)]
+
 class SpecParser:
-    def __init__(self):
+    def __init__(self, cache_size=4096):
         self.patterns = {
             'cpu': [
                 r'(i[3579]-?\d{4,5}[A-Z]*)', # Intel Core i series
@@ -25,47 +33,97 @@ class SpecParser:
                 r'(Iris\s?Xe|UHD|Vega\s?\d{1,2})' # Integrated
             ]
         }
+        # Per pattern: lowercase literals every match contains, and how far before that literal
+        # a match can start. A title with none of them can't match, and the search starts at
+        # the first one found instead of scanning the title from the beginning.
+        self.anchors = {
+            'cpu': [(('i3', 'i5', 'i7', 'i9'), 0), (('ryzen',), 0), (('m1', 'm2', 'm3'), 0), (('celeron', 'pentium', 'athlon'), 0)],
+            'ram': [(('gb',), 4)], # up to 3 digits and a space
+            'storage': [(('gb',), 5), (('tb',), 2), (('ssd', 'hdd'), 0)],
+            'gpu': [(('rtx',), 0), (('gtx',), 0), (('radeon',), 0), (('iris', 'uhd', 'vega'), 0)]
+        }
+        self._compile()
+        # Titles repeat heavily across daily reposts; results are cached by stripped title
+        self.cache = LRUCache(cache_size)
+
+    def _compile(self):
+        # ASCII titles are matched lowercased with lowercased patterns: without IGNORECASE, re can
+        # skip ahead to a pattern's leading literal. (The patterns only use \d and \s escapes,
+        # which lower() leaves alone.) Other titles use the patterns as written, unanchored, since
+        # Unicode case folding doesn't map onto str.lower().
+        self._ascii = {
+            category: [(re.compile(pattern.lower()), *self.anchors[category][i]) for i, pattern in enumerate(patterns)]
+            for category, patterns in self.patterns.items()
+        }
+        self._unicode = {
+            category: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for category, patterns in self.patterns.items()
+        }
+
+    def _first_match(self, category, title, lowered):
+        # Patterns are tried in list order; the first one that matches wins
+        if lowered is None:
+            for regex in self._unicode[category]:
+                match = regex.search(title)
+                if match:
+                    return match
+            return None
+        for regex, anchors, lead in self._ascii[category]:
+            start = -1
+            for anchor in anchors:
+                i = lowered.find(anchor)
+                if i >= 0 and (start < 0 or i < start):
+                    start = i
+            if start >= 0:
+                match = regex.search(lowered, start - lead if start > lead else 0)
+                if match:
+                    return match
+        return None
 
     def parse_specs(self, title):
+        # Surrounding whitespace never reaches a captured group, so it's safe to drop from the key
+        key = title.strip()
+        specs = self.cache.get(key, None)
+        if specs is None:
+            specs = self._parse_uncached(key)
+            self.cache.put(key, specs)
+        return dict(specs)
+
+    def _parse_uncached(self, title):
         specs = {}
-        
+        # ASCII lowercasing keeps offsets, so group text is always sliced from the title as written
+        lowered = title.lower() if title.isascii() else None
+
         # CPU Extraction
-        for pattern in self.patterns['cpu']:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                specs['cpu'] = match.group(1).strip()
-                break
-        
+        match = self._first_match('cpu', title, lowered)
+        if match:
+            specs['cpu'] = _group(title, match).strip()
+
         # RAM Extraction
-        for pattern in self.patterns['ram']:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                specs['ram'] = f"{match.group(1)}GB"
-                break
+        match = self._first_match('ram', title, lowered)
+        if match:
+            specs['ram'] = f"{_group(title, match)}GB"
 
         # Storage Extraction
-        for pattern in self.patterns['storage']:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                if 'TB' in match.group(0).upper():
-                     specs['storage'] = f"{match.group(1)}TB {match.group(2) if match.lastindex >= 2 else ''}".strip()
+        match = self._first_match('storage', title, lowered)
+        if match:
+            if 'TB' in _group(title, match, 0).upper():
+                 specs['storage'] = f"{_group(title, match)}TB {_group(title, match, 2) if match.lastindex >= 2 else ''}".strip()
+            else:
+                # Handle "SSD 512GB" vs "512GB SSD"
+                if match.lastindex >= 2:
+                    first, second = _group(title, match), _group(title, match, 2)
+                    val = first if first.isdigit() else second
+                    type_ = second if first.isdigit() else first
+                    specs['storage'] = f"{val}GB {type_}"
                 else:
-                    # Handle "SSD 512GB" vs "512GB SSD"
-                    if match.lastindex >= 2:
-                        val = match.group(1) if match.group(1).isdigit() else match.group(2)
-                        type_ = match.group(2) if match.group(1).isdigit() else match.group(1)
-                        specs['storage'] = f"{val}GB {type_}"
-                    else:
-                        specs['storage'] = match.group(0)
-                break
+                    specs['storage'] = _group(title, match, 0)
 
         # GPU Extraction
-        for pattern in self.patterns['gpu']:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                specs['gpu'] = match.group(1).strip()
-                break
-                
+        match = self._first_match('gpu', title, lowered)
+        if match:
+            specs['gpu'] = _group(title, match).strip()
+
         return specs
 
 if __name__ == "__main__":
@@ -75,7 +133,7 @@ if __name__ == "__main__":
         "Dell XPS 13 i7-1165G7 32GB 1TB NVMe Iris Xe",
         "HP Laptop 15 8GB RAM 256GB SSD Celeron N4020"
     ]
-    
+
     for t in test_titles:
         print(f"Title: {t}")
         print(f"Specs: {json.dumps(parser.parse_specs(t), indent=2)}")
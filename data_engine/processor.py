@@ -1,124 +1,493 @@
 import sqlite3
 import os
 import json
-from bs4 import BeautifulSoup
+import sys
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from parsers.spec_parser import SpecParser
-from parsers.price_cleaner import clean_price
+from parsers.price_batch import clean_prices, outlier_mask
+from parsers.extractors import get_extractor, is_complete
+from storage.html_store import HtmlStore, RAW_HTML_JOIN
+from storage.writer import DbWriter, connect
+from storage import search, market, dedup, history, sync
+import metrics
+
+PRODUCTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        hash_id TEXT PRIMARY KEY,
+        title TEXT,
+        category TEXT,
+        brand TEXT,
+        model TEXT,
+        specs TEXT,
+        price REAL,
+        currency TEXT,
+        source TEXT,
+        link TEXT,
+        market_bucket TEXT,
+        outlier INTEGER DEFAULT 0,
+        simhash INTEGER,
+        duplicate_of TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# One row per raw listing we have already looked at, so unchanged raw_html is never re-parsed
+STATE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS processed_listings (
+        listing_id TEXT PRIMARY KEY,
+        content_hash TEXT,
+        processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Rows per read batch, pool task and executemany batch
+CHUNK_SIZE = 500
+
+# Parsed chunks queued for the writer thread before parsing waits on it
+WRITE_AHEAD = 4
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+_worker_processor = None
+
+def _init_worker(cache_size, cache_db, extractor, record_metrics=False):
+    global _worker_processor
+    _worker_processor = DataProcessor(cache_size=cache_size, extractor=extractor)
+    # A forked worker would otherwise start with a copy of the parent's counts
+    if record_metrics:
+        metrics.enable()
+    else:
+        metrics.disable()
+    if cache_db:
+        # Workers start warm from the persisted cache; only the parent writes it back
+        conn = sqlite3.connect(cache_db)
+        _worker_processor.load_caches(conn)
+        conn.close()
+
+def parse_chunk(rows, processor=None):
+    """
+    Parse (uid, title, price_str, html, source, link, content_hash) rows.
+    Returns compact (uid, content_hash, product_row_or_None, error_or_None) tuples.
+    """
+    processor = processor or _worker_processor
+    extracted = []
+    with metrics.timer('extract_seconds', component='processor'):
+        for uid, title, price_str, html, source, link, content_hash in rows:
+            try:
+                extracted.append((uid, content_hash, source, link, processor.extract_fields(html, title, price_str), None))
+            except Exception as e:
+                metrics.failure('extract', metrics.reason(e), component='processor')
+                extracted.append((uid, content_hash, source, link, None, str(e)))
+
+    with metrics.timer('parse_seconds', component='processor'):
+        # The whole chunk's prices are cleaned in one vectorized pass
+        prices = clean_prices([fields[1] if fields else None for *_, fields, _ in extracted]).tolist()
+
+        results = []
+        for (uid, content_hash, source, link, fields, error), price in zip(extracted, prices):
+            if error:
+                results.append((uid, content_hash, None, error))
+                continue
+            title, price_str, card_link = fields
+            try:
+                product = processor.build_row(uid, title, None if price != price else price, source, link or card_link)
+                if product is None:
+                    # Dropped for lack of a usable price
+                    metrics.skip('parse', 'unparseable_price' if price_str else 'no_price', component='processor')
+                results.append((uid, content_hash, product, None))
+            except Exception as e:
+                metrics.failure('parse', metrics.reason(e), component='processor')
+                results.append((uid, content_hash, None, str(e)))
+    return results
+
+def _parse_task(rows):
+    """parse_chunk in a worker, with the metrics it recorded for the parent to merge."""
+    return parse_chunk(rows), metrics.snapshot(reset=True)
+
+def _merged(task_result):
+    results, worker_metrics = task_result
+    metrics.merge(worker_metrics)
+    return results
 
 class DataProcessor:
-    def __init__(self):
-        self.parser = SpecParser()
+    def __init__(self, cache_size=4096, persist_cache=False, extractor='auto', outliers='iqr'):
+        self.parser = SpecParser(cache_size=cache_size)
+        # Pulls title/price/link out of a card's raw_html; see parsers/extractors.py
+        self.extractor = get_extractor(extractor)
+        self.cache_size = cache_size
+        # Keep the spec cache in the clean DB between runs (prices are cleaned per chunk, uncached)
+        self.persist_cache = persist_cache
+        # 'iqr', 'mad' or None: how prices far off their market bucket get flagged (see parsers/price_batch.py)
+        self.outliers = outliers
 
-    def process_all(self):
-        print("[Processor] Starting batch processing...")
-        
         # Resolve paths relative to this file
         base_dir = os.path.dirname(__file__)
-        storage_dir = os.path.join(base_dir, 'storage')
-        
-        # Ensure directory exists
-        os.makedirs(storage_dir, exist_ok=True)
-        
-        CLEAN_DB = os.path.join(storage_dir, 'clean_data.db')
-        RAW_DB = os.path.join(storage_dir, 'raw_data.db')
-        
-        print(f"[Processor] Raw DB Path: {RAW_DB}")
-        print(f"[Processor] Clean DB Path: {CLEAN_DB}")
-        
-        # Connect to both DBs
-        conn_raw = sqlite3.connect(RAW_DB)
-        conn_clean = sqlite3.connect(CLEAN_DB)
-        
+        self.storage_dir = os.path.join(base_dir, 'storage')
+        self.clean_db = os.path.join(self.storage_dir, 'clean_data.db')
+        self.raw_db = os.path.join(self.storage_dir, 'raw_data.db')
+
+    def extract_fields(self, html, title=None, price_str=None):
+        """
+        (title, price_str, card_link), from the spider's fields when complete, else from raw_html
+        (so cards extracted at scrape time are never parsed again).
+        """
+        if is_complete(title, price_str):
+            return title, price_str, None
+        return self.extractor.extract(html)
+
+    def build_row(self, uid, title, clean_val, source, link):
+        """products row for an extracted listing with its cleaned price, or None without one."""
+        if not clean_val:
+            return None
+
+        # Spec Extraction
+        specs = self.parser.parse_specs(title)
+
+        # Categorization (Basic)
+        category = "laptop" if "laptop" in title.lower() or "portab" in title.lower() else "pc"
+
+        # Generic Brand extraction (first word usually)
+        brand = title.split()[0].upper()
+        model = specs.get('model', 'Unknown') # Extractor doesn't do model yet, generic
+
+        return (
+            uid,
+            title,
+            category,
+            brand,
+            model,
+            json.dumps(specs),
+            clean_val,
+            'DZD',
+            source,
+            link or '',
+            # Near-duplicate signature; reposts are folded together after each run (storage/dedup.py)
+            dedup.simhash(title, specs),
+            # Which market_stats row this listing counts towards and is scored against
+            market.bucket_key(title, brand, model, specs)
+        )
+
+    def load_caches(self, conn):
+        return self.parser.cache.load(conn, 'spec')
+
+    def save_caches(self, conn):
+        self.parser.cache.save(conn, 'spec')
+        # Left by runs that still cached prices row by row
+        conn.execute("DELETE FROM parse_cache WHERE namespace = 'price'")
+
+    def _read_chunks(self, conn_raw, batch_size):
+        """Keyset-paginate listings by rowid so only one batch of raw_html is in memory."""
         c_raw = conn_raw.cursor()
-        c_clean = conn_clean.cursor()
-        
-        # Reset Clean DB Table to ensure schema matches
-        c_clean.execute("DROP TABLE IF EXISTS products")
-        c_clean.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                hash_id TEXT PRIMARY KEY,
-                title TEXT,
-                category TEXT,
-                brand TEXT,
-                model TEXT,
-                specs TEXT,
-                price REAL,
-                currency TEXT,
-                source TEXT,
-                link TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Fetch unprocessed items? For now fetch all
-        c_raw.execute("SELECT id, raw_html, source, link FROM listings") # Link might be missing in raw logic, need to fix spider if so
-        rows = c_raw.fetchall()
-        
-        print(f"[Processor] found {len(rows)} raw items.")
-        
-        processed_count = 0
-        for row in rows:
-            uid, html, source, link = row
-            
-            try:
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Title extraction
-                # Title extraction
-                # Ouedkniss specific fallback + WooCommerce (Kouba)
-                title_el = soup.select_one('.woocommerce-loop-product__title, h2, .announce-title, div[class*="Title"]')
-                title = title_el.get_text(strip=True) if title_el else "Unknown Product"
-                if title == "Unknown Product":
-                     # Fallback to link text if title missing
-                     link_el = soup.select_one('a')
-                     if link_el:
-                         title = link_el.get_text(strip=True)
-                
-                # Price Extraction
-                price_el = soup.select_one('.price, span[class*="Price"]')
-                price_str = price_el.get_text(strip=True) if price_el else None
-                clean_val = clean_price(price_str)
-                
-                if not clean_val:
-                    # print(f"Skipping {uid}: No valid price ({price_str})")
+        last_rowid = 0
+        while True:
+            c_raw.execute(f"""
+                SELECT l.rowid, l.id, l.title, l.price, l.raw_html, l.html_hash, b.codec, b.data, l.source, l.link
+                FROM listings l {RAW_HTML_JOIN}
+                WHERE l.rowid > ? ORDER BY l.rowid LIMIT ?
+            """, (last_rowid, batch_size)) # Link might be missing in raw logic, need to fix spider if so
+            rows = c_raw.fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [row[1:] for row in rows]
+
+    def _pending_chunks(self, chunks, c_clean, html_store, full, stats):
+        """Drop listings whose content hash matches the last run; only new or changed ones get parsed."""
+        for rows in chunks:
+            stats['read'] += len(rows)
+            seen = {}
+            if not full:
+                placeholders = ','.join('?' * len(rows))
+                c_clean.execute(f"SELECT listing_id, content_hash FROM processed_listings WHERE listing_id IN ({placeholders})",
+                                [row[0] for row in rows])
+                seen = dict(c_clean.fetchall())
+
+            pending = []
+            for uid, title, price_str, html, html_hash, codec, data, source, link in rows:
+                # Hash whatever extract_fields will actually read: scrape-time fields or the raw card.
+                # Compressed cards already carry their content hash, so unchanged ones are never decompressed.
+                if is_complete(title, price_str):
+                    content_hash = hashlib.md5(f"{title}\x00{price_str}".encode('utf-8')).hexdigest()
+                elif html is None and html_hash:
+                    content_hash = html_hash
+                else:
+                    content_hash = hashlib.md5((html or '').encode('utf-8')).hexdigest()
+                if seen.get(uid) == content_hash:
+                    stats['skipped'] += 1
                     continue
-                
-                # Spec Extraction
-                specs = self.parser.parse_specs(title)
-                
-                # Categorization (Basic)
-                category = "laptop" if "laptop" in title.lower() or "portab" in title.lower() else "pc"
-                
-                # Generic Brand extraction (first word usually)
-                brand = title.split()[0].upper()
-                
-                # Upsert into Clean DB
-                c_clean.execute("""
-                    INSERT OR REPLACE INTO products 
-                    (hash_id, title, category, brand, model, specs, price, currency, source, link)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    uid,
-                    title,
-                    category,
-                    brand,
-                    specs.get('model', 'Unknown'), # Extractor doesn't do model yet, generic
-                    json.dumps(specs),
-                    clean_val,
-                    'DZD',
-                    source,
-                    link or ''
-                ))
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"[Processor] Error row {uid}: {e}")
-                
+                if html is None and data is not None:
+                    html = html_store.decompress(codec, data)
+                pending.append((uid, title, price_str, html, source, link, content_hash))
+            if pending:
+                yield pending
+
+    def _vanished(self, conn_raw, c_clean, batch_size):
+        """Ids with a product or processed_listings row whose raw listing is no longer in the raw DB."""
+        vanished = []
+        last_id = ''
+        while True:
+            c_clean.execute("""
+                SELECT listing_id FROM processed_listings WHERE listing_id > ?
+                UNION SELECT hash_id FROM products WHERE hash_id > ?
+                ORDER BY 1 LIMIT ?
+            """, (last_id, last_id, batch_size))
+            ids = [r[0] for r in c_clean.fetchall()]
+            if not ids:
+                return vanished
+            last_id = ids[-1]
+            present = {r[0] for r in conn_raw.execute(f"SELECT id FROM listings WHERE id IN ({','.join('?' * len(ids))})", ids)}
+            vanished += [uid for uid in ids if uid not in present]
+
+    def _drop_vanished(self, db, ids, stats):
+        """Runs on the writer thread: deleted like any other product, so the triggers clean up after them."""
+        for i in range(0, len(ids), CHUNK_SIZE):
+            batch = ids[i:i + CHUNK_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            # Their buckets lose a price; outliers there are re-flagged
+            stats['buckets'].update(bucket for (bucket,) in db.conn.execute(
+                f"SELECT market_bucket FROM products WHERE hash_id IN ({placeholders}) AND market_bucket IS NOT NULL", batch))
+            stats['deleted'] += db.conn.execute(f"DELETE FROM products WHERE hash_id IN ({placeholders})", batch).rowcount
+            db.conn.execute(f"DELETE FROM processed_listings WHERE listing_id IN ({placeholders})", batch)
+
+    def _parse_parallel(self, chunks, workers):
+        """Fan chunks out to a process pool, keeping at most 2 per worker in flight and results in input order."""
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.cache_size, self.clean_db if self.persist_cache else None, self.extractor.name,
+                                           metrics.enabled())) as pool:
+            for chunk in chunks:
+                in_flight.append(pool.submit(_parse_task, chunk))
+                if len(in_flight) >= workers * 2:
+                    yield _merged(in_flight.popleft().result())
+            while in_flight:
+                yield _merged(in_flight.popleft().result())
+
+    def _write_results(self, db, target, results, stats):
+        """Runs on the writer thread; rows go out as executemany batches of the writer's flush_size."""
+        upserts = []
+        deletes = []
+        state_updates = []
+        for uid, content_hash, product, error in results:
+            if error:
+                print(f"[Processor] Error row {uid}: {error}")
+                continue
+
+            # Remember the hash even without a price so the row isn't re-parsed next run
+            state_updates.append((uid, content_hash))
+
+            if product:
+                upserts.append(product)
+            else:
+                stats['no_price'] += 1
+                if target == 'products':
+                    # A changed listing may have lost its price; drop the stale product (a rebuild has none)
+                    deletes.append((uid,))
+
+        # Upsert in place (not OR REPLACE) so the row keeps its rowid and the search/market triggers fire as updates
+        db.buffer(f"""
+            INSERT INTO {target}
+            (hash_id, title, category, brand, model, specs, price, currency, source, link, simhash, market_bucket)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash_id) DO UPDATE SET
+                title = excluded.title, category = excluded.category, brand = excluded.brand,
+                model = excluded.model, specs = excluded.specs, price = excluded.price,
+                currency = excluded.currency, source = excluded.source, link = excluded.link,
+                simhash = excluded.simhash, market_bucket = excluded.market_bucket
+        """, upserts)
+        if deletes:
+            # Run now rather than buffered, to count only products that actually existed
+            stats['deleted'] += db.conn.executemany("DELETE FROM products WHERE hash_id = ?", deletes).rowcount
+        db.buffer("""
+            INSERT OR REPLACE INTO processed_listings (listing_id, content_hash, processed_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, state_updates)
+        stats['processed'] += len(upserts)
+        stats['buckets'].update(product[-1] for product in upserts)
+
+    def _flag_outliers(self, db, target, buckets=None):
+        """
+        Runs on the writer thread: re-flag outlier prices within the given market buckets
+        (all of them when None). Only rows whose flag changes are written.
+        """
+        if buckets is None:
+            rows = db.conn.execute(f"SELECT rowid, market_bucket, price, outlier FROM {target} "
+                                   f"WHERE market_bucket IS NOT NULL AND duplicate_of IS NULL").fetchall()
+        else:
+            buckets = list(buckets)
+            rows = []
+            for i in range(0, len(buckets), CHUNK_SIZE):
+                batch = buckets[i:i + CHUNK_SIZE]
+                rows += db.conn.execute(f"SELECT rowid, market_bucket, price, outlier FROM {target} "
+                                        f"WHERE market_bucket IN ({','.join('?' * len(batch))}) AND duplicate_of IS NULL", batch).fetchall()
+        if not rows:
+            return 0, 0
+        rowids, row_buckets, prices, flagged = zip(*rows)
+        flags = outlier_mask(prices, row_buckets, self.outliers).tolist()
+        changed = [(int(flag), rowid) for rowid, flag, old in zip(rowids, flags, flagged) if flag != bool(old)]
+        db.conn.executemany(f"UPDATE {target} SET outlier = ? WHERE rowid = ?", changed)
+        return sum(flags), len(changed)
+
+    def process_all(self, full=False, workers=1, batch_size=CHUNK_SIZE):
+        """
+        Incremental by default: only listings whose raw_html is new or changed since
+        the last run are parsed and upserted. full=True rebuilds the products table
+        from scratch (e.g. after a schema change) into a side table and swaps it in,
+        so readers never see an empty catalogue.
+        workers > 1 parses in a process pool; results are identical to the serial path.
+        Raw rows are streamed batch_size at a time, so memory doesn't grow with the raw DB.
+        Returns the run's counts (read/skipped/no_price/processed/deleted) and touched market buckets.
+        """
+        print(f"[Processor] Starting {'full rebuild' if full else 'incremental'} processing ({self.extractor.name} extractor)...")
+        start = time.perf_counter()
+
+        # Ensure directory exists
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+        print(f"[Processor] Raw DB Path: {self.raw_db}")
+        print(f"[Processor] Clean DB Path: {self.clean_db}")
+
+        # Connect to both DBs (WAL, so readers of either aren't blocked meanwhile)
+        conn_raw = connect(self.raw_db)
+        conn_clean = connect(self.clean_db)
+
+        c_clean = conn_clean.cursor()
+
+        c_clean.execute(PRODUCTS_SCHEMA.format(table='products'))
+        c_clean.execute(STATE_SCHEMA)
+
+        # An older products table can't be upserted into; rebuild it once
+        c_clean.execute("PRAGMA table_info(products)")
+        columns = {r[1] for r in c_clean.fetchall()}
+        if not full and not {'title', 'market_bucket', 'outlier', 'simhash', 'duplicate_of', 'created_at'} <= columns:
+            print("[Processor] products schema is outdated, switching to full rebuild.")
+            full = True
+        if not full:
+            # Spec columns, indexes and the FTS table analyze.py searches, and the per-bucket
+            # market aggregates deals are scored against; triggers keep both in sync from here on
+            search.ensure_schema(conn_clean)
+            market.ensure_schema(conn_clean)
+            dedup.ensure_schema(conn_clean)
+            # Price changes are appended to price_history by the same kind of triggers
+            history.ensure_schema(conn_clean)
+            # ...and changed products queued for the uploader
+            sync.ensure_schema(conn_clean)
+
+        if self.persist_cache:
+            print(f"[Processor] Loaded {self.load_caches(conn_clean)} spec cache entries.")
         conn_clean.commit()
+
+        # All writes below happen on one writer thread, in one transaction committed at the end,
+        # while this thread keeps reading and parsing
+        writer = DbWriter(self.clean_db, commit_every=0, flush_size=batch_size, html_store=False).start()
+
+        if full:
+            target = 'products_rebuild'
+            writer.execute(f"DROP TABLE IF EXISTS {target}")
+            writer.execute(PRODUCTS_SCHEMA.format(table=target))
+            writer.execute("DELETE FROM processed_listings")
+        else:
+            target = 'products'
+
+        stats = {'read': 0, 'skipped': 0, 'no_price': 0, 'processed': 0, 'deleted': 0, 'buckets': set()}
+
+        if not full:
+            # Listings deleted from the raw DB since the last run (a full rebuild never sees them)
+            vanished = self._vanished(conn_raw, c_clean, batch_size)
+            if vanished:
+                writer.submit(self._drop_vanished, vanished, stats).result()
+                print(f"[Processor] {len(vanished)} listings are gone from the raw DB; dropped their products.")
+
+        # read -> filter -> parse -> write, one batch at a time
+        chunks = self._read_chunks(conn_raw, batch_size)
+        pending = self._pending_chunks(chunks, c_clean, HtmlStore(conn_raw), full, stats)
+        if workers > 1:
+            print(f"[Processor] Parsing with {workers} workers...")
+            results = self._parse_parallel(pending, workers)
+        else:
+            results = (parse_chunk(chunk, self) for chunk in pending)
+
+        writes = deque()
+        for chunk_results in results:
+            writes.append(writer.submit(self._write_results, target, chunk_results, stats))
+            # Backpressure: don't let parsed chunks pile up in memory ahead of the writer
+            while len(writes) > WRITE_AHEAD:
+                writes.popleft().result()
+        while writes:
+            writes.popleft().result()
+
+        if full or stats['processed'] or stats['deleted']:
+            # Clusters can merge or split with any change, so all listings are re-clustered (LSH, not pairwise)
+            result = writer.submit(lambda db: dedup.dedupe(db.conn, target)).result()
+            stats['buckets'] |= result['buckets']
+            timings = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in result['timings'].items())
+            for name, seconds in result['timings'].items():
+                metrics.observe('phase_seconds', seconds, component='dedup', phase=name)
+            print(f"[Processor] Dedup: {result['listings']} listings, {result['clusters']} clusters, "
+                  f"{result['duplicates']} duplicates ({result['changed']} changed, {result['comparisons']} signature pairs checked; {timings}).")
+
+        if self.outliers and (full or stats['buckets']):
+            # Whole buckets are needed for quartiles/medians; an incremental run only revisits the ones it touched
+            flagged, changed = writer.submit(self._flag_outliers, target, None if full else stats['buckets']).result()
+            print(f"[Processor] {flagged} outlier prices in {'all' if full else len(stats['buckets'])} buckets ({changed} flags changed).")
+
+        if full:
+            # Swap the rebuilt table in atomically
+            writer.execute("DROP TABLE products")
+            writer.execute(f"ALTER TABLE {target} RENAME TO products")
+            # Indexed in one pass rather than row by row through the triggers
+            rebuilds = [
+                writer.submit(lambda db: search.ensure_schema(db.conn, rebuild=True)),
+                writer.submit(lambda db: market.ensure_schema(db.conn, rebuild=True)),
+                writer.submit(lambda db: dedup.ensure_schema(db.conn)),
+                # The rebuild fired no triggers; record what changed against the last known prices
+                writer.submit(lambda db: history.ensure_schema(db.conn, rebuild=True)),
+                writer.submit(lambda db: sync.ensure_schema(db.conn, rebuild=True)),
+            ]
+            # Raises here if one failed, before anything is committed
+            for future in rebuilds:
+                future.result()
+
+        if self.persist_cache:
+            writer.submit(lambda db: self.save_caches(db.conn)).result()
+
+        writer.close()
         conn_raw.close()
         conn_clean.close()
-        print(f"[Processor] Successfully processed {processed_count} items.")
+        print(f"[Processor] found {stats['read']} raw items.")
+        print(f"[Processor] Successfully processed {stats['processed']} items ({stats['skipped']} unchanged, "
+              f"{stats['no_price']} without a price skipped; {stats['deleted']} deleted).")
+
+        cache_stats = self.parser.cache.stats()
+        if cache_stats['hits'] + cache_stats['misses']:
+            print(f"[Processor] Spec cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['evictions']} evictions ({cache_stats['hit_rate']:.0%} hit rate)")
+
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"[Processor] Peak RSS: {peak:.1f} MB")
+
+        metrics.observe('run_seconds', time.perf_counter() - start, component='processor')
+        metrics.count('listings_read', stats['read'], component='processor')
+        metrics.skip('filter', 'unchanged', stats['skipped'], component='processor')
+        metrics.count('products_written', stats['processed'], component='processor')
+        metrics.count('products_deleted', stats['deleted'], component='processor')
+        return stats
 
 if __name__ == "__main__":
-    p = DataProcessor()
-    p.process_all()
+    extractor = sys.argv[sys.argv.index('--extractor') + 1] if '--extractor' in sys.argv else 'auto'
+    outliers = sys.argv[sys.argv.index('--outliers') + 1] if '--outliers' in sys.argv else 'iqr'
+    p = DataProcessor(persist_cache='--persist-cache' in sys.argv, extractor=extractor,
+                      outliers=None if outliers == 'none' else outliers)
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
+    p.process_all(full='--full' in sys.argv, workers=workers)
@@ -0,0 +1,146 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def browser_rss_mb(driver):
+    """RSS of chromedriver plus every Chrome process under it, in MB (None without psutil)."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        procs = [root] + root.children(recursive=True)
+        return sum(p.memory_info().rss for p in procs if p.is_running()) / (1024 * 1024)
+    except (AttributeError, psutil.Error):
+        return None
+
+class PooledBrowser:
+    def __init__(self, driver, startup):
+        self.driver = driver
+        self.startup = startup
+        self.pages = 0
+        self.baseline_mb = browser_rss_mb(driver)
+
+    def growth_mb(self):
+        current = browser_rss_mb(self.driver)
+        if current is None or self.baseline_mb is None:
+            return None
+        return current - self.baseline_mb
+
+class BrowserPool:
+    """
+    Up to `size` warm Chrome drivers shared by the threads of one batch. A driver is
+    quit and replaced after max_pages queries, once its process tree has grown by
+    more than max_growth_mb since it started (needs psutil), or when a query on it
+    raised - the same leak protection a fresh subprocess per query used to give.
+    """
+
+    def __init__(self, options, size=2, max_pages=50, max_growth_mb=500, factory=None):
+        self.options = options
+        self.size = size
+        self.max_pages = max_pages
+        self.max_growth_mb = max_growth_mb
+        # factory() -> driver, for tests/benchmarks; defaults to Chrome via webdriver_manager
+        self.factory = factory
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._driver_path = None
+        self.stats = {'started': 0, 'reused': 0, 'recycled': 0}
+        if psutil is None and max_growth_mb:
+            print("[BrowserPool] psutil is not installed, recycling on page count only.")
+
+    def _new_driver(self):
+        if self.factory:
+            return self.factory()
+        with self._lock:
+            # The install check hits the network, so only the first driver pays for it
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+        return webdriver.Chrome(service=Service(self._driver_path), options=self.options)
+
+    def _start(self):
+        start = time.perf_counter()
+        try:
+            driver = self._new_driver()
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+        browser = PooledBrowser(driver, time.perf_counter() - start)
+        self.stats['started'] += 1
+        print(f"[BrowserPool] Started browser in {browser.startup:.1f}s ({self._live}/{self.size} live).")
+        return browser
+
+    def acquire(self):
+        try:
+            browser = self._idle.get_nowait()
+            self.stats['reused'] += 1
+            return browser
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_start = self._live < self.size
+            if can_start:
+                self._live += 1
+        if can_start:
+            return self._start()
+        browser = self._idle.get()
+        self.stats['reused'] += 1
+        return browser
+
+    def release(self, browser, broken=False):
+        browser.pages += 1
+        reason = None
+        if broken:
+            reason = "query failed"
+        elif self.max_pages and browser.pages >= self.max_pages:
+            reason = f"{browser.pages} pages"
+        elif self.max_growth_mb:
+            growth = browser.growth_mb()
+            if growth is not None and growth > self.max_growth_mb:
+                reason = f"+{growth:.0f} MB"
+
+        if reason is None:
+            self._idle.put(browser)
+            return
+        print(f"[BrowserPool] Recycling browser ({reason}).")
+        self._quit(browser)
+        self.stats['recycled'] += 1
+
+    def _quit(self, browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            print(f"[BrowserPool] Error quitting browser: {e}")
+        with self._lock:
+            self._live -= 1
+
+    @contextmanager
+    def driver(self):
+        browser = self.acquire()
+        broken = False
+        try:
+            yield browser.driver
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.release(browser, broken)
+
+    def close(self):
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        print(f"[BrowserPool] Closed. {self.stats['started']} started, "
+              f"{self.stats['reused']} reused, {self.stats['recycled']} recycled.")
@@ -0,0 +1,54 @@
+import os
+import re
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+DEBUG_DIR = os.path.join(os.path.dirname(__file__), '../debug')
+
+class DebugDumper:
+    """
+    Page snapshots (HTML + screenshot) for debugging scrapes. Only the browser
+    round-trips run on the caller's thread; files are written by one background
+    thread into debug_dir, which keeps the newest `keep` snapshots.
+    """
+
+    def __init__(self, debug_dir=DEBUG_DIR, keep=50):
+        self.debug_dir = debug_dir
+        self.keep = keep
+        self._counter = itertools.count()
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def capture(self, driver, label, query='', screenshot=True):
+        try:
+            html = driver.page_source
+            png = driver.get_screenshot_as_png() if screenshot else None
+        except Exception as e:
+            print(f"[Debug] Could not capture {label}: {e}")
+            return None
+        slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')[:40]
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._counter):04d}_{slug}_{label}"
+        return self._writer.submit(self._write, stem, html, png)
+
+    def _write(self, stem, html, png):
+        os.makedirs(self.debug_dir, exist_ok=True)
+        path = os.path.join(self.debug_dir, stem)
+        with open(path + '.html', 'w', encoding='utf-8') as f:
+            f.write(html)
+        if png:
+            with open(path + '.png', 'wb') as f:
+                f.write(png)
+        print(f"[Debug] Saved {path}.html")
+        self._rotate()
+
+    def _rotate(self):
+        stems = sorted({os.path.splitext(name)[0] for name in os.listdir(self.debug_dir)})
+        for stem in stems[:max(0, len(stems) - self.keep)]:
+            for ext in ('.html', '.png'):
+                path = os.path.join(self.debug_dir, stem + ext)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def flush(self):
+        """Block until every queued snapshot is on disk."""
+        self._writer.submit(lambda: None).result()
@@ -1,79 +1,274 @@
 import time
 import random
-import sqlite3
 import os
+import sys
+import hashlib
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage.writer import DbWriter
+from parsers.extractors import Bs4Extractor, is_complete
+import metrics
+
 DB_PATH = os.path.join(os.path.dirname(__file__), '../storage/raw_data.db')
 
+# Transient answers worth another try
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Validators and body hash of the last fetch of each results page, for conditional re-scrapes
+PAGE_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS page_cache (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        body_hash TEXT,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+class RateLimiter:
+    """Spaces out calls from any number of threads to at most `rate` per second (0 = unlimited)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 class KoubaSpider:
-    def __init__(self):
-        self.base_url = "https://koubacomputer.store/?s={}&post_type=product"
+    def __init__(self, store_html='always', html_sample_rate=0.0, site="https://koubacomputer.store",
+                 max_concurrency=4, rate_limit=4.0, pages=3, timeout=30, db_path=DB_PATH, conditional=True,
+                 retries=2, backoff=1.0, writer=None):
+        # store_html='failures' keeps raw_html only for cards whose title/price couldn't be
+        # extracted here (plus a html_sample_rate fraction of the rest for debugging)
+        self.store_html = store_html
+        self.html_sample_rate = html_sample_rate
+        self.extractor = Bs4Extractor()
+        self.site = site.rstrip('/')
+        self.base_url = self.site + "/?s={}&post_type=product"
+        self.pages = pages # Scrape first N pages
+        self.timeout = timeout
+        self.db_path = db_path
+        # Send If-None-Match/If-Modified-Since and skip pages that didn't change since last run
+        self.conditional = conditional
+        # Connection errors, 429 and 5xx are retried after backoff * 2^attempt seconds
+        self.retries = retries
+        self.backoff = backoff
+        # Shared DbWriter (batch mode); scrape_many starts its own otherwise
+        self.writer = writer
+        self.query_latency = {}
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36'
         }
 
-    def scrape(self, query="laptop"):
-        import urllib.parse
+        # One keep-alive session for every page; the pool holds a connection per concurrent fetch.
+        # Only one host is scraped, so max_concurrency/rate_limit are the per-host limits.
+        self.max_concurrency = max_concurrency
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = RateLimiter(rate_limit)
+
+    def keep_html(self, title, price_str):
+        if self.store_html == 'always' or not is_complete(title, price_str):
+            return True
+        return random.random() < self.html_sample_rate
+
+    def page_url(self, query, page):
         encoded_query = urllib.parse.quote(query)
-        
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        saved_count = 0
-        
-        for page in range(1, 4): # Scrape first 3 pages
-            url = f"https://koubacomputer.store/page/{page}/?s={encoded_query}&post_type=product"
-            print(f"[Spider-Kouba] Scrape started for: {query} (Page {page})")
-            print(f"[Spider-Kouba] URL: {url}")
-            
+        return f"{self.site}/page/{page}/?s={encoded_query}&post_type=product"
+
+    def fetch_page(self, query, page, cached=None):
+        """
+        Runs on a worker thread: download + parse one results page.
+        cached is the page's last (etag, last_modified, body_hash), if any.
+        Returns (status, cards or None, message, validators) where status is
+        'parsed', 'not_modified', 'unchanged' or 'failed', cards are
+        (item_id, title, price_str, link, card_html_or_None) tuples and
+        validators the (etag, last_modified, body_hash) to remember.
+        """
+        url = self.page_url(query, page)
+        print(f"[Spider-Kouba] Scrape started for: {query} (Page {page})")
+        print(f"[Spider-Kouba] URL: {url}")
+
+        headers = {}
+        if cached and self.conditional:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        resp = self.get_with_retry(url, headers)
+        if resp.status_code == 304:
+            return 'not_modified', None, f"Page {page} not modified (304), skipped.", cached
+        if resp.status_code != 200:
+            metrics.failure('fetch', f"status_{resp.status_code}", component='kouba')
+            return 'failed', None, f"Failed with status {resp.status_code}", None
+
+        body_hash = hashlib.md5(resp.content).hexdigest()
+        validators = (resp.headers.get('ETag'), resp.headers.get('Last-Modified'), body_hash)
+        if cached and self.conditional and cached[2] == body_hash:
+            return 'unchanged', None, f"Page {page} unchanged since last run, skipped.", validators
+
+        with metrics.timer('parse_seconds', component='kouba'):
+            cards, message = self.parse_page(resp.text, page)
+        return 'parsed', cards, message, validators
+
+    def get_with_retry(self, url, headers):
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
             try:
-                resp = requests.get(url, headers=self.headers, timeout=30)
-                if resp.status_code != 200:
-                    print(f"[Spider-Kouba] Failed with status {resp.status_code}")
-                    break
-
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                products = soup.select('.product')
-                
-                if not products:
-                    print("[Spider-Kouba] No more products found.")
-                    break
-                
-                print(f"[Spider-Kouba] Found {len(products)} products on page {page}.")
-                
-                for item in products:
-                    # Get raw HTML of product card
-                    raw_html = str(item)
-                    
-                    # We need a unique ID. Link is good.
-                    link_el = item.select_one('a.woocommerce-LoopProduct-link')
-                    if not link_el: continue
-                    
-                    link = link_el.get('href')
-                    
-                    # Insert Raw
-                    try:
-                        import hashlib
-                        # ID is hash of link
-                        item_id = hashlib.md5(link.encode('utf-8')).hexdigest()
-                        
-                        c.execute("""
-                            INSERT OR IGNORE INTO listings (id, title, link, raw_html, source, scraped_at) 
-                            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                        """, (item_id, "Pending Parse", link, raw_html, 'kouba'))
-                        saved_count += 1
-                    except Exception as e:
-                        print(f"Error inserting: {e}")
-                        
-            except Exception as e:
-                print(f"[Spider-Kouba] Error on page {page}: {e}")
-                
-        conn.commit()
-        conn.close()
-        print(f"[Spider-Kouba] Total saved {saved_count} items to Raw DB.")
-            
+                with metrics.timer('fetch_seconds', component='kouba'):
+                    resp = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                print(f"[Spider-Kouba] {e}, retrying...")
+                metrics.count('retries', component='kouba', reason=metrics.reason(e))
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return resp
+                print(f"[Spider-Kouba] Status {resp.status_code}, retrying...")
+                metrics.count('retries', component='kouba', reason=f"status_{resp.status_code}")
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def parse_page(self, html, page):
+        soup = BeautifulSoup(html, 'html.parser')
+        products = soup.select('.product')
+
+        if not products:
+            return None, "No more products found."
+
+        cards = []
+        for item in products:
+            # We need a unique ID. Link is good.
+            link_el = item.select_one('a.woocommerce-LoopProduct-link')
+            if not link_el:
+                metrics.skip('parse', 'no_link', component='kouba')
+                continue
+
+            link = link_el.get('href')
+
+            # Pull the fields while the page is parsed anyway, so the processor doesn't have to
+            title, price_str, _ = self.extractor.extract_node(item)
+            if not is_complete(title, price_str):
+                # Left for the processor to retry from the stored HTML
+                metrics.count('cards_incomplete', component='kouba')
+
+            # Get raw HTML of product card
+            card_html = str(item) if self.keep_html(title, price_str) else None
+
+            # ID is hash of link
+            item_id = hashlib.md5(link.encode('utf-8')).hexdigest()
+            cards.append((item_id, title, price_str, link, card_html))
+
+        return cards, f"Found {len(products)} products on page {page}."
+
+    def load_page_cache(self, db, urls):
+        c = db.conn.cursor()
+        c.execute(PAGE_CACHE_SCHEMA)
+        if not self.conditional or not urls:
+            return {}
+        cached = {}
+        # Batched to stay under SQLite's limit on bound variables (999 on older builds)
+        for i in range(0, len(urls), 500):
+            batch = urls[i:i + 500]
+            c.execute(f"SELECT url, etag, last_modified, body_hash FROM page_cache WHERE url IN ({','.join('?' * len(batch))})", batch)
+            cached.update((url, (etag, last_modified, body_hash)) for url, etag, last_modified, body_hash in c.fetchall())
+        return cached
+
+    def save_page(self, db, url, validators, cards):
+        """Runs on the writer thread. Returns the number of cards inserted."""
+        c = db.conn.cursor()
+        if validators:
+            c.execute("""
+                INSERT OR REPLACE INTO page_cache (url, etag, last_modified, body_hash, fetched_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (url, *validators))
+
+        # Insert Raw, batched with other pages by the writer
+        saved = db.save_listings(cards or [], 'kouba')
+        metrics.count('cards_saved', saved, component='kouba')
+        return saved
+
+    def _timed_fetch(self, query, page, cached):
+        return time.perf_counter(), self.fetch_page(query, page, cached)
+
+    def scrape(self, query="laptop"):
+        return self.scrape_many([query])
+
+    def scrape_many(self, queries):
+        """
+        Fetch every page of every query concurrently (bounded by max_concurrency and
+        rate_limit) and hand cards to the DB writer thread as pages complete.
+        Per-query wall time (first page started -> last page done) ends up in query_latency;
+        queries none of whose pages could be fetched are left out and listed in failed_queries.
+        """
+        writer = self.writer or DbWriter(self.db_path).start()
+        saves = []
+        stats = {'parsed': 0, 'not_modified': 0, 'unchanged': 0, 'failed': 0}
+        spans = {}
+        start = time.perf_counter()
+
+        jobs = [(query, page) for query in queries for page in range(1, self.pages + 1)]
+        page_cache = writer.submit(self.load_page_cache, [self.page_url(query, page) for query, page in jobs]).result()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                pool.submit(self._timed_fetch, query, page, page_cache.get(self.page_url(query, page))): (query, page)
+                for query, page in jobs
+            }
+            for future in as_completed(futures):
+                query, page = futures[future]
+                try:
+                    started, (status, cards, message, validators) = future.result()
+                except Exception as e:
+                    print(f"[Spider-Kouba] Error on page {page} ({query}): {e}")
+                    metrics.failure('fetch', metrics.reason(e), component='kouba')
+                    metrics.count('pages', component='kouba', status='failed')
+                    stats['failed'] += 1
+                    continue
+
+                if status != 'failed':
+                    # A query counts as completed once any of its pages came back
+                    first, _ = spans.get(query, (started, None))
+                    spans[query] = (min(first, started), time.perf_counter())
+                stats[status] += 1
+                metrics.count('pages', component='kouba', status=status)
+                print(f"[Spider-Kouba] {message}")
+                if validators or cards:
+                    saves.append(writer.submit(self.save_page, self.page_url(query, page), validators, cards))
 
+        saved_count = sum(f.result() for f in saves)
+        if self.writer is None:
+            writer.close()
+        self.query_latency = {query: end - first for query, (first, end) in spans.items()}
+        self.failed_queries = [query for query in queries if query not in spans]
+        for seconds in self.query_latency.values():
+            metrics.observe('query_seconds', seconds, component='kouba')
+        elapsed = time.perf_counter() - start
+        print(f"[Spider-Kouba] Total saved {saved_count} items to Raw DB "
+              f"({len(jobs)} pages for {len(queries)} queries in {elapsed:.1f}s).")
+        print(f"[Spider-Kouba] Pages: {stats['parsed']} parsed, {stats['not_modified']} not modified, "
+              f"{stats['unchanged']} unchanged, {stats['failed']} failed.")
+        self.last_stats = stats
+        return saved_count
 
 if __name__ == "__main__":
     s = KoubaSpider()
@@ -1,19 +1,116 @@
 import time
 import random
 import json
-import sqlite3
+import hashlib
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from fake_useragent import UserAgent
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage.writer import DbWriter
+from parsers.extractors import get_extractor, is_complete
+from spiders.browser_pool import BrowserPool
+from spiders.debug_dump import DebugDumper, DEBUG_DIR
+import metrics
+
 DB_PATH = os.path.join(os.path.dirname(__file__), '../storage/raw_data.db')
 
+# Ouedkniss search URL each query resolved to (via Google or directly), so it's resolved once
+TARGET_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS target_urls (
+        query TEXT PRIMARY KEY,
+        url TEXT,
+        resolved_by TEXT,
+        resolved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# 2026 Updated Selectors based on debug HTML
+CARD_SELECTOR = 'div.o-announ-card'
+# Older layouts, tried when the current selector finds nothing
+FALLBACK_SELECTOR = 'div.announce-browse-item, a.announce-link, div[class*="AnnounceItem"]'
+
+# Every card on the page in one WebDriver round trip: [href of its first descendant <a>, outerHTML]
+COLLECT_CARDS_JS = """
+return Array.prototype.map.call(document.querySelectorAll(arguments[0]), function (card) {
+    var link = card.querySelector('a');
+    return [link ? link.href : null, card.outerHTML];
+});
+"""
+
+class PhaseTimer:
+    """Wall time per named phase of one query."""
+
+    def __init__(self):
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def __str__(self):
+        return ', '.join(f"{name} {seconds:.1f}s" for name, seconds in self.phases.items())
+
+def is_challenge(driver):
+    title = driver.title
+    return "Cloudflare" in title or "Just a moment" in title
+
+def card_count(driver):
+    return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", CARD_SELECTOR)
+
+def collect_cards(driver, selector=CARD_SELECTOR):
+    """(link, outerHTML) of every card matching selector that has a link."""
+    cards = driver.execute_script(COLLECT_CARDS_JS, selector) or []
+    linked = [(link, html) for link, html in cards if link]
+    if len(linked) < len(cards):
+        metrics.skip('extract', 'no_link', len(cards) - len(linked), component='ouedkniss')
+    return linked
+
+def direct_url(query):
+    formatted_query = query.replace(" ", "-") 
+    return f"https://www.ouedkniss.com/s/1?keywords={formatted_query}"
+
 class LaptopSpider:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, store_html='always', html_sample_rate=0.0,
+                 load_timeout=20, challenge_timeout=30, scroll_timeout=3, max_scrolls=10, jitter=(1.0, 3.0),
+                 google_first=True, debug=False, debug_dir=DEBUG_DIR, debug_keep=50,
+                 retries=1, backoff=5.0, writer=None):
+        # store_html='failures' keeps raw_html only for cards whose title/price couldn't be
+        # extracted here (plus a html_sample_rate fraction of the rest for debugging)
+        self.store_html = store_html
+        self.html_sample_rate = html_sample_rate
+
+        # Waits end as soon as the page is ready; the timeouts only bound the worst case
+        self.load_timeout = load_timeout
+        self.challenge_timeout = challenge_timeout
+        self.scroll_timeout = scroll_timeout
+        self.max_scrolls = max_scrolls
+        # Human-like pause per query (min, max seconds), spent on top of and apart from load waits
+        self.jitter = jitter
+        self._local = threading.local()
+
+        # Queries without a cached target URL go through Google once (google_first) or straight
+        # to the search URL. Snapshots are saved on failures only, or for every page with debug.
+        self.google_first = google_first
+        self.debug = debug
+        self.debug_dumper = DebugDumper(debug_dir, keep=debug_keep)
+        # A query that raised is retried after backoff * 2^attempt seconds (scrape_many)
+        self.retries = retries
+        self.backoff = backoff
+        # Shared DbWriter (batch mode); one is started per call otherwise
+        self.writer = writer
+
         self.options = Options()
         if headless:
             self.options.add_argument('--headless=new')
@@ -30,6 +127,43 @@ class LaptopSpider:
         self.options.add_argument(f'user-agent={user_agent}')
         
         self.driver = None
+        self.pool = None
+
+    @property
+    def extractor(self):
+        # One per thread: pooled queries run concurrently and lxml parsers aren't shared safely
+        extractor = getattr(self._local, 'extractor', None)
+        if extractor is None:
+            extractor = self._local.extractor = get_extractor()
+        return extractor
+
+    def keep_html(self, title, price_str):
+        if self.store_html == 'always' or not is_complete(title, price_str):
+            return True
+        return random.random() < self.html_sample_rate
+
+    def cached_target(self, query):
+        def lookup(db):
+            db.conn.execute(TARGET_CACHE_SCHEMA)
+            row = db.conn.execute("SELECT url FROM target_urls WHERE query = ?", (query,)).fetchone()
+            return row[0] if row else None
+        return self.writer.submit(lookup).result()
+
+    def remember_target(self, query, url, resolved_by):
+        def store(db):
+            db.conn.execute(TARGET_CACHE_SCHEMA)
+            if url:
+                db.conn.execute("INSERT OR REPLACE INTO target_urls (query, url, resolved_by) VALUES (?, ?, ?)",
+                                (query, url, resolved_by))
+            else:
+                db.conn.execute("DELETE FROM target_urls WHERE query = ?", (query,))
+        self.writer.submit(store)
+
+    def save_cards(self, db, cards):
+        """Runs on the writer thread. Returns the number of cards inserted."""
+        saved = db.save_listings(cards, 'ouedkniss')
+        metrics.count('cards_saved', saved, component='ouedkniss')
+        return saved
 
     def start_driver(self):
         print("[Spider] Starting Standard Chrome (via Manager)...")
@@ -37,126 +171,245 @@ class LaptopSpider:
         self.driver = webdriver.Chrome(service=service, options=self.options)
 
     def scrape_ouedkniss(self, query="laptop"):
-        if not self.driver:
-            self.start_driver()
+        """
+        Scrape one query. Uses a warm browser from self.pool when one is open
+        (see scrape_many), otherwise starts Chrome for this query and quits it after.
+        """
+        start = time.perf_counter()
+        saved_count = None
+        own_writer = self.writer is None
+        if own_writer:
+            self.writer = DbWriter(DB_PATH).start()
+        try:
+            if self.pool:
+                with self.pool.driver() as driver:
+                    saved_count = self._scrape_or_dump(driver, query)
+            else:
+                if not self.driver:
+                    self.start_driver()
+                saved_count = self._scrape_or_dump(self.driver, query)
+
+        except Exception as e:
+            print(f"[Spider] Error: {e}")
+            metrics.failure('query', metrics.reason(e), component='ouedkniss')
             
+        finally:
+            if self.driver:
+                self.driver.quit()
+                self.driver = None
+            if own_writer:
+                self.writer.close()
+                self.writer = None
+        print(f"[Spider] Query '{query}' took {time.perf_counter() - start:.1f}s.")
+        return saved_count
+
+    def scrape_many(self, queries, pool_size=2, max_pages=50, max_growth_mb=500):
+        """
+        Scrape a batch of queries on a pool of pool_size warm browsers, recycled
+        after max_pages queries or max_growth_mb of memory growth each.
+        """
+        self.pool = BrowserPool(self.options, size=pool_size, max_pages=max_pages, max_growth_mb=max_growth_mb)
+        own_writer = self.writer is None
+        if own_writer:
+            self.writer = DbWriter(DB_PATH).start()
+        self.query_latency = {}
+        self.failed_queries = []
+        try:
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                futures = {executor.submit(self._timed_scrape, query): query for query in queries}
+                for future in as_completed(futures):
+                    elapsed = future.result()
+                    # Failed queries have no latency; they're reported apart
+                    if elapsed is None:
+                        self.failed_queries.append(futures[future])
+                    else:
+                        self.query_latency[futures[future]] = elapsed
+        finally:
+            self.pool.close()
+            self.pool = None
+            if own_writer:
+                self.writer.close()
+                self.writer = None
+
+        latencies = sorted(self.query_latency.values())
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            print(f"[Spider] {len(latencies)} queries: p50 {p50:.1f}s, max {latencies[-1]:.1f}s per query.")
+        if self.failed_queries:
+            print(f"[Spider] {len(self.failed_queries)} queries failed after {self.retries} retries: {', '.join(self.failed_queries)}")
+        return latencies
+
+    def _timed_scrape(self, query):
+        """Seconds the query took (retries included), or None if every attempt failed."""
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            # None means the query raised (a 0 listings result isn't retried)
+            if self.scrape_ouedkniss(query) is not None:
+                break
+            if attempt < self.retries:
+                delay = self.backoff * 2 ** attempt
+                print(f"[Spider] Retrying '{query}' in {delay:.0f}s...")
+                metrics.count('retries', component='ouedkniss', reason='query_failed')
+                time.sleep(delay)
+        else:
+            return None
+        elapsed = time.perf_counter() - start
+        metrics.observe('query_seconds', elapsed, component='ouedkniss')
+        return elapsed
+
+    def wait_for(self, driver, condition, timeout, poll=0.25):
+        """True once condition(driver) holds, False if it still doesn't after timeout seconds."""
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+            return True
+        except TimeoutException:
+            return False
+
+    def wait_for_cards(self, driver):
+        ready = self.wait_for(driver, lambda d: card_count(d) > 0 or is_challenge(d), self.load_timeout)
+        if ready and is_challenge(driver):
+            print("[Spider] Cloudflare detected! Waiting for the challenge to clear...")
+            metrics.count('challenges', component='ouedkniss')
+            ready = self.wait_for(driver, lambda d: card_count(d) > 0, self.challenge_timeout)
+        return ready and card_count(driver) > 0
+
+    def scroll_until_stable(self, driver):
+        """Scroll to the bottom until a scroll loads no new cards within scroll_timeout."""
+        count = card_count(driver)
+        for _ in range(self.max_scrolls):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            if not self.wait_for(driver, lambda d: card_count(d) > count, self.scroll_timeout):
+                break
+            count = card_count(driver)
+        return count
+
+    def _scrape_or_dump(self, driver, query):
+        try:
+            return self._scrape(driver, query)
+        except Exception:
+            self.debug_dumper.capture(driver, 'error', query)
+            raise
+
+    def resolve_target(self, driver, query):
+        """Returns (target_url, resolved_by) with resolved_by one of 'cache', 'google', 'direct'."""
+        target_url = self.cached_target(query)
+        if target_url:
+            print(f"[Spider] Cached target for '{query}': {target_url}")
+            return target_url, 'cache'
+        if not self.google_first:
+            return direct_url(query), 'direct'
+        return self.google_target(driver, query)
+
+    def google_target(self, driver, query):
         # Google First Strategy as requested by user
         search_term = f"{query} ouedkniss"
         print(f"[Spider] Google-First Strategy: Searching for '{search_term}'...")
         
-        try:
-            self.driver.get("https://www.google.com")
-            time.sleep(2)
-            
-            # Type into search
-            search_box = self.driver.find_element(By.NAME, "q")
-            search_box.send_keys(search_term)
-            search_box.submit()
-            time.sleep(3)
-            
-            # Find first Ouedkniss link
-            # Selector for standard google results
-            # Try multiple selectors for Google results
-            # h3 is usually the title, closest a is parent
-            
-            print("[Spider] dumping google debug...")
-            self.driver.save_screenshot("debug_google_search.png")
-            with open("debug_google_search.html", "w", encoding="utf-8") as f:
-                f.write(self.driver.page_source)
+        driver.get("https://www.google.com")
+        self.wait_for(driver, lambda d: d.find_elements(By.NAME, "q"), self.load_timeout)
+        
+        # Type into search
+        search_box = driver.find_element(By.NAME, "q")
+        search_box.send_keys(search_term)
+        search_box.submit()
+        self.wait_for(driver, lambda d: d.find_elements(By.ID, "search"), self.load_timeout)
+        
+        # Find first Ouedkniss link
+        # Selector for standard google results
+        # Try multiple selectors for Google results
+        # h3 is usually the title, closest a is parent
+        
+        if self.debug:
+            self.debug_dumper.capture(driver, 'google', query)
 
-            links = self.driver.find_elements(By.XPATH, "//a[contains(@href, 'ouedkniss.com')]")
-            
-            target_url = None
-            for link in links:
-                href = link.get_attribute("href")
-                if href and "ouedkniss.com" in href and "google" not in href:
-                    target_url = href
-                    print(f"[Spider] Found Google Result: {target_url}")
-                    break
-            
-            if not target_url:
-                print("[Spider] Could not find a valid Ouedkniss link on Google. Falling back to direct URL.")
-                formatted_query = query.replace(" ", "-") 
-                target_url = f"https://www.ouedkniss.com/s/1?keywords={formatted_query}"
-
-            print(f"[Spider] Navigating to Target: {target_url}")
-            self.driver.get(target_url)
-            time.sleep(5) # Let Ouedkniss load properly
-            time.sleep(random.uniform(3, 6))
-            
-            # Check for Cloudflare challenge
-            title = self.driver.title
-            if "Cloudflare" in title or "Just a moment" in title:
-                print("[Spider] Cloudflare detected! Waiting/Saving snapshot...")
-                time.sleep(10)
-                # Attempt to save snapshot anyway
-                
-            # Scroll to load more items (store layout)
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-            time.sleep(2)
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
-
-            # Extract raw listings (store items typically in divs)
-            # 2026 Updated Selectors based on debug HTML
-            # Container: div.o-announ-card
-            products = self.driver.find_elements(By.CSS_SELECTOR, 'div.o-announ-card')
-            
-            if not products:
-                 print("[Spider] Found 0 listings via new selector. Dumping HTML for debug...")
-                 with open("debug_ouedkniss_source.html", "w", encoding="utf-8") as f:
-                     f.write(self.driver.page_source)
-                 
-                 # Fallback to old selectors just in case
-                 products = self.driver.find_elements(By.CSS_SELECTOR, 'div.announce-browse-item, a.announce-link, div[class*="AnnounceItem"]')
-
-            print(f"[Spider] Found {len(products)} potential listings.")
+        links = driver.find_elements(By.XPATH, "//a[contains(@href, 'ouedkniss.com')]")
+        
+        target_url = None
+        for link in links:
+            href = link.get_attribute("href")
+            if href and "ouedkniss.com" in href and "google" not in href:
+                target_url = href
+                print(f"[Spider] Found Google Result: {target_url}")
+                break
+        
+        if not target_url:
+            print("[Spider] Could not find a valid Ouedkniss link on Google. Falling back to direct URL.")
+            if not self.debug:
+                self.debug_dumper.capture(driver, 'google', query)
+            return direct_url(query), 'direct'
+        return target_url, 'google'
+
+    def _scrape(self, driver, query):
+        timer = PhaseTimer()
+        target_url, resolved_by = self.resolve_target(driver, query)
+        timer.lap('resolve')
+
+        print(f"[Spider] Navigating to Target: {target_url}")
+        driver.get(target_url)
+        # Let Ouedkniss load properly (and get through a Cloudflare challenge, if any)
+        if not self.wait_for_cards(driver):
+            print(f"[Spider] No cards after {self.load_timeout}s.")
+            metrics.failure('fetch', 'no_cards', component='ouedkniss')
+        timer.lap('load')
+
+        if self.jitter:
+            time.sleep(random.uniform(*self.jitter))
+            timer.lap('jitter')
             
-            saved_count = 0
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
+        # Scroll to load more items (store layout)
+        self.scroll_until_stable(driver)
+        timer.lap('scroll')
+
+        # Extract raw listings (store items typically in divs)
+        # Container: div.o-announ-card. Links and HTML of all cards come back in one call,
+        # instead of find_element/get_attribute round trips per card.
+        products = collect_cards(driver)
+        
+        if not products:
+             print("[Spider] Found 0 listings via new selector. Dumping HTML for debug...")
+             self.debug_dumper.capture(driver, 'ouedkniss', query)
+             
+             # Fallback to old selectors just in case
+             products = collect_cards(driver, FALLBACK_SELECTOR)
+
+        print(f"[Spider] Found {len(products)} potential listings.")
+        if self.debug and products:
+            self.debug_dumper.capture(driver, 'ouedkniss', query)
 
-            for item in products:
+        # Remember a target that produced listings; forget a cached one that stopped working
+        if products and resolved_by != 'cache':
+            self.remember_target(query, target_url, resolved_by)
+        elif not products and resolved_by == 'cache':
+            self.remember_target(query, None, resolved_by)
+        
+        cards = []
+        with metrics.timer('extract_seconds', component='ouedkniss'):
+            for link, raw_html in products:
                 try:
-                    # Extract link - The card itself might contain the link or be wrapped
-                    link_el = item.find_element(By.TAG_NAME, 'a')
-                    if not link_el: continue
-                    
-                    link = link_el.get_attribute('href')
-                    
-                    # Title (optional for raw, but good for debug)
-                    try:
-                        title = item.find_element(By.CSS_SELECTOR, 'h3, div[class*="title"]').text
-                    except:
-                        title = "Unknown"
-                    
-                    # Raw HTML of the card
-                    raw_html = item.get_attribute('outerHTML')
-                    
+                    # Same title/price the processor would parse out of raw_html, done locally (no WebDriver calls)
+                    title, price_str, _ = self.extractor.extract(raw_html)
+                    if not is_complete(title, price_str):
+                        # Left for the processor to retry from the stored HTML
+                        metrics.count('cards_incomplete', component='ouedkniss')
+
                     # Generate ID
-                    import hashlib
                     item_id = hashlib.md5(link.encode('utf-8')).hexdigest()
-                    
-                    c.execute("""
-                        INSERT OR IGNORE INTO listings (id, title, link, raw_html, source, scraped_at) 
-                        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    """, (item_id, title, link, raw_html, 'ouedkniss'))
-                    saved_count += 1
-                    
+                    cards.append((item_id, title, price_str, link, raw_html if self.keep_html(title, price_str) else None))
+
                 except Exception as e:
-                    # print(f"Error parsing item: {e}")
+                    metrics.failure('extract', metrics.reason(e), component='ouedkniss')
                     continue
-            
-            conn.commit()
-            conn.close()
-            print(f"[Spider] Saved {saved_count} raw items to DB.")
-
-        except Exception as e:
-            print(f"[Spider] Error: {e}")
-            
-        finally:
-            if self.driver:
-                self.driver.quit()
+        
+        # One executemany on the writer thread, shared with the other browsers/spiders in a batch
+        saved_count = self.writer.submit(self.save_cards, cards).result()
+        timer.lap('extract')
+        print(f"[Spider] Saved {saved_count} raw items to DB.")
+        print(f"[Spider] Phases: {timer}")
+        # Load and scroll are the fetch; the per-phase split is kept too
+        metrics.observe('fetch_seconds', timer.phases.get('load', 0.0) + timer.phases.get('scroll', 0.0), component='ouedkniss')
+        for name, seconds in timer.phases.items():
+            metrics.observe('phase_seconds', seconds, component='ouedkniss', phase=name)
+        return saved_count
 
 if __name__ == "__main__":
     spider = LaptopSpider(headless=False)
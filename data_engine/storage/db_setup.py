@@ -1,12 +1,17 @@
 import sqlite3
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage.html_store import ensure_schema
+from storage.writer import connect
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'raw_data.db')
 CLEAN_DB_PATH = os.path.join(os.path.dirname(__file__), 'clean_data.db')
 
-def init_db():
+def init_db(raw_path=DB_PATH, clean_path=CLEAN_DB_PATH):
     # Raw Data DB
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(raw_path)
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS listings (
         id TEXT PRIMARY KEY,
@@ -17,15 +22,18 @@ def init_db():
         raw_html TEXT,
         scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
+    # Compressed card HTML (html_blobs) + listings.html_hash
+    ensure_schema(conn)
     conn.commit()
     conn.close()
-    print(f"[Storage] Initialized Raw DB at {DB_PATH}")
+    print(f"[Storage] Initialized Raw DB at {raw_path}")
 
     # Clean Data DB
-    conn = sqlite3.connect(CLEAN_DB_PATH)
+    conn = connect(clean_path)
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS products (
         hash_id TEXT PRIMARY KEY,
+        title TEXT,
         category TEXT,
         brand TEXT,
         model TEXT,
@@ -34,11 +42,15 @@ def init_db():
         currency TEXT,
         source TEXT,
         link TEXT,
-        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        market_bucket TEXT,
+        outlier INTEGER DEFAULT 0,
+        simhash INTEGER,
+        duplicate_of TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
     conn.commit()
     conn.close()
-    print(f"[Storage] Initialized Clean DB at {CLEAN_DB_PATH}")
+    print(f"[Storage] Initialized Clean DB at {clean_path}")
 
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,186 @@
+import os
+import re
+import sys
+import time
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage.market import model_key, NOISE_WORDS
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'clean_data.db')
+
+# Two listings are the same laptop when their 64-bit SimHashes differ in at most
+# MAX_DISTANCE bits and their prices are within PRICE_TOLERANCE of each other.
+# Split into MAX_DISTANCE + 1 bands, two such signatures agree exactly on at least one
+# band, so only signatures sharing a band are ever compared.
+MAX_DISTANCE = 3
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = 64 // BANDS
+PRICE_TOLERANCE = 0.10
+
+# The model and parsed specs say what the machine is; the rest of the title is seller wording.
+# A fixed bias feature settles the bits the identity features cancel out on, so a few words of
+# wording can't flip them (with equal weights, about a quarter of the bits would otherwise tie).
+MODEL_WEIGHT = 8
+SPEC_WEIGHT = 8
+WORD_WEIGHT = 1
+BIAS_WEIGHT = 4
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+AD_NUMBER_RE = re.compile(r'#\d+')
+
+_vectors = {}
+
+def _vector(feature):
+    """+1/-1 per bit of the feature's 64-bit hash; vocabularies are small, so these are kept."""
+    vector = _vectors.get(feature)
+    if vector is None:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        bits = np.unpackbits(np.frombuffer(digest, dtype=np.uint8))
+        vector = _vectors[feature] = bits.astype(np.int32) * 2 - 1
+    return vector
+
+def features(title, specs=None):
+    """(feature, weight) pairs: normalized model words, spec values, then any other title words."""
+    specs = specs or {}
+    model = model_key(title, specs=specs).split()
+    spec_values = [(field, WORD_RE.findall(str(value).lower())) for field, value in sorted(specs.items())]
+    known = set(model).union(*(words for _, words in spec_values))
+    # Ad numbering ("#12") doesn't make it another machine
+    words = [w for w in WORD_RE.findall(AD_NUMBER_RE.sub(' ', (title or '').lower()))
+             if w not in NOISE_WORDS and w not in known]
+    result = [('', BIAS_WEIGHT)]
+    result += [(f"m:{w}", MODEL_WEIGHT) for w in model]
+    result += [(f"s:{field}:{' '.join(v)}", SPEC_WEIGHT) for field, v in spec_values]
+    result += [(f"w:{w}", WORD_WEIGHT) for w in words]
+    return result
+
+def simhash(title, specs=None):
+    """64-bit SimHash of a listing as a signed integer (what an SQLite INTEGER holds)."""
+    weighted = features(title, specs)
+    total = np.dot([weight for _, weight in weighted], [_vector(feature) for feature, _ in weighted])
+    value = int.from_bytes(np.packbits(total > 0).tobytes(), 'big')
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _close(a, b):
+    return abs(a - b) <= PRICE_TOLERANCE * min(a, b)
+
+def cluster(signatures, prices):
+    """
+    Group listings into near-duplicate clusters, oldest first: a listing joins the oldest
+    canonical listing before it that is within MAX_DISTANCE bits and PRICE_TOLERANCE of it,
+    or else becomes canonical itself. Listings are only ever compared with canonical ones, so
+    chains (A~B, B~C but A far from C) don't merge. Returns, per listing, the index of its
+    canonical listing (so callers order them oldest first), and how many candidate signature
+    pairs were checked. Listings without a price stay on their own.
+    """
+    n = len(signatures)
+    roots = list(range(n))
+    mask = (1 << BAND_BITS) - 1
+    # Signatures within MAX_DISTANCE bits agree exactly on at least one band, so each new
+    # signature is only compared with those sharing a band, once, to list its neighbours
+    buckets = defaultdict(list)
+    neighbours = {}
+    # signature -> its canonical listings, oldest first
+    canonicals = defaultdict(list)
+    comparisons = 0
+    for i in range(n):
+        price = prices[i]
+        if not price or price <= 0:
+            continue
+        signature = signatures[i]
+        if signature not in neighbours:
+            near = []
+            checked = set()
+            unsigned = signature & ((1 << 64) - 1)
+            for band in range(BANDS):
+                bucket = buckets[(band, (unsigned >> (band * BAND_BITS)) & mask)]
+                for other in bucket:
+                    if other in checked:
+                        continue
+                    checked.add(other)
+                    comparisons += 1
+                    if ((signature ^ other) & ((1 << 64) - 1)).bit_count() <= MAX_DISTANCE:
+                        near.append(other)
+                        neighbours[other].append(signature)
+                bucket.append(signature)
+            neighbours[signature] = near
+
+        best = None
+        for other in [signature] + neighbours[signature]:
+            for j in canonicals.get(other, ()):
+                if best is not None and j > best:
+                    break
+                if _close(price, prices[j]):
+                    best = j
+                    break
+        if best is None:
+            canonicals[signature].append(i)
+        else:
+            roots[i] = best
+    return roots, comparisons
+
+def ensure_schema(conn):
+    """Index behind alternate_links() and the duplicate_of IS NULL filters. Caller commits."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_duplicate ON products (duplicate_of)")
+
+def dedupe(conn, table='products'):
+    """
+    Re-cluster every priced listing in table and point each duplicate's duplicate_of at its
+    cluster's canonical (first seen) product; canonical ones get NULL. Only changed rows are
+    written. Returns stats including the market buckets whose membership changed. Caller commits.
+    """
+    timings = {}
+    start = time.perf_counter()
+    rows = conn.execute(f"""
+        SELECT rowid, hash_id, simhash, price, duplicate_of, market_bucket FROM {table}
+        WHERE simhash IS NOT NULL ORDER BY created_at, rowid
+    """).fetchall()
+    timings['read'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    roots, comparisons = cluster([r[2] for r in rows], [r[3] for r in rows])
+    timings['cluster'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    changed = []
+    buckets = set()
+    for i, ((rowid, _, _, _, duplicate_of, bucket), root) in enumerate(zip(rows, roots)):
+        canonical = rows[root][1] if root != i else None
+        if canonical != duplicate_of:
+            changed.append((canonical, rowid))
+            buckets.add(bucket)
+    conn.executemany(f"UPDATE {table} SET duplicate_of = ? WHERE rowid = ?", changed)
+    timings['write'] = time.perf_counter() - start
+
+    sizes = defaultdict(int)
+    for root in roots:
+        sizes[root] += 1
+    clusters = sum(1 for size in sizes.values() if size > 1)
+    return {
+        'listings': len(rows),
+        'clusters': clusters,
+        'duplicates': len(rows) - len(sizes),
+        'changed': len(changed),
+        'comparisons': comparisons,
+        'buckets': buckets,
+        'timings': timings,
+    }
+
+def alternate_links(conn, hash_id):
+    """(link, source) of every listing folded into the given canonical product."""
+    return conn.execute("SELECT link, source FROM products WHERE duplicate_of = ? ORDER BY created_at, rowid",
+                        (hash_id,)).fetchall()
+
+if __name__ == "__main__":
+    import sqlite3
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    stats = dedupe(conn)
+    conn.commit()
+    print(f"[Dedup] {stats['listings']} listings, {stats['clusters']} duplicate clusters, "
+          f"{stats['duplicates']} duplicates ({stats['changed']} changed).")
+    conn.close()
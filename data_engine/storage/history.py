@@ -0,0 +1,192 @@
+import os
+import sys
+import statistics
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'clean_data.db')
+
+# Append-only, run-length encoded: a row only when a product's price (or bucket) changes.
+# A product's price holds from its row's observed_at until its next row; NULL = listing gone.
+HISTORY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS price_history (
+        id INTEGER PRIMARY KEY,
+        hash_id TEXT,
+        market_bucket TEXT,
+        price REAL,
+        observed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Old observations downsampled per bucket: period is 'day' or 'week' (period_start = the Monday)
+ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS price_rollup (
+        market_bucket TEXT,
+        period TEXT,
+        period_start TEXT,
+        count INTEGER,
+        min REAL,
+        median REAL,
+        max REAL,
+        PRIMARY KEY (market_bucket, period, period_start)
+    ) WITHOUT ROWID
+"""
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_history_product ON price_history (hash_id, observed_at)",
+    "CREATE INDEX IF NOT EXISTS idx_history_bucket ON price_history (market_bucket, observed_at)",
+]
+
+TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON products BEGIN
+        INSERT INTO price_history (hash_id, market_bucket, price) VALUES (new.hash_id, new.market_bucket, new.price);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS history_update AFTER UPDATE OF price, market_bucket ON products
+        WHEN old.price IS NOT new.price OR old.market_bucket IS NOT new.market_bucket BEGIN
+        INSERT INTO price_history (hash_id, market_bucket, price) VALUES (new.hash_id, new.market_bucket, new.price);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON products BEGIN
+        INSERT INTO price_history (hash_id, market_bucket, price) VALUES (old.hash_id, old.market_bucket, NULL);
+    END""",
+]
+
+# Each product's most recent observation
+LATEST_SQL = """
+    SELECT h.hash_id, h.market_bucket, h.price FROM price_history h
+    JOIN (SELECT hash_id, MAX(id) AS id FROM price_history GROUP BY hash_id) latest ON latest.id = h.id
+"""
+
+def has_schema(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_insert'").fetchone() is not None
+
+def ensure_schema(conn, rebuild=False):
+    """
+    Create the history tables, indexes and the triggers that record price changes as
+    products are written. A new history is seeded from products; with rebuild=True
+    (after the processor swaps in a rebuilt table, which fired no triggers) the changes
+    since the last recorded prices are appended instead. Caller commits.
+    """
+    c = conn.cursor()
+    fresh = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'price_history'").fetchone() is None
+    c.execute(HISTORY_SCHEMA)
+    c.execute(ROLLUP_SCHEMA)
+    for statement in INDEXES + TRIGGERS:
+        c.execute(statement)
+    if fresh:
+        c.execute("""
+            INSERT INTO price_history (hash_id, market_bucket, price, observed_at)
+            SELECT hash_id, market_bucket, price, COALESCE(created_at, CURRENT_TIMESTAMP) FROM products ORDER BY rowid
+        """)
+    elif rebuild:
+        c.execute(f"""
+            INSERT INTO price_history (hash_id, market_bucket, price)
+            SELECT latest.hash_id, latest.market_bucket, NULL FROM ({LATEST_SQL}) latest
+            WHERE latest.price IS NOT NULL AND NOT EXISTS (SELECT 1 FROM products p WHERE p.hash_id = latest.hash_id)
+        """)
+        c.execute(f"""
+            INSERT INTO price_history (hash_id, market_bucket, price)
+            SELECT p.hash_id, p.market_bucket, p.price FROM products p
+            LEFT JOIN ({LATEST_SQL}) latest ON latest.hash_id = p.hash_id
+            WHERE latest.hash_id IS NULL OR latest.price IS NOT p.price OR latest.market_bucket IS NOT p.market_bucket
+            ORDER BY p.rowid
+        """)
+
+def product_history(conn, hash_id, since=None, until=None):
+    """(observed_at, price) changes for one product, oldest first."""
+    return conn.execute("""
+        SELECT observed_at, price FROM price_history
+        WHERE hash_id = ? AND observed_at >= COALESCE(?, '') AND observed_at < COALESCE(?, '9999')
+        ORDER BY observed_at, id
+    """, (hash_id, since, until)).fetchall()
+
+def bucket_history(conn, bucket, since=None, until=None):
+    """(observed_at, hash_id, price) changes within a market bucket, oldest first."""
+    return conn.execute("""
+        SELECT observed_at, hash_id, price FROM price_history
+        WHERE market_bucket = ? AND observed_at >= COALESCE(?, '') AND observed_at < COALESCE(?, '9999')
+        ORDER BY observed_at, id
+    """, (bucket, since, until)).fetchall()
+
+def price_drops(conn, since, min_drop=0.05):
+    """Products whose price fell by at least min_drop since `since`: (hash_id, old price, new price, observed_at)."""
+    return conn.execute("""
+        SELECT hash_id, previous, price, observed_at FROM (
+            SELECT hash_id, price, observed_at,
+                   LAG(price) OVER (PARTITION BY hash_id ORDER BY observed_at, id) AS previous
+            FROM price_history
+        )
+        WHERE observed_at >= ? AND price IS NOT NULL AND previous IS NOT NULL AND price <= previous * (1 - ?)
+        ORDER BY observed_at DESC
+    """, (since, min_drop)).fetchall()
+
+def _merge(conn, period, groups):
+    """Upsert {(bucket, period_start): [(count, min, median, max), ...]} into price_rollup."""
+    rows = []
+    for (bucket, start), parts in groups.items():
+        existing = conn.execute("SELECT count, min, median, max FROM price_rollup WHERE market_bucket = ? AND period = ? AND period_start = ?",
+                                (bucket, period, start)).fetchone()
+        if existing:
+            parts.append(existing)
+        count = sum(p[0] for p in parts)
+        # Count-weighted median of the parts' medians (exact when there's one part)
+        ordered = sorted(parts, key=lambda p: p[2])
+        half, seen, median = count / 2, 0, ordered[-1][2]
+        for part in ordered:
+            seen += part[0]
+            if seen >= half:
+                median = part[2]
+                break
+        rows.append((bucket, period, start, count, min(p[1] for p in parts), median, max(p[3] for p in parts)))
+    conn.executemany("INSERT OR REPLACE INTO price_rollup VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def rollup(conn, raw_days=90, daily_days=365, now=None):
+    """
+    Downsample history: observations older than raw_days become daily min/median/max per
+    bucket, daily rows older than daily_days become weekly ones. Each product's latest
+    observation is always kept, since it's what the next change is compared with.
+    Safe to re-run. Caller commits.
+    """
+    # Cutoffs are compared as text, so each is formatted like the column it's compared with:
+    # observed_at is a UTC CURRENT_TIMESTAMP, period_start a date
+    now = now or datetime.now(timezone.utc)
+    raw_cutoff = (now - timedelta(days=raw_days)).strftime('%Y-%m-%d %H:%M:%S')
+    daily_cutoff = (now - timedelta(days=daily_days)).strftime('%Y-%m-%d')
+    c = conn.cursor()
+
+    rows = c.execute("""
+        SELECT h.id, h.market_bucket, date(h.observed_at), h.price FROM price_history h
+        WHERE h.observed_at < ? AND h.id NOT IN (SELECT MAX(id) FROM price_history GROUP BY hash_id)
+    """, (raw_cutoff,)).fetchall()
+    days = defaultdict(list)
+    for _, bucket, day, price in rows:
+        if bucket is not None and price is not None:
+            days[(bucket, day)].append(price)
+    daily = _merge(conn, 'day', {key: [(len(prices), min(prices), statistics.median(prices), max(prices))]
+                                 for key, prices in days.items()})
+    c.executemany("DELETE FROM price_history WHERE id = ?", [(row[0],) for row in rows])
+
+    old_days = c.execute("""
+        SELECT market_bucket, date(period_start, '-6 days', 'weekday 1'), count, min, median, max, period_start
+        FROM price_rollup WHERE period = 'day' AND period_start < ?
+    """, (daily_cutoff,)).fetchall()
+    weeks = defaultdict(list)
+    for bucket, week, count, low, median, high, _ in old_days:
+        weeks[(bucket, week)].append((count, low, median, high))
+    weekly = _merge(conn, 'week', weeks)
+    c.executemany("DELETE FROM price_rollup WHERE market_bucket = ? AND period = 'day' AND period_start = ?",
+                  [(row[0], row[6]) for row in old_days])
+
+    return {'observations': len(rows), 'days': daily, 'weeks': weekly}
+
+if __name__ == "__main__":
+    import sqlite3
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    if '--rollup' in sys.argv:
+        stats = rollup(conn)
+        print(f"[History] Rolled {stats['observations']} observations into {stats['days']} daily / {stats['weeks']} weekly rows.")
+    conn.commit()
+    count = conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+    print(f"[History] {count} price observations.")
+    conn.close()
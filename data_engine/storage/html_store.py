@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+import zlib
+import hashlib
+import sqlite3
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'raw_data.db')
+
+# Card HTML lives here once per distinct content; listings.html_hash points at it
+BLOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS html_blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT,
+        data BLOB,
+        size INTEGER
+    )
+"""
+
+# zstd dictionaries trained per source on its own cards (WooCommerce / Ouedkniss boilerplate)
+DICTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS html_dicts (
+        dict_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT,
+        data BLOB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# For readers that just want SQL: SELECT {RAW_HTML_SQL} AS raw_html FROM listings l {RAW_HTML_JOIN}
+RAW_HTML_SQL = "COALESCE(l.raw_html, html_decompress(b.codec, b.data))"
+RAW_HTML_JOIN = "LEFT JOIN html_blobs b ON b.hash = l.html_hash"
+
+def raw_html_select(conn):
+    """
+    (expression, join) that reads listings' card HTML on this connection: RAW_HTML_SQL and
+    RAW_HTML_JOIN, or plain l.raw_html on a raw DB from before html_blobs (read-only
+    readers can't migrate it).
+    """
+    has_blobs = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'html_blobs'").fetchone() is not None
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(listings)")}
+    if has_blobs and 'html_hash' in columns:
+        return RAW_HTML_SQL, RAW_HTML_JOIN
+    return "l.raw_html", ""
+
+def ensure_schema(conn):
+    c = conn.cursor()
+    c.execute(BLOBS_SCHEMA)
+    c.execute(DICTS_SCHEMA)
+    c.execute("PRAGMA table_info(listings)")
+    columns = {r[1] for r in c.fetchall()}
+    if columns and 'html_hash' not in columns:
+        c.execute("ALTER TABLE listings ADD COLUMN html_hash TEXT")
+    if columns:
+        # Lets a re-scrape tell whether a replaced card's blob is still referenced
+        c.execute("CREATE INDEX IF NOT EXISTS idx_listings_html_hash ON listings (html_hash)")
+
+def content_hash(html):
+    return hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+class HtmlStore:
+    """
+    Compressed, content-addressed storage for card HTML in the raw DB.
+    New blobs use zstd (with the source's latest trained dictionary, if any) when
+    zstandard is installed, zlib otherwise. zstd blobs need zstandard to read back.
+    readonly=True only reads: no tables are created, so it works on a read-only connection.
+    """
+
+    def __init__(self, conn, level=None, readonly=False):
+        self.conn = conn
+        self.level = level
+        if not readonly:
+            ensure_schema(conn)
+        self._dicts = {}
+        self._compressors = {}
+        self._decompressors = {}
+        self._latest = {}
+        c = conn.cursor()
+        if readonly and c.execute("SELECT 1 FROM sqlite_master WHERE name = 'html_dicts'").fetchone() is None:
+            return
+        c.execute("SELECT dict_id, source, data FROM html_dicts ORDER BY dict_id")
+        for dict_id, source, data in c.fetchall():
+            self._dicts[dict_id] = data
+            self._latest[source] = dict_id
+
+    def _codec_for(self, source):
+        if zstandard is None:
+            return 'zlib'
+        dict_id = self._latest.get(source)
+        return f"zstd:{dict_id}" if dict_id else 'zstd'
+
+    def _zstd_dict(self, codec):
+        if codec == 'zstd':
+            return None
+        return zstandard.ZstdCompressionDict(self._dicts[int(codec.split(':')[1])])
+
+    def compress(self, html, source=None):
+        """Returns (codec, data)."""
+        raw = html.encode('utf-8')
+        codec = self._codec_for(source)
+        if codec == 'zlib':
+            return codec, zlib.compress(raw, self.level or 6)
+        compressor = self._compressors.get(codec)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=self.level or 9, dict_data=self._zstd_dict(codec))
+            self._compressors[codec] = compressor
+        return codec, compressor.compress(raw)
+
+    def decompress(self, codec, data):
+        if codec is None:
+            return None
+        if codec == 'zlib':
+            return zlib.decompress(data).decode('utf-8')
+        decompressor = self._decompressors.get(codec)
+        if decompressor is None:
+            if zstandard is None:
+                raise ImportError("zstandard is required to read zstd-compressed HTML (pip install zstandard)")
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict(codec))
+            self._decompressors[codec] = decompressor
+        return decompressor.decompress(data).decode('utf-8')
+
+    def put(self, html, source=None):
+        """Store html (deduplicated by content) and return its hash for listings.html_hash."""
+        key = content_hash(html)
+        c = self.conn.cursor()
+        c.execute("SELECT 1 FROM html_blobs WHERE hash = ?", (key,))
+        if c.fetchone() is None:
+            codec, data = self.compress(html, source)
+            c.execute("INSERT OR IGNORE INTO html_blobs (hash, codec, data, size) VALUES (?, ?, ?, ?)",
+                      (key, codec, data, len(html.encode('utf-8'))))
+        return key
+
+    def get(self, key):
+        c = self.conn.cursor()
+        c.execute("SELECT codec, data FROM html_blobs WHERE hash = ?", (key,))
+        row = c.fetchone()
+        return self.decompress(*row) if row else None
+
+    def train(self, source, dict_size=64 * 1024, max_samples=5000):
+        """Train a zstd dictionary on this source's stored cards. Returns the new dict_id, or None."""
+        if zstandard is None:
+            print("[Storage] zstandard is not installed, can't train a dictionary.")
+            return None
+        c = self.conn.cursor()
+        c.execute(f"""
+            SELECT l.raw_html, b.codec, b.data FROM listings l {RAW_HTML_JOIN}
+            WHERE l.source = ? AND (l.raw_html IS NOT NULL OR b.data IS NOT NULL)
+            ORDER BY l.rowid DESC LIMIT ?
+        """, (source, max_samples))
+        samples = [(raw or self.decompress(codec, data)).encode('utf-8') for raw, codec, data in c.fetchall()]
+        if len(samples) < 10:
+            print(f"[Storage] Only {len(samples)} samples for {source}, skipping dictionary training.")
+            return None
+        trained = zstandard.train_dictionary(dict_size, samples)
+        c.execute("INSERT INTO html_dicts (source, data) VALUES (?, ?)", (source, trained.as_bytes()))
+        dict_id = c.lastrowid
+        self._dicts[dict_id] = trained.as_bytes()
+        self._latest[source] = dict_id
+        print(f"[Storage] Trained {len(trained.as_bytes())}-byte dictionary #{dict_id} for {source} on {len(samples)} cards.")
+        return dict_id
+
+def attach(conn, readonly=False):
+    """
+    Register html_decompress() on a connection so plain SQL readers can use RAW_HTML_SQL.
+    readonly=True leaves the schema alone (no DDL, no write lock), for inspection tools.
+    """
+    store = HtmlStore(conn, readonly=readonly)
+    conn.create_function('html_decompress', 2, store.decompress)
+    return store
+
+def migrate(conn):
+    """
+    Move inline listings.raw_html into compressed blobs, recompress blobs with the
+    current codec/dictionary for their source and drop unreferenced ones. Caller commits.
+    """
+    store = HtmlStore(conn)
+    c = conn.cursor()
+    c.execute("SELECT rowid, raw_html, source FROM listings WHERE raw_html IS NOT NULL")
+    updates = [(store.put(html, source), rowid) for rowid, html, source in c.fetchall()]
+    c.executemany("UPDATE listings SET html_hash = ?, raw_html = NULL WHERE rowid = ?", updates)
+
+    c.execute("""
+        SELECT b.hash, b.codec, b.data, MIN(l.source) FROM html_blobs b
+        JOIN listings l ON l.html_hash = b.hash GROUP BY b.hash
+    """)
+    recompressed = 0
+    for key, codec, data, source in c.fetchall():
+        target = store._codec_for(source)
+        if codec != target:
+            new_codec, new_data = store.compress(store.decompress(codec, data), source)
+            conn.execute("UPDATE html_blobs SET codec = ?, data = ? WHERE hash = ?", (new_codec, new_data, key))
+            recompressed += 1
+    # Blobs left behind by re-scrapes before listings were upserted
+    c.execute("DELETE FROM html_blobs WHERE hash NOT IN (SELECT html_hash FROM listings WHERE html_hash IS NOT NULL)")
+    print(f"[Storage] Moved {len(updates)} inline cards into blobs, recompressed {recompressed} blobs, dropped {c.rowcount} orphans.")
+
+def file_size(path):
+    size = os.path.getsize(path)
+    # WAL sidecar counts as on-disk size too
+    if os.path.exists(path + '-wal'):
+        size += os.path.getsize(path + '-wal')
+    return size
+
+def report(conn, path=DB_PATH):
+    store = HtmlStore(conn)
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*), SUM(raw_html IS NOT NULL), SUM(LENGTH(CAST(raw_html AS BLOB))), SUM(html_hash IS NOT NULL) FROM listings")
+    rows, inline_rows, inline_bytes, blob_rows = c.fetchone()
+    c.execute("""
+        SELECT SUM(b.size) FROM listings l JOIN html_blobs b ON b.hash = l.html_hash
+    """)
+    logical_blob_bytes = c.fetchone()[0] or 0
+    c.execute("SELECT COUNT(*), SUM(size), SUM(LENGTH(data)) FROM html_blobs")
+    blobs, blob_size, blob_stored = c.fetchone()
+
+    print(f"[Storage] Listings: {rows} ({inline_rows or 0} inline HTML, {blob_rows or 0} in blobs)")
+    print(f"[Storage] Distinct blobs: {blobs} (dedup saved {(blob_rows or 0) - blobs} copies)")
+    if blob_stored:
+        print(f"[Storage] Card HTML: {logical_blob_bytes / 1024:.1f} KB as referenced -> "
+              f"{blob_stored / 1024:.1f} KB stored (x{logical_blob_bytes / blob_stored:.1f})")
+    if inline_bytes:
+        print(f"[Storage] Still inline: {inline_bytes / 1024:.1f} KB (run --migrate)")
+    print(f"[Storage] DB file: {file_size(path) / 1024:.1f} KB")
+
+    c.execute("SELECT codec, data FROM html_blobs LIMIT 2000")
+    sample = c.fetchall()
+    if sample:
+        start = time.perf_counter()
+        for codec, data in sample:
+            store.decompress(codec, data)
+        per_row = (time.perf_counter() - start) / len(sample)
+        print(f"[Storage] Decompression: {per_row * 1e6:.1f} us/row over {len(sample)} blobs")
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    if '--train' in sys.argv:
+        store = HtmlStore(conn)
+        for (source,) in conn.execute("SELECT DISTINCT source FROM listings").fetchall():
+            store.train(source)
+        conn.commit()
+    if '--migrate' in sys.argv:
+        before = file_size(DB_PATH)
+        migrate(conn)
+        conn.commit()
+        conn.execute("VACUUM")
+        print(f"[Storage] DB file: {before / 1024:.1f} KB -> {file_size(DB_PATH) / 1024:.1f} KB")
+    report(conn)
+    conn.close()
@@ -0,0 +1,204 @@
+import os
+import re
+import sys
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'clean_data.db')
+
+# README thresholds, relative to the bucket's average price
+DEAL_THRESHOLDS = [('GREAT', 0.80), ('GOOD', 1.05)]
+
+# Words that say nothing about which machine it is
+NOISE_WORDS = {'laptop', 'pc', 'portable', 'ordinateur', 'vente', 'a', 'vendre', 'neuf', 'occasion', 'gamer', 'gaming'}
+
+# One row per model + cpu/ram/storage bucket; count/sum/min/max are exact
+STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS market_stats (
+        bucket TEXT PRIMARY KEY,
+        count INTEGER,
+        sum REAL,
+        min REAL,
+        max REAL
+    )
+"""
+
+# Price histogram per bucket for medians/percentiles: bins keep 3 significant digits (<1% error)
+BINS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS market_bins (
+        bucket TEXT,
+        bin INTEGER,
+        count INTEGER,
+        PRIMARY KEY (bucket, bin)
+    ) WITHOUT ROWID
+"""
+
+def bin_sql(price):
+    """Order-preserving bin: digit count * 1000 + first 3 digits. Plain SQL, so any writer's triggers can compute it."""
+    digits = f"CAST(CAST({price} AS INTEGER) AS TEXT)"
+    return f"(length({digits}) * 1000 + CAST(substr({digits}, 1, 3) AS INTEGER))"
+
+def bin_value(bin):
+    """Midpoint of a bin's price range."""
+    length, lead = divmod(bin, 1000)
+    scale = 10 ** max(length - 3, 0)
+    return (lead + 0.5) * scale if scale > 1 else float(lead)
+
+def _add_sql(row):
+    return f"""
+        INSERT INTO market_stats (bucket, count, sum, min, max)
+        VALUES ({row}.market_bucket, 1, {row}.price, {row}.price, {row}.price)
+        ON CONFLICT(bucket) DO UPDATE SET count = count + 1, sum = sum + excluded.sum,
+            min = MIN(min, excluded.min), max = MAX(max, excluded.max);
+        INSERT INTO market_bins (bucket, bin, count) VALUES ({row}.market_bucket, {bin_sql(f'{row}.price')}, 1)
+        ON CONFLICT(bucket, bin) DO UPDATE SET count = count + 1;
+    """
+
+def _remove_sql(row):
+    # min/max can't be un-merged; re-read them from the (indexed) bucket only when the removed price was one
+    return f"""
+        UPDATE market_stats SET count = count - 1, sum = sum - {row}.price WHERE bucket = {row}.market_bucket;
+        UPDATE market_stats SET
+            min = (SELECT MIN(price) FROM products WHERE market_bucket = {row}.market_bucket AND {_COUNTED}),
+            max = (SELECT MAX(price) FROM products WHERE market_bucket = {row}.market_bucket AND {_COUNTED})
+        WHERE bucket = {row}.market_bucket AND ({row}.price <= min OR {row}.price >= max);
+        DELETE FROM market_stats WHERE bucket = {row}.market_bucket AND count <= 0;
+        UPDATE market_bins SET count = count - 1 WHERE bucket = {row}.market_bucket AND bin = {bin_sql(f'{row}.price')};
+        DELETE FROM market_bins WHERE bucket = {row}.market_bucket AND bin = {bin_sql(f'{row}.price')} AND count <= 0;
+    """
+
+# Outlier prices and reposts of another product (see processor.py) stay out of the aggregates
+def _counted(row=None):
+    prefix = f"{row}." if row else ''
+    return f"{prefix}market_bucket IS NOT NULL AND {prefix}price > 0 AND NOT {prefix}outlier AND {prefix}duplicate_of IS NULL"
+
+_COUNTED = _counted()
+_COUNTED_NEW = _counted('new')
+_COUNTED_OLD = _counted('old')
+_CHANGED = "(" + " OR ".join(f"old.{column} IS NOT new.{column}"
+                             for column in ('price', 'market_bucket', 'outlier', 'duplicate_of')) + ")"
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS market_insert AFTER INSERT ON products WHEN {_COUNTED_NEW} BEGIN
+        {_add_sql('new')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS market_update_remove AFTER UPDATE OF price, market_bucket, outlier, duplicate_of ON products
+        WHEN {_COUNTED_OLD} AND {_CHANGED} BEGIN
+        {_remove_sql('old')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS market_update_add AFTER UPDATE OF price, market_bucket, outlier, duplicate_of ON products
+        WHEN {_COUNTED_NEW} AND {_CHANGED} BEGIN
+        {_add_sql('new')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS market_delete AFTER DELETE ON products WHEN {_COUNTED_OLD} BEGIN
+        {_remove_sql('old')}
+    END""",
+]
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+SIZE_RE = re.compile(r'\d+(gb|go|tb|to)')
+
+def _words(text):
+    return WORD_RE.findall((text or '').lower())
+
+def model_key(title, brand=None, model=None, specs=None):
+    """
+    Normalized model name: the parser's model when it has one, otherwise the first
+    few title words before any spec (e.g. "HP EliteBook 840 G5 i5-8350U 8GB" -> "hp elitebook 840 g5").
+    """
+    if model and model != 'Unknown':
+        return ' '.join(_words(model))
+    spec_words = set()
+    for value in (specs or {}).values():
+        spec_words.update(_words(value))
+    words = []
+    for word in _words(title):
+        if word in spec_words or SIZE_RE.fullmatch(word):
+            break
+        if word not in NOISE_WORDS:
+            words.append(word)
+        if len(words) == 4:
+            break
+    return ' '.join(words) or ' '.join(_words(brand))
+
+def bucket_key(title, brand=None, model=None, specs=None):
+    """What a listing is compared against: normalized model + cpu/ram/storage."""
+    specs = specs or {}
+    parts = [model_key(title, brand, model, specs)]
+    parts += [' '.join(_words(specs.get(field))) for field in ('cpu', 'ram', 'storage')]
+    return '|'.join(parts)
+
+def has_schema(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'market_insert'").fetchone() is not None
+
+def ensure_schema(conn, rebuild=False):
+    """
+    Create the aggregate tables, the index they're rebuilt from and the triggers that
+    keep them current as products change. They're (re)filled from products when new
+    or with rebuild=True. Needs products.market_bucket, .outlier and .duplicate_of. Caller commits.
+    """
+    c = conn.cursor()
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_market ON products (market_bucket, price)")
+    fresh = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'market_stats'").fetchone() is None
+    c.execute(STATS_SCHEMA)
+    c.execute(BINS_SCHEMA)
+    for trigger in TRIGGERS:
+        c.execute(trigger)
+    if fresh or rebuild:
+        c.execute("DELETE FROM market_stats")
+        c.execute("DELETE FROM market_bins")
+        c.execute(f"""
+            INSERT INTO market_stats (bucket, count, sum, min, max)
+            SELECT market_bucket, COUNT(*), SUM(price), MIN(price), MAX(price)
+            FROM products WHERE {_COUNTED} GROUP BY market_bucket
+        """)
+        c.execute(f"""
+            INSERT INTO market_bins (bucket, bin, count)
+            SELECT market_bucket, {bin_sql('price')}, COUNT(*)
+            FROM products WHERE {_COUNTED} GROUP BY 1, 2
+        """)
+
+def bucket_stats(conn, bucket):
+    """{'count', 'avg', 'min', 'max'} for a bucket (one primary key lookup), or None."""
+    row = conn.execute("SELECT count, sum, min, max FROM market_stats WHERE bucket = ?", (bucket,)).fetchone()
+    if not row:
+        return None
+    count, total, min_price, max_price = row
+    return {'count': count, 'avg': total / count, 'min': min_price, 'max': max_price}
+
+def percentile(conn, bucket, q=0.5):
+    """Approximate q-quantile of a bucket's prices from its histogram (within ~1%), or None."""
+    bins = conn.execute("SELECT bin, count FROM market_bins WHERE bucket = ? ORDER BY bin", (bucket,)).fetchall()
+    total = sum(count for _, count in bins)
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bin, count in bins:
+        seen += count
+        if seen > rank:
+            return bin_value(bin)
+    return bin_value(bins[-1][0])
+
+def classify(price, avg):
+    for label, ratio in DEAL_THRESHOLDS:
+        if price < avg * ratio:
+            return label
+    return 'BAD'
+
+def score_deal(conn, bucket, price, min_count=3):
+    """
+    GREAT/GOOD/BAD for price against its bucket's average, or None when the bucket has
+    fewer than min_count listings to compare with. O(1): no scan of products.
+    """
+    stats = bucket_stats(conn, bucket)
+    if not stats or stats['count'] < min_count or not price:
+        return None
+    return classify(price, stats['avg'])
+
+if __name__ == "__main__":
+    import sqlite3
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn, rebuild='--rebuild' in sys.argv)
+    conn.commit()
+    buckets, listings = conn.execute("SELECT COUNT(*), SUM(count) FROM market_stats").fetchone()
+    print(f"[Market] {buckets} buckets over {listings or 0} products.")
+    conn.close()
@@ -0,0 +1,134 @@
+import os
+import sys
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'clean_data.db')
+
+# Spec fields pulled out of products.specs as indexed (virtual, generated) columns
+SPEC_COLUMNS = ['cpu', 'gpu', 'ram', 'storage']
+INDEXED_COLUMNS = SPEC_COLUMNS + ['price']
+
+# Same text analyze.py used to build per row in Python: title, brand, model, cpu, gpu, ram, storage
+def search_text_sql(row):
+    fields = ['title', 'brand', 'model'] + SPEC_COLUMNS
+    return " || ' ' || ".join(f"COALESCE({row}.{field}, '')" for field in fields)
+
+# Trigram tokens give substring matching, like the `part in full_text` test it replaces
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(search_text, tokenize='trigram')"
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, search_text) VALUES (new.rowid, {search_text_sql('new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+        UPDATE products_fts SET search_text = {search_text_sql('new')} WHERE rowid = new.rowid;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.rowid;
+    END""",
+]
+
+def has_schema(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts_insert'").fetchone() is not None
+
+def ensure_schema(conn, rebuild=False):
+    """
+    Add the spec columns, their indexes, the FTS table and the triggers that keep it
+    in sync to an existing products table. The FTS table is (re)filled from products
+    when it's new, or with rebuild=True (after the processor swaps in a rebuilt table).
+    Caller commits.
+    """
+    c = conn.cursor()
+    c.execute("PRAGMA table_xinfo(products)")
+    columns = {r[1] for r in c.fetchall()}
+    for column in SPEC_COLUMNS:
+        if column not in columns:
+            c.execute(f"ALTER TABLE products ADD COLUMN {column} TEXT "
+                      f"GENERATED ALWAYS AS (json_extract(specs, '$.{column}')) VIRTUAL")
+    for column in INDEXED_COLUMNS:
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_products_{column} ON products ({column})")
+
+    fresh = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone() is None
+    c.execute(FTS_SCHEMA)
+    for trigger in TRIGGERS:
+        c.execute(trigger)
+    if fresh or rebuild:
+        c.execute("DELETE FROM products_fts")
+        c.execute(f"INSERT INTO products_fts (rowid, search_text) SELECT rowid, {search_text_sql('products')} FROM products")
+
+def _fts_phrase(part):
+    return '"' + part.replace('"', '""') + '"'
+
+def search(conn, query, filters=None, limit=5):
+    """
+    Products whose search text contains every word of query (case-insensitive substring,
+    as before), narrowed by equality filters on the indexed columns, e.g.
+    {'ram': '16GB'}, and by 'min_price'/'max_price'.
+    Prices flagged as outliers count as matches but stay out of min/avg/max.
+    Returns ({'count', 'min', 'avg', 'max', 'outliers'}, top `limit` rows as
+    (brand, model, specs, price, currency, source, link, market_bucket, hash_id)).
+    """
+    filters = dict(filters or {})
+    parts = query.lower().split()
+    # Reposts folded into another product (storage/dedup.py) aren't separate matches
+    where = ["p.duplicate_of IS NULL"]
+    params = []
+
+    # ASCII words of 3+ characters are exact case-insensitive substring matches on the trigram
+    # index. Shorter ones (e.g. "hp", "i5") and non-ASCII ones, whose case folding may differ
+    # from Python's, are checked on the candidates the index leaves.
+    indexed = [part for part in parts if len(part) >= 3]
+    unindexed = [part for part in parts if len(part) < 3 or not part.isascii()]
+    if unindexed:
+        conn.create_function('matches_query', 1,
+                             lambda text: all(part in (text or '').lower() for part in unindexed), deterministic=True)
+    if indexed:
+        # Short words are checked on the FTS row's stored text, not rebuilt from the specs JSON
+        check = " AND matches_query(search_text)" if unindexed else ''
+        where.append(f"p.rowid IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?{check})")
+        params.append(' AND '.join(_fts_phrase(part) for part in indexed))
+    elif unindexed:
+        where.append(f"matches_query({search_text_sql('p')})")
+
+    if filters.get('min_price') is not None:
+        where.append("p.price >= ?")
+        params.append(filters.pop('min_price'))
+    if filters.get('max_price') is not None:
+        where.append("p.price <= ?")
+        params.append(filters.pop('max_price'))
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if column not in SPEC_COLUMNS:
+            raise ValueError(f"Can't filter on {column}")
+        where.append(f"p.{column} = ?")
+        params.append(value)
+
+    where_sql = ('WHERE ' + ' AND '.join(where)) if where else ''
+    # One pass over the matches feeds both the statistics row and the top rows
+    c = conn.cursor()
+    c.execute(f"""
+        WITH hits AS MATERIALIZED (
+            SELECT p.rowid AS id, CASE WHEN p.outlier THEN NULL ELSE p.price END AS price, p.outlier AS outlier
+            FROM products p {where_sql}
+        )
+        SELECT NULL, COUNT(*), MIN(NULLIF(price, 0)), AVG(NULLIF(price, 0)), MAX(NULLIF(price, 0)), TOTAL(outlier) FROM hits
+        UNION ALL
+        SELECT * FROM (SELECT id, NULL, NULL, NULL, NULL, NULL FROM hits ORDER BY id LIMIT ?)
+    """, params + [limit])
+    # Zero/NULL prices count as matches but stay out of the statistics, as before
+    (_, count, min_price, avg_price, max_price, outliers), *top_ids = c.fetchall()
+    top = []
+    for (rowid, *_) in top_ids:
+        c.execute("SELECT brand, model, specs, price, currency, source, link, market_bucket, hash_id FROM products WHERE rowid = ?", (rowid,))
+        top.append(c.fetchone())
+    stats = {'count': count, 'min': min_price, 'avg': avg_price, 'max': max_price, 'outliers': int(outliers)}
+    return stats, top
+
+if __name__ == "__main__":
+    import sqlite3
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn, rebuild='--rebuild' in sys.argv)
+    conn.commit()
+    count = conn.execute("SELECT COUNT(*) FROM products_fts").fetchone()[0]
+    print(f"[Search] Indexed {count} products.")
+    conn.close()
@@ -0,0 +1,116 @@
+import os
+import sys
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'clean_data.db')
+
+# What gets uploaded for each product (simhash and the generated spec columns stay local)
+SYNC_COLUMNS = ['hash_id', 'title', 'category', 'brand', 'model', 'specs', 'price', 'currency', 'source',
+                'link', 'market_bucket', 'outlier', 'duplicate_of', 'created_at']
+
+# A change feed: one row per product, moved to a new, ever-increasing seq each time the
+# product's synced columns change. An uploader only needs the last seq it delivered.
+CHANGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sync_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        hash_id TEXT UNIQUE,
+        deleted INTEGER DEFAULT 0
+    )
+"""
+
+# Last seq each upload target has acknowledged
+STATE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        target TEXT PRIMARY KEY,
+        seq INTEGER,
+        synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+def _requeue(row, deleted):
+    # Not INSERT OR REPLACE: an outer INSERT OR IGNORE would turn it into OR IGNORE
+    return (f"DELETE FROM sync_changes WHERE hash_id = {row}.hash_id; "
+            f"INSERT INTO sync_changes (hash_id, deleted) VALUES ({row}.hash_id, {deleted});")
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS sync_insert AFTER INSERT ON products BEGIN
+        {_requeue('new', 0)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS sync_update AFTER UPDATE ON products
+        WHEN {' OR '.join(f'old.{column} IS NOT new.{column}' for column in SYNC_COLUMNS)} BEGIN
+        {_requeue('new', 0)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS sync_delete AFTER DELETE ON products BEGIN
+        {_requeue('old', 1)}
+    END""",
+]
+
+# Each change as a ready-to-send JSON object, built by SQLite (specs is embedded as JSON, not a string)
+def _json_sql():
+    fields = []
+    for column in SYNC_COLUMNS:
+        value = f"p.{column}"
+        if column == 'specs':
+            value = "CASE WHEN json_valid(p.specs) THEN json(p.specs) ELSE p.specs END"
+        fields.append(f"'{column}', {value}")
+    return f"json_object({', '.join(fields)})"
+
+CHANGES_SQL = f"""
+    SELECT c.seq, CASE WHEN c.deleted OR p.hash_id IS NULL
+                       THEN json_object('hash_id', c.hash_id, 'deleted', json('true'))
+                       ELSE {_json_sql()} END
+    FROM sync_changes c LEFT JOIN products p ON p.hash_id = c.hash_id
+    WHERE c.seq > ? ORDER BY c.seq LIMIT ?
+"""
+
+def has_schema(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sync_insert'").fetchone() is not None
+
+def ensure_schema(conn, rebuild=False):
+    """
+    Create the change feed and the triggers that fill it as products are written; a new
+    feed starts with every product. With rebuild=True (after the processor swaps in a
+    rebuilt table, which fired no triggers) every product is queued again, since what
+    changed can't be told any more, and products that are gone are queued as deletions.
+    Caller commits.
+    """
+    c = conn.cursor()
+    fresh = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'sync_changes'").fetchone() is None
+    c.execute(CHANGES_SCHEMA)
+    c.execute(STATE_SCHEMA)
+    for trigger in TRIGGERS:
+        c.execute(trigger)
+    if rebuild and not fresh:
+        c.execute("DELETE FROM sync_changes WHERE hash_id IN (SELECT hash_id FROM products)")
+        # What's left and not yet marked deleted is gone since the last run
+        c.execute("CREATE TEMP TABLE sync_gone AS SELECT hash_id FROM sync_changes WHERE NOT deleted")
+        c.execute("DELETE FROM sync_changes WHERE NOT deleted")
+        c.execute("INSERT INTO sync_changes (hash_id, deleted) SELECT hash_id, 1 FROM sync_gone")
+        c.execute("DROP TABLE sync_gone")
+    if fresh or rebuild:
+        c.execute("INSERT INTO sync_changes (hash_id) SELECT hash_id FROM products ORDER BY rowid")
+
+def pending(conn, since):
+    """Number of changes after seq since."""
+    return conn.execute("SELECT COUNT(*) FROM sync_changes WHERE seq > ?", (since,)).fetchone()[0]
+
+def changes(conn, since, limit):
+    """Up to limit (seq, JSON text) changes after seq since, oldest first."""
+    return conn.execute(CHANGES_SQL, (since, limit)).fetchall()
+
+def watermark(conn, target):
+    row = conn.execute("SELECT seq FROM sync_state WHERE target = ?", (target,)).fetchone()
+    return row[0] if row else 0
+
+def checkpoint(conn, target, seq):
+    """Record that target has every change up to seq. Commits."""
+    conn.execute("INSERT OR REPLACE INTO sync_state (target, seq, synced_at) VALUES (?, ?, CURRENT_TIMESTAMP)", (target, seq))
+    conn.commit()
+
+if __name__ == "__main__":
+    import sqlite3
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    conn.commit()
+    for target, seq, synced_at in conn.execute("SELECT target, seq, synced_at FROM sync_state").fetchall():
+        print(f"[Sync] {target}: up to change {seq} ({synced_at}), {pending(conn, seq)} pending.")
+    conn.close()
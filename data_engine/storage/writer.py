@@ -0,0 +1,182 @@
+import os
+import sys
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage.html_store import HtmlStore, content_hash
+import metrics
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'raw_data.db')
+
+# WAL lets analyze.py/check_db.py read while a spider or the processor writes;
+# synchronous=NORMAL is crash-safe under WAL and skips an fsync per commit
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-32000",
+]
+
+def connect(path, timeout=30):
+    """Open an SQLite connection with the shared pragmas. timeout is how long to wait on a lock."""
+    conn = sqlite3.connect(path, timeout=timeout)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+# Raw listing upsert shared by the spiders: a re-scraped listing takes its new title/price/card,
+# which the processor's change detection then picks up (and price_history records)
+INSERT_LISTING_SQL = """
+    INSERT INTO listings (id, title, price, link, html_hash, source, scraped_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(id) DO UPDATE SET
+        title = excluded.title, price = excluded.price, html_hash = excluded.html_hash,
+        raw_html = NULL, scraped_at = excluded.scraped_at
+"""
+
+_STOP = object()
+_COMMIT = object()
+
+class DbWriter:
+    """
+    One thread that owns a DB connection; any thread hands it work:
+      insert(sql, rows)  - rows are buffered per statement and written with executemany
+                           every flush_size rows
+      submit(fn, *args)  - runs fn(writer, *args) on the writer thread (buffered rows are
+                           flushed first) and returns a Future with its result
+    Commits every commit_every rows/tasks or when the queue runs dry; commit_every=0
+    keeps everything in one transaction until commit() or close().
+    """
+
+    def __init__(self, db_path=DB_PATH, commit_every=2000, flush_size=500, html_store=True):
+        self.db_path = db_path
+        # Label of this DB in the write metrics: raw_data, clean_data, ...
+        self.name = os.path.splitext(os.path.basename(db_path))[0]
+        self.commit_every = commit_every
+        self.flush_size = flush_size
+        self.conn = None
+        self.html_store = None
+        self._use_html_store = html_store
+        self._buffers = {}
+        self._uncommitted = 0
+        self._error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def insert(self, sql, rows):
+        self._queue.put((None, sql, rows))
+
+    def execute(self, sql, params=()):
+        return self.submit(lambda w: w.conn.execute(sql, params).rowcount)
+
+    def commit(self):
+        future = Future()
+        self._queue.put((future, _COMMIT, ()))
+        return future
+
+    # Writer-thread side (also usable from inside submitted functions)
+
+    def save_listings(self, cards, source):
+        """
+        Upsert (item_id, title, price_str, link, html_or_None) cards as listings of source.
+        Card HTML is compressed into the blob store only when a listing is new or its card
+        changed; the blob a changed listing no longer points to is dropped unless another
+        listing shares it, so re-scrapes don't leave orphans behind. Returns the number of cards.
+        """
+        self._flush(INSERT_LISTING_SQL)
+        ids = [card[0] for card in cards]
+        known = {}
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            known.update(self.conn.execute(
+                f"SELECT id, html_hash FROM listings WHERE id IN ({','.join('?' * len(batch))})", batch))
+        rows = []
+        replaced = set()
+        for item_id, title, price_str, link, html in cards:
+            old_hash = known.get(item_id)
+            html_hash = content_hash(html) if html else None
+            if html_hash and html_hash != old_hash:
+                # Stored compressed, deduplicated by content
+                self.html_store.put(html, source)
+            if old_hash and old_hash != html_hash:
+                replaced.add(old_hash)
+            known[item_id] = html_hash
+            rows.append((item_id, title, price_str, link, html_hash, source))
+        self.buffer(INSERT_LISTING_SQL, rows)
+        if replaced:
+            self._flush(INSERT_LISTING_SQL)
+            self.conn.executemany("DELETE FROM html_blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM listings WHERE html_hash = ?)",
+                                  [(key, key) for key in replaced])
+        return len(rows)
+
+    def buffer(self, sql, rows):
+        buffered = self._buffers.setdefault(sql, [])
+        buffered.extend(rows)
+        if len(buffered) >= self.flush_size:
+            self._flush(sql)
+
+    def _flush(self, sql=None):
+        for key in ([sql] if sql else list(self._buffers)):
+            rows = self._buffers.pop(key, None)
+            if rows:
+                with metrics.timer('db_write_seconds', db=self.name, op='executemany'):
+                    self.conn.executemany(key, rows)
+                metrics.count('db_rows_written', len(rows), db=self.name)
+                self._uncommitted += len(rows)
+
+    def _commit(self):
+        self._flush()
+        with metrics.timer('db_write_seconds', db=self.name, op='commit'):
+            self.conn.commit()
+        self._uncommitted = 0
+
+    def _run(self):
+        self.conn = connect(self.db_path)
+        if self._use_html_store:
+            self.html_store = HtmlStore(self.conn)
+        while True:
+            task = self._queue.get()
+            if task is _STOP:
+                break
+            future, fn, args = task
+            try:
+                if future is None:
+                    self.buffer(fn, args)
+                elif fn is _COMMIT:
+                    self._commit()
+                    future.set_result(None)
+                else:
+                    self._flush()
+                    future.set_result(fn(self, *args))
+                    self._uncommitted += 1
+            except Exception as e:
+                if future is None:
+                    # Nobody is waiting on a plain insert; report it from close()
+                    print(f"[Writer] Insert failed: {e}")
+                    metrics.failure('write', metrics.reason(e), db=self.name)
+                    self._error = e
+                else:
+                    future.set_exception(e)
+            if self.commit_every and (self._uncommitted >= self.commit_every or self._queue.empty()):
+                self._commit()
+        self._commit()
+        self.conn.close()
+
+    def close(self):
+        """Write everything queued so far, commit and stop the thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error:
+            raise self._error
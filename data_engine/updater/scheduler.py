@@ -1,31 +1,325 @@
-import schedule
-import time
-import subprocess
+import os
 import sys
+import time
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import schedule
 from colorama import Fore
 
-def run_spider():
-    print(f"{Fore.CYAN}[Scheduler] Starting daily scrape job...")
-    # Run the spider logic via subprocess or direct import
-    # Subprocess is safer for memory leaks in Selenium
-    try:
-        subprocess.run([sys.executable, "data_engine/main.py", "--mode", "once", "--spider", "laptops"], check=True)
-        print(f"{Fore.GREEN}[Scheduler] Spider job finished.")
-        
-        # Then process
-        subprocess.run([sys.executable, "data_engine/main.py", "--mode", "process"], check=True)
-        print(f"{Fore.GREEN}[Scheduler] Processing job finished.")
-        
-        # Then upload (optional, or part of process)
-        # subprocess.run([sys.executable, "data_engine/uploader/push_to_api.py"], check=True)
-        
-    except Exception as e:
-        print(f"{Fore.RED}[Scheduler] Job failed: {e}")
-
-def start_scheduler():
-    print(f"{Fore.YELLOW}[System] Scheduler started. Running daily at 00:00...")
-    schedule.every().day.at("00:00").do(run_spider)
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage.writer import DbWriter, connect, DB_PATH
+from storage import market, history
+import metrics
+
+CLEAN_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'storage', 'clean_data.db')
+
+SOURCES = ('kouba', 'laptops')
+# What each spider writes to listings.source / products.source
+LISTING_SOURCE = {'kouba': 'kouba', 'laptops': 'ouedkniss'}
+
+# Each query is refreshed about as often as it takes to gather TARGET_CHURN new listings
+# or a TARGET_SHIFT move in the average price of its market buckets, within these bounds
+MIN_INTERVAL = 3600
+MAX_INTERVAL = 7 * 24 * 3600
+DEFAULT_INTERVAL = 24 * 3600
+TARGET_CHURN = 0.10
+TARGET_SHIFT = 0.02
+# Weight of the latest run in the smoothed churn/shift rates
+SMOOTHING = 0.5
+# Same-interval queries are kept apart by a fixed per-query offset of up to +/-JITTER of the interval
+JITTER = 0.1
+# A failed query is retried after RETRY_DELAY * 2^failures (never later than its interval)
+RETRY_DELAY = 600
+# Job duration assumed for the load projection until a query has run
+DEFAULT_DURATION = {'kouba': 30.0, 'laptops': 90.0}
+
+SCHEDULE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS refresh_schedule (
+        source TEXT,
+        query TEXT,
+        interval REAL,
+        next_run REAL,
+        last_run REAL,
+        churn_rate REAL,
+        shift_rate REAL,
+        duration REAL,
+        runs INTEGER DEFAULT 0,
+        failures INTEGER DEFAULT 0,
+        PRIMARY KEY (source, query)
+    )
+"""
+
+COLUMNS = ('source', 'query', 'interval', 'next_run', 'last_run', 'churn_rate', 'shift_rate', 'duration', 'runs', 'failures')
+
+def offset(source, query):
+    """Fixed fraction in [-JITTER, JITTER] for a query."""
+    digest = hashlib.md5(f"{source}|{query}".encode('utf-8')).digest()
+    return (int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF * 2 - 1) * JITTER
+
+def _smooth(rate, observed):
+    return observed if rate is None else SMOOTHING * observed + (1 - SMOOTHING) * rate
+
+def adapt(job, new, seen, shift, now):
+    """
+    Fold one successful run into job: churn is the fraction of the scraped listings that
+    were new, shift the relative move of the average price of the buckets they landed in,
+    both per hour since the previous run. The first run only sets a baseline (everything
+    looks new then). Returns the next interval in seconds.
+    """
+    if job['runs'] and job['last_run']:
+        hours = max((now - job['last_run']) / 3600, 1 / 60)
+        job['churn_rate'] = _smooth(job['churn_rate'], (new / seen if seen else 0.0) / hours)
+        job['shift_rate'] = _smooth(job['shift_rate'], shift / hours)
+    if job['churn_rate'] is None:
+        return DEFAULT_INTERVAL
+    # Hours until the expected churn/shift reaches its target, whichever comes first
+    wanted = min(TARGET_CHURN / job['churn_rate'] if job['churn_rate'] else float('inf'),
+                 TARGET_SHIFT / job['shift_rate'] if job['shift_rate'] else float('inf')) * 3600
+    return min(max(wanted, MIN_INTERVAL), MAX_INTERVAL)
+
+def snapshot_buckets(conn):
+    """{bucket: (count, sum)} of the market aggregates."""
+    return {bucket: (count, total) for bucket, count, total in conn.execute("SELECT bucket, count, sum FROM market_stats")}
+
+def bucket_shift(conn, before, history_mark, source):
+    """Count-weighted relative change in average price of the buckets that got price observations after history_mark."""
+    rows = conn.execute("""
+        SELECT bucket, count, sum FROM market_stats WHERE count > 0 AND bucket IN (
+            SELECT DISTINCT h.market_bucket FROM price_history h JOIN products p ON p.hash_id = h.hash_id
+            WHERE h.id > ? AND p.source = ?
+        )
+    """, (history_mark, source)).fetchall()
+    moved = weight = 0.0
+    for bucket, count, total in rows:
+        old_count, old_total = before.get(bucket, (0, 0.0))
+        if old_count and old_total:
+            old = old_total / old_count
+            moved += old_count * abs(total / count - old) / old
+            weight += old_count
+    return moved / weight if weight else 0.0
+
+def label(interval):
+    if interval <= 2 * MIN_INTERVAL:
+        return 'hot'
+    return 'stale' if interval >= MAX_INTERVAL / 2 else 'warm'
+
+def span(seconds):
+    if abs(seconds) < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h" if abs(seconds) < 48 * 3600 else f"{seconds / 86400:.1f}d"
+
+class RefreshScheduler:
+    """
+    Refreshes every (source, query) on its own interval, adapted after each run to how
+    much the query's listings churn and its prices move: hot queries come round hourly,
+    stale ones weekly. Due jobs start in priority order (most overdue relative to their
+    interval first) under a global budget of max_jobs at once, at most one per source
+    (one browser/site at a time, and each job's new listings stay attributable). Each
+    scrape is followed by an incremental processing run.
+    State lives in the raw DB's refresh_schedule table, so intervals survive restarts.
+    """
+
+    def __init__(self, queries, sources=SOURCES, max_jobs=2, process=True, db_path=DB_PATH,
+                 clean_db=CLEAN_DB_PATH, kouba_options=None, laptops_options=None):
+        self.queries = queries
+        self.sources = sources
+        self.max_jobs = max_jobs
+        self.process = process
+        self.db_path = db_path
+        self.clean_db = clean_db
+        self.kouba_options = kouba_options or {}
+        self.laptops_options = laptops_options or {}
+        self.jobs = {}
+        self.writer = None
+        self.processor = None
+        # One processing run at a time; also held by the nightly rollup
+        self.process_lock = threading.Lock()
+        self._jobs_lock = threading.Lock()
+
+    def load(self, now=None):
+        """Jobs from refresh_schedule; new queries are spread over the first MIN_INTERVAL."""
+        now = now or time.time()
+        conn = connect(self.db_path)
+        try:
+            conn.execute(SCHEDULE_SCHEMA)
+            stored = {(row[0], row[1]): dict(zip(COLUMNS, row)) for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM refresh_schedule")}
+        finally:
+            conn.close()
+        keys = [(source, query) for query in self.queries for source in self.sources]
+        new = [key for key in keys if key not in stored]
+        for i, (source, query) in enumerate(new):
+            stored[(source, query)] = dict(zip(COLUMNS, (source, query, DEFAULT_INTERVAL, now + i * MIN_INTERVAL / len(new),
+                                                         None, None, None, None, 0, 0)))
+        self.jobs = {key: stored[key] for key in keys}
+        return self.jobs
+
+    def save(self, job):
+        self.writer.submit(lambda db: db.conn.execute(
+            f"INSERT OR REPLACE INTO refresh_schedule ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [job[column] for column in COLUMNS])).result()
+
+    def due(self, now):
+        """Due jobs, most overdue (relative to their interval) first."""
+        with self._jobs_lock:
+            ready = [job for job in self.jobs.values() if job['next_run'] <= now]
+        return sorted(ready, key=lambda job: (now - job['next_run']) / job['interval'], reverse=True)
+
+    def scrape(self, source, query):
+        """Listings the spider saw, or None if the query failed."""
+        if source == 'kouba':
+            from spiders.kouba import KoubaSpider
+            spider = KoubaSpider(writer=self.writer, **self.kouba_options)
+            seen = spider.scrape(query)
+            stats = spider.last_stats
+            return None if stats['failed'] and not stats['parsed'] + stats['not_modified'] + stats['unchanged'] else seen
+        from spiders.laptops import LaptopSpider
+        spider = LaptopSpider(writer=self.writer, **self.laptops_options)
+        return spider.scrape_ouedkniss(query)
+
+    def measure_processing(self, source):
+        """Incremental processing run; returns the average price shift of the buckets it touched."""
+        self.writer.commit().result()
+        with self.process_lock:
+            conn = connect(self.clean_db)
+            ready = market.has_schema(conn) and history.has_schema(conn)
+            before = snapshot_buckets(conn) if ready else {}
+            mark = conn.execute("SELECT COALESCE(MAX(id), 0) FROM price_history").fetchone()[0] if ready else 0
+            conn.close()
+            self.processor.process_all()
+            if not ready:
+                return 0.0
+            conn = connect(self.clean_db)
+            try:
+                return bucket_shift(conn, before, mark, LISTING_SOURCE[source])
+            finally:
+                conn.close()
+
+    def run_job(self, job):
+        source, query = job['source'], job['query']
+        listing_source = LISTING_SOURCE[source]
+        print(f"{Fore.CYAN}[Scheduler] Refreshing {source} '{query}' (every {span(job['interval'])})...")
+        start = time.time()
+        try:
+            mark = self.writer.submit(lambda db: db.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM listings").fetchone()[0]).result()
+            seen = self.scrape(source, query)
+            if seen is None:
+                raise RuntimeError("scrape failed")
+            new = self.writer.submit(lambda db: db.conn.execute(
+                "SELECT COUNT(*) FROM listings WHERE rowid > ? AND source = ?", (mark, listing_source)).fetchone()[0]).result()
+            shift = self.measure_processing(source) if self.process else 0.0
+        except Exception as e:
+            with self._jobs_lock:
+                delay = min(job['interval'], RETRY_DELAY * 2 ** job['failures'])
+                job['failures'] += 1
+                job['next_run'] = time.time() + delay
+            self.save(job)
+            print(f"{Fore.RED}[Scheduler] {source} '{query}' failed: {e}. Retrying in {span(delay)}.")
+            metrics.failure('job', metrics.reason(e), component='scheduler', source=source)
+            metrics.count('jobs', component='scheduler', source=source, status='failed')
+            metrics.export()
+            return
+
+        now = time.time()
+        with self._jobs_lock:
+            job['interval'] = adapt(job, new, seen, shift, now)
+            job['duration'] = _smooth(job['duration'], now - start)
+            job['last_run'] = now
+            job['next_run'] = now + job['interval'] * (1 + offset(source, query))
+            job['runs'] += 1
+            job['failures'] = 0
+        self.save(job)
+        print(f"{Fore.GREEN}[Scheduler] {source} '{query}': {new}/{seen} new listings, {shift:.1%} price shift "
+              f"in {now - start:.0f}s. Next run in {span(job['next_run'] - now)} ({label(job['interval'])}).")
+        metrics.observe('job_seconds', now - start, component='scheduler', source=source)
+        metrics.count('jobs', component='scheduler', source=source, status='ok')
+        metrics.count('new_listings', new, component='scheduler', source=source)
+        # Runs indefinitely: the summary files are rewritten (cumulative) after every job
+        metrics.export()
+
+    def rollup(self):
+        """Nightly: downsample old price history."""
+        with self.process_lock:
+            conn = connect(self.clean_db)
+            try:
+                if history.has_schema(conn):
+                    stats = history.rollup(conn)
+                    conn.commit()
+                    print(f"[History] Rolled {stats['observations']} price observations into {stats['days']} daily / {stats['weeks']} weekly rows.")
+            finally:
+                conn.close()
+
+    def projection(self, now, horizon=24 * 3600):
+        """Planned runs within horizon seconds: [(start, source, query, expected duration)], by start."""
+        runs = []
+        for job in self.jobs.values():
+            duration = job['duration'] or DEFAULT_DURATION[job['source']]
+            t = max(job['next_run'], now)
+            while t < now + horizon:
+                runs.append((t, job['source'], job['query'], duration))
+                t += job['interval'] * (1 + offset(job['source'], job['query']))
+        return sorted(runs)
+
+    def print_plan(self, now=None, horizon=24 * 3600):
+        """Dry run: every job's interval and signals, then the projected load per hour."""
+        now = now or time.time()
+        print(f"[Scheduler] {len(self.jobs)} jobs, budget {self.max_jobs} at once:")
+        print(f"  {'source':8s} {'query':30s} {'every':>7s} {'next in':>8s} {'new/h':>7s} {'shift/h':>8s} {'runs':>5s}")
+        for job in sorted(self.jobs.values(), key=lambda job: job['next_run']):
+            churn = f"{job['churn_rate']:.1%}" if job['churn_rate'] is not None else '-'
+            shift = f"{job['shift_rate']:.2%}" if job['shift_rate'] is not None else '-'
+            print(f"  {job['source']:8s} {job['query'][:30]:30s} {span(job['interval']):>7s} "
+                  f"{span(max(job['next_run'] - now, 0)):>8s} {churn:>7s} {shift:>8s} {job['runs']:>5d}  {label(job['interval'])}")
+
+        runs = self.projection(now, horizon)
+        hours = int(horizon // 3600)
+        busy = [0.0] * hours
+        started = [0] * hours
+        for t, _, _, duration in runs:
+            slot = int((t - now) // 3600)
+            started[slot] += 1
+            busy[slot] += duration
+        capacity = 3600 * self.max_jobs
+        peak = max(range(hours), key=lambda h: busy[h]) if runs else 0
+        print(f"[Scheduler] Next {hours}h: {len(runs)} runs, {sum(busy) / 3600:.1f} job-hours "
+              f"({sum(busy) / (capacity * hours):.0%} of the budget), busiest hour +{peak}h at {busy[peak] / capacity:.0%}.")
+        for h in range(hours):
+            stamp = datetime.fromtimestamp(now + h * 3600).strftime('%H:%M')
+            print(f"  {stamp} {started[h]:3d} runs {busy[h] / capacity:5.0%} {'#' * round(busy[h] / capacity * 40)}")
+
+    def run_forever(self, poll=30):
+        from processor import DataProcessor
+        self.load()
+        self.writer = DbWriter(self.db_path).start()
+        for job in self.jobs.values():
+            if not job['runs']:
+                self.save(job)
+        if self.process:
+            self.processor = DataProcessor()
+        schedule.every().day.at("00:00").do(self.rollup)
+        print(f"{Fore.YELLOW}[System] Scheduler started: {len(self.jobs)} jobs, up to {self.max_jobs} at once.")
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            while True:
+                schedule.run_pending()
+                for future in [f for f in running if f.done()]:
+                    running.pop(future)
+                busy = {job['source'] for job in running.values()}
+                for job in self.due(time.time()):
+                    if len(running) >= self.max_jobs:
+                        break
+                    if job['source'] not in busy:
+                        running[executor.submit(self.run_job, job)] = job
+                        busy.add(job['source'])
+                time.sleep(poll)
+
+def start_scheduler(queries=('laptop',), sources=SOURCES, max_jobs=2, dry_run=False, **options):
+    scheduler = RefreshScheduler(list(queries), sources=sources, max_jobs=max_jobs, **options)
+    if dry_run:
+        scheduler.load()
+        scheduler.print_plan()
+    else:
+        scheduler.run_forever()
@@ -1,45 +1,147 @@
-import requests
-import sqlite3
 import os
-import json
+import sys
+import gzip
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage import sync
+from storage.writer import connect
+import metrics
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '../storage/clean_data.db')
 API_URL = "http://localhost:5000/api/prices/bulk" # Node.js endpoint
 
-def push_data():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    # Get products that haven't been synced? 
-    # For now, just specific query or all
-    try:
-        c.execute("SELECT * FROM products LIMIT 50")
-        rows = c.fetchall()
-        
-        payload = []
-        for row in rows:
-            item = dict(row)
-            # Parse specs back to JSON object if string
-            if isinstance(item['specs'], str):
+# A batch is sent once it holds BATCH_ROWS products or BATCH_BYTES of JSON (before gzip)
+BATCH_ROWS = 1000
+BATCH_BYTES = 1000000
+# Changes read from the DB per query
+READ_SIZE = 5000
+
+# Connection errors, 429 and 5xx are retried after backoff * 2^attempt seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def batches(conn, since, max_rows=BATCH_ROWS, max_bytes=BATCH_BYTES):
+    """
+    Changes after seq since as (last seq, row count, JSON array bytes), oldest first.
+    Each product is already a JSON object when it comes out of SQLite, so nothing
+    is decoded and re-encoded here.
+    """
+    items, size, last = [], 2, since
+    while True:
+        rows = sync.changes(conn, last, READ_SIZE)
+        for seq, doc in rows:
+            encoded = doc.encode('utf-8')
+            if items and (len(items) >= max_rows or size + len(encoded) + 1 > max_bytes):
+                yield last, len(items), b'[' + b','.join(items) + b']'
+                items, size = [], 2
+            items.append(encoded)
+            size += len(encoded) + 1
+            last = seq
+        if len(rows) < READ_SIZE:
+            break
+    if items:
+        yield last, len(items), b'[' + b','.join(items) + b']'
+
+class Uploader:
+    """
+    Delta sync of the clean DB to the API: only products changed since the last
+    acknowledged batch (storage/sync.py's change feed) are sent, as gzip'd JSON
+    batches over one keep-alive connection. The watermark is checkpointed after
+    every acknowledged batch, so a crashed or failed run resumes where it stopped;
+    a batch may be delivered twice then, never skipped. Each request carries the
+    batch's last change number in X-Sync-Seq.
+    """
+
+    def __init__(self, url=API_URL, db_path=DB_PATH, batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES,
+                 retries=4, backoff=1.0, timeout=30, gzip_level=6):
+        self.url = url
+        self.db_path = db_path
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.gzip_level = gzip_level
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.stats = {}
+
+    def post_with_retry(self, body, seq):
+        for attempt in range(self.retries + 1):
+            try:
+                with metrics.timer('push_seconds', component='uploader'):
+                    resp = self.session.post(self.url, data=body, headers={'X-Sync-Seq': str(seq)}, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                print(f"[Uploader] {e}, retrying...")
+                metrics.count('retries', component='uploader', reason=metrics.reason(e))
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    resp.raise_for_status()
+                    return resp
+                print(f"[Uploader] Status {resp.status_code}, retrying...")
+                metrics.count('retries', component='uploader', reason=f"status_{resp.status_code}")
+            self.stats['retries'] += 1
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def sync(self, full=False):
+        """Push pending changes (all products with full=True). Returns the run's stats."""
+        self.stats = {'rows': 0, 'batches': 0, 'json_bytes': 0, 'wire_bytes': 0, 'retries': 0, 'failed': False}
+        conn = connect(self.db_path)
+        try:
+            if not sync.has_schema(conn):
+                print("[Uploader] No change feed yet; run the processor first.")
+                return self.stats
+            since = 0 if full else sync.watermark(conn, self.url)
+            pending = sync.pending(conn, since)
+            if not pending:
+                print("[Uploader] No data to push.")
+                return self.stats
+            print(f"[Uploader] Pushing {pending} changed products to {self.url} (after change {since})...")
+
+            start = time.perf_counter()
+            for seq, count, body in batches(conn, since, self.batch_rows, self.batch_bytes):
+                payload = gzip.compress(body, self.gzip_level)
                 try:
-                    item['specs'] = json.loads(item['specs'])
-                except:
-                    pass
-            payload.append(item)
-            
-        if payload:
-            print(f"[Uploader] Pushing {len(payload)} items to {API_URL}")
-            # resp = requests.post(API_URL, json=payload)
-            # print(f"[Uploader] Response: {resp.status_code}")
-            print(f"[Uploader] Simulated Push: Success")
-        else:
-            print("[Uploader] No data to push.")
-            
-    except Exception as e:
-        print(f"[Uploader] Error: {e}")
-    finally:
-        conn.close()
+                    self.post_with_retry(payload, seq)
+                except requests.RequestException as e:
+                    self.stats['failed'] = True
+                    metrics.failure('push', metrics.reason(e), component='uploader')
+                    print(f"[Uploader] Batch failed: {e}. Next run resumes after change {sync.watermark(conn, self.url)}.")
+                    break
+                sync.checkpoint(conn, self.url, seq)
+                self.stats['rows'] += count
+                self.stats['batches'] += 1
+                self.stats['json_bytes'] += len(body)
+                self.stats['wire_bytes'] += len(payload)
+                metrics.count('pushed_rows', count, component='uploader')
+                metrics.count('pushed_bytes', len(payload), component='uploader', encoding='gzip')
+                metrics.count('pushed_bytes', len(body), component='uploader', encoding='json')
+            elapsed = time.perf_counter() - start
+        finally:
+            conn.close()
+
+        self.stats['seconds'] = elapsed
+        s = self.stats
+        print(f"[Uploader] Pushed {s['rows']} products in {s['batches']} batches, {elapsed:.1f}s "
+              f"({s['rows'] / elapsed if elapsed else 0:,.0f} rows/s): {s['json_bytes'] / 1e6:.2f} MB JSON, "
+              f"{s['wire_bytes'] / 1e6:.2f} MB gzip on the wire, {s['retries']} retries.")
+        return self.stats
+
+def push_data(url=API_URL, full=False):
+    return Uploader(url).sync(full=full)
 
 if __name__ == "__main__":
-    push_data()
+    def _arg(name, default, cast=str):
+        return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+    if '--metrics-json' in sys.argv or '--metrics-prom' in sys.argv:
+        metrics.enable(_arg('--metrics-json', None), _arg('--metrics-prom', None))
+    uploader = Uploader(_arg('--url', API_URL), batch_rows=_arg('--batch-rows', BATCH_ROWS, int),
+                        batch_bytes=_arg('--batch-bytes', BATCH_BYTES, int))
+    uploader.sync(full='--full' in sys.argv)
+    metrics.export()
@@ -1,11 +1,19 @@
 import sqlite3
 import os
+import sys
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data_engine/storage/raw_data.db')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'data_engine'))
+from storage.html_store import attach, raw_html_select
 
-conn = sqlite3.connect(DB_PATH)
+DB_PATH = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'data_engine/storage/raw_data.db')
+
+# Read-only: inspecting never writes to (or locks) the raw DB
+conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+# Card HTML may be stored compressed in html_blobs (or only inline, on a raw DB from before them)
+attach(conn, readonly=True)
+raw_html, join = raw_html_select(conn)
 c = conn.cursor()
-c.execute("SELECT raw_html FROM listings LIMIT 1")
+c.execute(f"SELECT {raw_html} AS html FROM listings l {join} WHERE html IS NOT NULL LIMIT 1")
 row = c.fetchone()
 
 if row:
@@ -1,19 +1,28 @@
 import sqlite3
 import os
+import sys
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data_engine/storage/raw_data.db')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'data_engine'))
+from storage.html_store import attach, raw_html_select
 
-conn = sqlite3.connect(DB_PATH)
+DB_PATH = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'data_engine/storage/raw_data.db')
+
+# Read-only: inspecting never writes to (or locks) the raw DB
+conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+# Card HTML may be stored compressed in html_blobs (or only inline, on a raw DB from before them)
+attach(conn, readonly=True)
+raw_html, join = raw_html_select(conn)
 c = conn.cursor()
-c.execute("SELECT title, link, raw_html FROM listings ORDER BY scraped_at DESC LIMIT 5")
+c.execute(f"SELECT l.title, l.link, {raw_html}, l.price FROM listings l {join} ORDER BY l.scraped_at DESC LIMIT 5")
 rows = c.fetchall()
 
 print(f"Found {len(rows)} rows.")
 for r in rows:
     print(f"Title: {r[0]}")
     print(f"Link: {r[1]}")
-    # Print a snippet of raw_html to see the title inside it
-    print(f"HTML Snippet: {r[2][:500]}...")
+    print(f"Price: {r[3]}")
+    # Print a snippet of raw_html to see the title inside it (not kept for cards extracted at scrape time)
+    print(f"HTML Snippet: {(r[2] or '(not stored)')[:500]}...")
     print("-" * 20)
 
 conn.close()